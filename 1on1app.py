@@ -1,56 +1,73 @@
+import os
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import numpy as np
+from practice_data import (
+    load_1on1_sheet, load_1on1_sheet_cube, load_1on1_sheet_counts_cube, one_on_one_matchups,
+)
+from data_fetch import per_version
+from time_index import time_range, time_bounds
+from figure_cache import cached_figure, cached_table, data_version, figure_builder
+from heatmaps import grid_sums, ratio_grid, AREA_2x5, COURSE_3x3, ORIGIN_3x3, ORIGIN_2x2
+import perf
+from refresher import current
+from data_browser import browse
+from sections import lazy_tabs, is_open
 
 # ページ設定
 st.set_page_config(page_title="1on1 総合分析ダッシュボード", layout="wide")
+perf.begin("1on1app.py")
 
 st.title("🥍 1on1 総合戦略分析ダッシュボード")
 
 # ==========================================
 # 1. データの読み込み (Googleスプレッドシート)
 # ==========================================
-@st.cache_data(ttl=30)
+# 取得元のURL・列の整形は practice_data.py（app.py・practice_app.py と共通）
+# スプレッドシートは追記のみなので、前回から増えた行だけをパース・整形して追加する
+# 取得はバックグラウンドの更新（refresher.py）が30秒ごとに行い、画面は最後に取得できた表をすぐ受け取る。
+# 取得元を待つのは起動直後の1回だけ。更新に失敗しても前の表を表示し続け、サイドバーに注意書きを出す
 def load_data():
-    SHEET_ID = "1hRkai8KYkb2nM8ZHA5h56JGst8pp9t8jUHu2jV-Nd2E"
-    GID = "1086529984"
-    csv_url = f"https://docs.google.com/spreadsheets/d/{SHEET_ID}/export?format=csv&gid={GID}"
-    
-    try:
-        df = pd.read_csv(csv_url)
-        df = df.rename(columns={
-            'ショットを打った手': '利き手',
-            'ショットコース': 'コース',
-            'ショット結果': '結果'
-        })
-        return df
-    except Exception as e:
-        st.error(f"データの読み込みに失敗しました: {e}")
-        return pd.DataFrame()
-
-# 生データの読み込み
-raw_df = load_data()
+    return current("1on1_sheet", load_1on1_sheet, pd.DataFrame())
+
+# 画面の集計は「日付×AT×DF×ゴーリー×起点×抜き方×…」の件数キューブから行う。
+# キューブはデータの版ごとに1回だけ作られ、選手の切り替えはキューブの切り出しだけで済む。
+# 生の行は 📊 全データ を開いた時だけ使う。
+# 【集計モード】複数シーズン分のCSVなど、全行をメモリに載せたくない場合は
+# チャンクごとに読み込んで件数へ畳み込み、生の行を持たずにキューブを作る
+# （2回目からは、前回から追記された行だけを畳み込む）
+STREAMING_INGEST = os.environ.get("LAX_STREAMING_INGEST") == "1"
+
+def build_cube():
+    if STREAMING_INGEST:
+        return load_1on1_sheet_counts_cube()
+    return load_1on1_sheet_cube()
+
+def load_cube():
+    return current("1on1_sheet:cube:streaming" if STREAMING_INGEST else "1on1_sheet:cube", build_cube)
+
+with perf.span("load"):
+    cube = load_cube()
+raw_df = cube.table if cube is not None else pd.DataFrame()
 
 if raw_df.empty:
     st.warning("データがまだ読み込めません。Unityアプリからデータを送信してください。")
-    st.stop()
+    perf.stop()
 
 # ==========================================
 # サイドバー：期間フィルター
 # ==========================================
 st.sidebar.header("📅 期間フィルター")
+start_dt, end_dt = None, None
 
 # タイムスタンプ列が存在するかチェック
 if 'タイムスタンプ' in raw_df.columns:
-    # 【エラー対策】キャッシュの残りや、空白データ(NaN)と文字列の混在によるTypeErrorを防ぐため、
-    # 確実にdatetime型に変換してから、無効なデータを排除（dropna）して最小値・最大値を取る
-    raw_df['タイムスタンプ'] = pd.to_datetime(raw_df['タイムスタンプ'], errors='coerce')
-    valid_dates_df = raw_df.dropna(subset=['タイムスタンプ'])
-
-    if not valid_dates_df.empty:
-        min_date = valid_dates_df['タイムスタンプ'].min().date()
-        max_date = valid_dates_df['タイムスタンプ'].max().date()
+    # 【エラー対策】datetime型への変換は読み込み時に済ませてある。表は時刻順なので、無効なデータを除いた最初と最後の日付は両端を見るだけで分かる
+    date_bounds = time_bounds(raw_df)
+
+    if date_bounds is not None:
+        min_date, max_date = (t.date() for t in date_bounds)
         
         # 日付ピッカーを表示（デフォルトは全期間）
         selected_date_range = st.sidebar.date_input(
@@ -66,20 +83,27 @@ if 'タイムスタンプ' in raw_df.columns:
                 start_date, end_date = selected_date_range
                 start_dt = pd.to_datetime(start_date)
                 end_dt = pd.to_datetime(end_date) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
-                df = raw_df[(raw_df['タイムスタンプ'] >= start_dt) & (raw_df['タイムスタンプ'] <= end_dt)].copy()
             elif len(selected_date_range) == 1:
                 start_date = selected_date_range[0]
                 start_dt = pd.to_datetime(start_date)
                 end_dt = start_dt + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
-                df = raw_df[(raw_df['タイムスタンプ'] >= start_dt) & (raw_df['タイムスタンプ'] <= end_dt)].copy()
-            else:
-                df = raw_df.copy()
-        else:
-            df = raw_df.copy()
-    else:
-        df = raw_df.copy()
-else:
-    df = raw_df.copy()
+
+# 期間の絞り込みは時刻列の二分探索で行の範囲を求めて切り出すだけ（マスクもコピーも作らない）。
+# 返す表は元の表と中身を共有するので、画面側では書き換えないこと
+def filter_by_date(frame):
+    if start_dt is None:
+        return frame
+    return time_range(frame, start_dt, end_dt)
+
+df = filter_by_date(raw_df)
+
+# グラフのキャッシュのキー（データの版と期間）。選手・画面はグラフごとに足す
+view_key = (data_version(cube), start_dt, end_dt)
+
+# 苦手ランキング用の対戦表（AT×DF・AT×ゴーリー）。データの版ごとに1回だけ作るので、
+# 選手・期間を切り替えても対戦表の行（列）を取り出して並べ替えるだけで済む
+def load_matchups(name):
+    return per_version("1on1app:matchups", raw_df, one_on_one_matchups)[name]
 
 st.sidebar.markdown("---")
 
@@ -88,34 +112,25 @@ st.sidebar.markdown("---")
 # ==========================================
 test_members = ['#11', '#26', '#67', 'パズーさん', 'りむさん', 'うりさん', 'ばらさん', 'いずさん', 'はなさん']
 
+# 条件に合う行の件数（集計表の1行は複数回分なので、行数ではなく 件数 列を足す）
+def count_where(data_df, mask):
+    return data_df['件数'].where(mask, 0)
+
 # ==========================================
 # 2. 共通ヒートマップ関数 (3×3)
 # ==========================================
+# セルごとの集計は heatmaps.py（全セルを1パスで数える）。
+# 行を絞り込む代わりに、分子・分母に入れる件数を count_where で作って渡す
+# key=（データの版・期間・選手）を渡すと、集計ごとグラフを使い回す（figure_cache.py）
+@figure_builder
 def create_3x3_heatmap(data_df, mode="course", title=""):
-    grid = np.zeros((3, 3))
-    
     if mode == "course":
-        mapping = {
-            '1': (0, 0), '2': (0, 1), '3': (0, 2),
-            '4': (1, 0), '5': (1, 1), '6': (1, 2),
-            '7': (2, 0), '8': (2, 1), '9': (2, 2)
-        }
-        col_target = 'コース'
+        layout, col_target = COURSE_3x3, 'コース'
         y_labels = ['上', '中', '下']
     else:
-        mapping = {
-            '左上': (0, 0), 'センター': (0, 1), '右上': (0, 2),
-            '左横': (1, 0), '右横': (1, 2),
-            '左裏': (2, 0), '右裏': (2, 2)
-        }
-        col_target = '起点'
+        layout, col_target = ORIGIN_3x3, '起点'
         y_labels = ['上', '横', '裏']
-
-    counts = data_df[col_target].dropna().astype(str).value_counts()
-    for val, count in counts.items():
-        if val in mapping:
-            r, c = mapping[val]
-            grid[r, c] = count
+    grid = grid_sums(data_df[col_target], layout, data_df['件数'])
 
     fig = px.imshow(
         grid,
@@ -130,19 +145,10 @@ def create_3x3_heatmap(data_df, mode="course", title=""):
     return fig
 
 # 起点の2×2マッピング関数
+@figure_builder
 def create_2x2_origin_heatmap(data_df, title=""):
-    grid = np.zeros((2, 2))
     # 四隅の起点を2x2にマッピング
-    mapping = {
-        '左上': (0, 0), '右上': (0, 1),
-        '左裏': (1, 0), '右裏': (1, 1)
-    }
-    
-    counts = data_df['起点'].dropna().astype(str).value_counts()
-    for val, count in counts.items():
-        if val in mapping:
-            r, c = mapping[val]
-            grid[r, c] = count
+    grid = grid_sums(data_df['起点'], ORIGIN_2x2, data_df['件数'])
 
     fig = px.imshow(
         grid,
@@ -156,33 +162,17 @@ def create_2x2_origin_heatmap(data_df, title=""):
     fig.update_layout(width=350, height=350, coloraxis_showscale=False)
     return fig
 
+# ショットの件数と、そのうち結果が result だった件数
+def shot_counts(data_df, result):
+    shot = data_df['終わり方'] == 'ショット'
+    return count_where(data_df, shot & (data_df['結果'] == result)), count_where(data_df, shot)
+
 # 【新規追加】AT分析用：コース別 決定率ヒートマップ
+@figure_builder
 def create_at_course_heatmap(data_df, title=""):
-    grid_color = np.zeros((3, 3)) # 色（決定率）用
-    grid_text = np.empty((3, 3), dtype=object) # テキスト表示用
-    
-    mapping = {
-        '1': (0, 0), '2': (0, 1), '3': (0, 2),
-        '4': (1, 0), '5': (1, 1), '6': (1, 2),
-        '7': (2, 0), '8': (2, 1), '9': (2, 2)
-    }
-    
-    shot_df = data_df[data_df['終わり方'] == 'ショット'].copy()
-    # 小数点を排除してきれいな文字列に
-    shot_df['コース_clean'] = pd.to_numeric(shot_df['コース'], errors='coerce').fillna(0).astype(int).astype(str)
-    
-    for course_num, (r, c) in mapping.items():
-        course_data = shot_df[shot_df['コース_clean'] == course_num]
-        total_shots = len(course_data)
-        goals = len(course_data[course_data['結果'] == 'ゴール'])
-        if total_shots > 0:
-            rate = (goals / total_shots) * 100
-            grid_color[r, c] = rate
-            grid_text[r, c] = f"{goals}/{total_shots}<br>({rate:.1f}%)"
-        else:
-            grid_color[r, c] = 0
-            grid_text[r, c] = "0/0<br>(0.0%)"
-            
+    goals, shots = shot_counts(data_df, 'ゴール')
+    grid_color, grid_text = ratio_grid(data_df['コース'], COURSE_3x3, goals, shots)
+
     fig = px.imshow(
         grid_color, labels=dict(x="左右", y="位置", color="決定率(%)"),
         x=['左', '中', '右'], y=['上', '中', '下'], color_continuous_scale='Reds', title=title
@@ -192,32 +182,11 @@ def create_at_course_heatmap(data_df, title=""):
     return fig
 
 # 【新規追加・DF分析用】起点別 被ショット率ヒートマップ
+@figure_builder
 def create_df_origin_ratio_heatmap(data_df, title=""):
-    grid_color = np.full((3, 3), np.nan) 
-    grid_text = np.full((3, 3), "", dtype=object) 
-    
-    mapping = {
-        '左上': (0, 0), 'センター': (0, 1), '右上': (0, 2),
-        '左横': (1, 0), '右横': (1, 2),
-        '左裏': (2, 0), '右裏': (2, 2)
-    }
-    
-    data_df = data_df.copy()
-    data_df['起点_clean'] = data_df['起点'].astype(str).str.strip()
-    
-    for origin, (r, c) in mapping.items():
-        origin_data = data_df[data_df['起点_clean'] == origin]
-        total_matchups = len(origin_data)
-        shots_allowed = len(origin_data[origin_data['終わり方'] == 'ショット'])
-        
-        if total_matchups > 0:
-            rate = (shots_allowed / total_matchups) * 100
-            grid_color[r, c] = rate
-            grid_text[r, c] = f"{shots_allowed}/{total_matchups}<br>({rate:.1f}%)"
-        else:
-            grid_color[r, c] = 0
-            grid_text[r, c] = "0/0<br>(0.0%)"
-            
+    shots_allowed = count_where(data_df, data_df['終わり方'] == 'ショット')
+    grid_color, grid_text = ratio_grid(data_df['起点'], ORIGIN_3x3, shots_allowed, data_df['件数'])
+
     fig = px.imshow(
         grid_color, labels=dict(x="左右", y="位置", color="被ショット率(%)"),
         x=['左', '中', '右'], y=['上', '横', '裏'], color_continuous_scale='Reds', title=title
@@ -227,27 +196,11 @@ def create_df_origin_ratio_heatmap(data_df, title=""):
     return fig
 
 # 【ゴーリー分析用】起点別 セーブ率ヒートマップ (2x2)
+@figure_builder
 def create_goalie_origin_ratio_heatmap(data_df, title=""):
-    grid_color = np.zeros((2, 2))
-    grid_text = np.empty((2, 2), dtype=object)
-    mapping = {'左上': (0, 0), '右上': (0, 1), '左裏': (1, 0), '右裏': (1, 1)}
-    
-    shot_df = data_df[data_df['終わり方'] == 'ショット'].copy()
-    shot_df['起点_clean'] = shot_df['起点'].astype(str).str.strip()
-    
-    for origin, (r, c) in mapping.items():
-        origin_shots = shot_df[shot_df['起点_clean'] == origin]
-        total_shots = len(origin_shots)
-        saves = len(origin_shots[origin_shots['結果'] == 'セーブ'])
-        
-        if total_shots > 0:
-            rate = (saves / total_shots) * 100
-            grid_color[r, c] = rate
-            grid_text[r, c] = f"{saves}/{total_shots}<br>({rate:.1f}%)"
-        else:
-            grid_color[r, c] = 0
-            grid_text[r, c] = "0/0<br>(0.0%)"
-            
+    saves, shots = shot_counts(data_df, 'セーブ')
+    grid_color, grid_text = ratio_grid(data_df['起点'], ORIGIN_2x2, saves, shots)
+
     fig = px.imshow(
         grid_color, labels=dict(x="左右", y="位置", color="セーブ率(%)"),
         x=['左', '右'], y=['上', '裏'], color_continuous_scale='Blues', title=title
@@ -257,31 +210,11 @@ def create_goalie_origin_ratio_heatmap(data_df, title=""):
     return fig
 
 # 【ゴーリー分析用】コース別 セーブ率ヒートマップ (3x3)
+@figure_builder
 def create_goalie_course_ratio_heatmap(data_df, title=""):
-    grid_color = np.zeros((3, 3)) 
-    grid_text = np.empty((3, 3), dtype=object) 
-    mapping = {
-        '1': (0, 0), '2': (0, 1), '3': (0, 2),
-        '4': (1, 0), '5': (1, 1), '6': (1, 2),
-        '7': (2, 0), '8': (2, 1), '9': (2, 2)
-    }
-    
-    shot_df = data_df[data_df['終わり方'] == 'ショット'].copy()
-    shot_df['コース_clean'] = pd.to_numeric(shot_df['コース'], errors='coerce').fillna(0).astype(int).astype(str)
-    
-    for course_num, (r, c) in mapping.items():
-        course_data = shot_df[shot_df['コース_clean'] == course_num]
-        total_shots = len(course_data)
-        saves = len(course_data[course_data['結果'] == 'セーブ'])
-        
-        if total_shots > 0:
-            rate = (saves / total_shots) * 100
-            grid_color[r, c] = rate
-            grid_text[r, c] = f"{saves}/{total_shots}<br>({rate:.1f}%)"
-        else:
-            grid_color[r, c] = 0
-            grid_text[r, c] = "0/0<br>(0.0%)"
-            
+    saves, shots = shot_counts(data_df, 'セーブ')
+    grid_color, grid_text = ratio_grid(data_df['コース'], COURSE_3x3, saves, shots)
+
     fig = px.imshow(
         grid_color, labels=dict(x="左右", y="位置", color="セーブ率(%)"),
         x=['左', '中', '右'], y=['上', '中', '下'], color_continuous_scale='Blues', title=title
@@ -291,43 +224,22 @@ def create_goalie_course_ratio_heatmap(data_df, title=""):
     return fig
 
 # 【修正】ショット位置(1-10)の2x5割合ヒートマップ
+@figure_builder
 def create_shot_position_heatmap(data_df, mode="AT", title=""):
-    grid_color = np.zeros((2, 5)) 
-    grid_text = np.empty((2, 5), dtype=object) 
-    
-    mapping = {
-        '1': (0, 0), '2': (0, 1), '3': (0, 2), '4': (0, 3), '5': (0, 4),
-        '6': (1, 0), '7': (1, 1), '8': (1, 2), '9': (1, 3), '10': (1, 4)
-    }
-    
-    shot_df = data_df[data_df['終わり方'] == 'ショット'].copy()
-    shot_df['ショット位置_clean'] = pd.to_numeric(shot_df['ショット位置'], errors='coerce').fillna(0).astype(int).astype(str)
-    
-    for loc_num, (r, c) in mapping.items():
-        loc_data = shot_df[shot_df['ショット位置_clean'] == loc_num]
-        total_shots = len(loc_data)
-        
-        if mode == "AT":
-            success = len(loc_data[loc_data['結果'] == 'ゴール'])
-            color_scale = 'Reds'
-            c_label = "決定率(%)"
-        elif mode == "DF":
-            success = len(loc_data[loc_data['結果'] == 'ゴール'])
-            color_scale = 'Oranges'
-            c_label = "失点率(%)"
-        elif mode == "G":
-            success = len(loc_data[loc_data['結果'] == 'セーブ'])
-            color_scale = 'Blues'
-            c_label = "セーブ率(%)"
-            
-        if total_shots > 0:
-            rate = (success / total_shots) * 100
-            grid_color[r, c] = rate
-            grid_text[r, c] = f"[{loc_num}]<br>{success}/{total_shots}<br>({rate:.1f}%)"
-        else:
-            grid_color[r, c] = 0
-            grid_text[r, c] = f"[{loc_num}]<br>0/0<br>(0.0%)"
-            
+    if mode == "AT":
+        success, shots = shot_counts(data_df, 'ゴール')
+        color_scale = 'Reds'
+        c_label = "決定率(%)"
+    elif mode == "DF":
+        success, shots = shot_counts(data_df, 'ゴール')
+        color_scale = 'Oranges'
+        c_label = "失点率(%)"
+    elif mode == "G":
+        success, shots = shot_counts(data_df, 'セーブ')
+        color_scale = 'Blues'
+        c_label = "セーブ率(%)"
+    grid_color, grid_text = ratio_grid(data_df['ショット位置'], AREA_2x5, success, shots, cell_labels=True)
+
     fig = px.imshow(
         grid_color, labels=dict(x="左右", y="段", color=c_label),
         x=['1', '2', '3', '4', '5'], y=['上段', '下段'], 
@@ -352,14 +264,15 @@ if mode == "🔴 AT分析":
     unique_at = set(df['AT'].dropna().unique().tolist() + test_members)
     at_list = ["全体"] + sorted(list(df['AT'].dropna().unique()))
     selected_at = st.sidebar.selectbox("分析するATを選択", at_list)
-    
+
     if selected_at == "全体":
         at_df = df.dropna(subset=['AT'])
     else:
-        at_df = df[df['AT'] == selected_at]
-    
+        at_df = filter_by_date(cube.slice('AT', selected_at))
+
     st.header(f"👤 AT選手: {selected_at} の分析結果")
-    
+    at_key = view_key + ('AT', selected_at)
+
     # --- サマリー情報 ---
     col_info1, col_info2, col_info3 = st.columns(3)
     with col_info1:
@@ -367,152 +280,186 @@ if mode == "🔴 AT分析":
     with col_info2:
         st.metric("対戦したゴーリー数", at_df['ゴーリー'].nunique())
     with col_info3:
-        shot_total = len(at_df[at_df['終わり方'] == 'ショット'])
-        goals = len(at_df[at_df['結果'] == 'ゴール'])
+        shot_total = count_where(at_df, at_df['終わり方'] == 'ショット').sum()
+        goals = count_where(at_df, at_df['結果'] == 'ゴール').sum()
         shot_rate = (goals / shot_total * 100) if shot_total > 0 else 0
         st.metric("合計ショット率", f"{shot_rate:.1f}%")
 
-    # --- グラフセクション ---
+    # 以下はタブに分け、開いているタブの分だけ集計・グラフ作成を行う（sections.py）
     st.divider()
-    col_g1, col_g2, col_g3 = st.columns(3)
-    with col_g1:
-        st.subheader("📊 終わり方の傾向")
-        st.plotly_chart(px.pie(at_df, names='終わり方', hole=0.4), use_container_width=True)
-    with col_g2:
-        st.subheader("🔄 抜き方の傾向")
-        dodge_df = at_df[at_df['抜き方'] != "NULL"]
-        st.plotly_chart(px.pie(dodge_df, names='抜き方', hole=0.4), use_container_width=True)
-    with col_g3:
-            st.subheader("✋ ショットを打った手")
-            # 【修正点】NULLなどを排除し、「右手」「左手」に完全一致するものだけを円グラフにする
-            hand_df = at_df[at_df['利き手'].isin(['右手', '左手'])]
-            if not hand_df.empty:
-                st.plotly_chart(px.pie(hand_df, names='利き手', hole=0.4), use_container_width=True)
+    tab_trend, tab_pos, tab_table, tab_rank = lazy_tabs(
+        ["📊 傾向", "📍 位置・コース別 決定率", "📈 詳細データ集計表", "⚠️ 苦手なDF"], key="1on1_at_sections")
+
+    # --- グラフセクション ---
+    if is_open(tab_trend):
+        with tab_trend:
+            col_g1, col_g2, col_g3 = st.columns(3)
+            with col_g1:
+                st.subheader("📊 終わり方の傾向")
+                perf.plotly_chart(cached_figure(at_key + ('終わり方',), lambda: px.pie(at_df, names='終わり方', values='件数', hole=0.4)), use_container_width=True)
+            with col_g2:
+                st.subheader("🔄 抜き方の傾向")
+                dodge_df = at_df[at_df['抜き方'] != "NULL"]
+                perf.plotly_chart(cached_figure(at_key + ('抜き方',), lambda: px.pie(dodge_df, names='抜き方', values='件数', hole=0.4)), use_container_width=True)
+            with col_g3:
+                    st.subheader("✋ ショットを打った手")
+                    # 【修正点】NULLなどを排除し、「右手」「左手」に完全一致するものだけを円グラフにする
+                    hand_df = at_df[at_df['利き手'].isin(['右手', '左手'])]
+                    if not hand_df.empty:
+                        perf.plotly_chart(cached_figure(at_key + ('利き手',), lambda: px.pie(hand_df, names='利き手', values='件数', hole=0.4)), use_container_width=True)
+                    else:
+                        st.info("利き手のデータがありません。")
+
+    # --- 【修正】打った場所の2x5ヒートマップ・コース別 ---
+    if is_open(tab_pos):
+        with tab_pos:
+            st.subheader("📍 打った位置別のショット決定率")
+            if 'ショット位置' in at_df.columns:
+                perf.plotly_chart(create_shot_position_heatmap(at_df, mode="AT", title="どのエリアから決めているか (決定率)", key=at_key), use_container_width=True)
             else:
-                st.info("利き手のデータがありません。")
-                
-    # --- 【修正】打った場所の2x5ヒートマップ ---
-    st.divider()
-    st.subheader("📍 打った位置別のショット決定率")
-    if 'ショット位置' in at_df.columns:
-        st.plotly_chart(create_shot_position_heatmap(at_df, mode="AT", title="どのエリアから決めているか (決定率)"), use_container_width=True)
-    else:
-        st.info("スプレッドシートに「ショット位置」の列がまだありません。")
-    
-    # --- 表セクション ---
-    st.divider()
-    st.subheader("📈 詳細データ集計表")
-    col_t1, col_t2 = st.columns(2)
-    with col_t1:
-        st.write("**◆ 起点別ショット内訳**")
-        pos_stats = at_df[at_df['終わり方'] == 'ショット'].groupby('起点')['結果'].value_counts().unstack(fill_value=0)
-        for col in ['ゴール', 'セーブ', '枠外']:
-            if col not in pos_stats.columns: pos_stats[col] = 0
-        st.table(pos_stats[['ゴール', 'セーブ', '枠外']])
-    with col_t2:
-        st.write("**◆ 抜けたかどうか (起点×抜き方)**")
-        dodge_success = at_df.groupby(['起点', '抜き方']).size().unstack(fill_value=0)
-        st.table(dodge_success)
+                st.info("スプレッドシートに「ショット位置」の列がまだありません。")
 
-    st.divider()
-    st.subheader("🎯 コース別 ショット決定率 (3×3)")
-    # 【修正点】単純な回数ではなく、新たに作成した決定率ベースのヒートマップ関数を呼び出す
-    st.plotly_chart(create_at_course_heatmap(at_df, title="ゴール数 / ショット数 (決定率%)"), use_container_width=True)
+            st.divider()
+            st.subheader("🎯 コース別 ショット決定率 (3×3)")
+            # 【修正点】単純な回数ではなく、新たに作成した決定率ベースのヒートマップ関数を呼び出す
+            perf.plotly_chart(create_at_course_heatmap(at_df, title="ゴール数 / ショット数 (決定率%)", key=at_key), use_container_width=True)
+
+    # --- 表セクション ---
+    if is_open(tab_table):
+        with tab_table:
+            st.subheader("📈 詳細データ集計表")
+            def shot_breakdown():
+                pos_stats = at_df[at_df['終わり方'] == 'ショット'].groupby(['起点', '結果'], observed=True)['件数'].sum().unstack(fill_value=0)
+                pos_stats.columns = pos_stats.columns.astype(str) # カテゴリ列のままだと表の列見出しが扱いにくい
+                for col in ['ゴール', 'セーブ', '枠外']:
+                    if col not in pos_stats.columns: pos_stats[col] = 0
+                return pos_stats[['ゴール', 'セーブ', '枠外']]
+
+            def dodge_breakdown():
+                dodge_success = at_df.groupby(['起点', '抜き方'], observed=True)['件数'].sum().unstack(fill_value=0)
+                dodge_success.columns = dodge_success.columns.astype(str)
+                return dodge_success
+
+            col_t1, col_t2 = st.columns(2)
+            with col_t1:
+                st.write("**◆ 起点別ショット内訳**")
+                st.table(cached_table(at_key + ('起点別ショット内訳',), shot_breakdown))
+            with col_t2:
+                st.write("**◆ 抜けたかどうか (起点×抜き方)**")
+                st.table(cached_table(at_key + ('起点×抜き方',), dodge_breakdown))
 
     # ----------------------------------------------------
     # 【追加】ATの苦手なDFランキング
     # ----------------------------------------------------
-    st.divider()
-    if selected_at == "全体":
-        st.subheader("🏆 全DFのショット阻止率ランキング (AT全体がショットに行けなかった割合)")
-    else:
-        st.subheader(f"⚠️ {selected_at} の苦手なDFランキング (ショットに行けなかった割合)")
-        
-    # DFごとの対戦成績を計算
-    df_stats = at_df.groupby('DF').agg(
-        対戦数=('終わり方', 'count'),
-        ショット数=('終わり方', lambda x: (x == 'ショット').sum())
-    ).reset_index()
-    
-    df_stats['ショットに行けなかった数'] = df_stats['対戦数'] - df_stats['ショット数']
-    df_stats['ショットに行けなかった割合(%)'] = (df_stats['ショットに行けなかった数'] / df_stats['対戦数'] * 100).round(1)
-    
-    # 割合が高い順（苦手な順）にソート。割合が同じ場合は対戦数が多い順
-    df_stats = df_stats.sort_values(by=['ショットに行けなかった割合(%)', '対戦数'], ascending=[False, False])
-    df_stats = df_stats.reset_index(drop=True)
-    df_stats.index = df_stats.index + 1 # 順位を1からにする
-    
-    st.dataframe(df_stats, use_container_width=True)
+    if is_open(tab_rank):
+        with tab_rank:
+            if selected_at == "全体":
+                st.subheader("🏆 全DFのショット阻止率ランキング (AT全体がショットに行けなかった割合)")
+            else:
+                st.subheader(f"⚠️ {selected_at} の苦手なDFランキング (ショットに行けなかった割合)")
+
+            def weak_df_ranking():
+                # DFごとの対戦成績を計算
+                df_stats = load_matchups("AT×DF").for_row(
+                    None if selected_at == "全体" else selected_at, start_dt, end_dt
+                )[['対戦', 'ショット']].rename(columns={'対戦': '対戦数', 'ショット': 'ショット数'}).reset_index()
+
+                df_stats['ショットに行けなかった数'] = df_stats['対戦数'] - df_stats['ショット数']
+                df_stats['ショットに行けなかった割合(%)'] = (df_stats['ショットに行けなかった数'] / df_stats['対戦数'] * 100).round(1)
+
+                # 割合が高い順（苦手な順）にソート。割合が同じ場合は対戦数が多い順
+                df_stats = df_stats.sort_values(by=['ショットに行けなかった割合(%)', '対戦数'], ascending=[False, False])
+                df_stats = df_stats.reset_index(drop=True)
+                df_stats.index = df_stats.index + 1 # 順位を1からにする
+                return df_stats
+
+            st.dataframe(cached_table(at_key + ('苦手なDF',), weak_df_ranking), use_container_width=True)
 
 # --- 【🔵 DF個人分析】 ---
 elif mode == "🔵 DF分析":
     unique_df_names = set(df['DF'].dropna().unique().tolist() + test_members)
     df_list = ["全体"] + sorted(list(df['DF'].dropna().unique()))
     selected_df = st.sidebar.selectbox("分析するDFを選択", df_list)
-    
+
     if selected_df == "全体":
         target_df = df.dropna(subset=['DF']).copy()
     else:
-        target_df = df[df['DF'] == selected_df].copy()
-    
+        target_df = filter_by_date(cube.slice('DF', selected_df))
+
     st.header(f"🛡️ DF選手: {selected_df} の分析結果")
+    df_key = view_key + ('DF', selected_df)
 
     col_info1, col_info2, col_info3 = st.columns(3)
     with col_info1:
-        st.metric("総対戦数", len(target_df))
+        total = target_df['件数'].sum()
+        st.metric("総対戦数", total)
     with col_info2:
-        goals = len(target_df[target_df['結果'] == 'ゴール'])
-        stop_rate = ((len(target_df) - goals) / len(target_df) * 100) if len(target_df) > 0 else 0
+        goals = count_where(target_df, target_df['結果'] == 'ゴール').sum()
+        stop_rate = ((total - goals) / total * 100) if total > 0 else 0
         st.metric("トータル阻止率", f"{stop_rate:.1f}%")
     with col_info3:
         st.metric("対戦したAT数", target_df['AT'].nunique())
 
-    # --- 【修正】ショットを打たれた場所の2x5ヒートマップ ---
-    st.divider()
-    st.subheader("📍 ショットを打たれた位置の失点率")
-    if 'ショット位置' in target_df.columns:
-        st.plotly_chart(create_shot_position_heatmap(target_df, mode="DF", title="どのエリアからのショットで失点しやすいか (失点率)"), use_container_width=True)
-    else:
-        st.info("スプレッドシートに「ショット位置」の列がまだありません。")
-        
+    # 以下はタブに分け、開いているタブの分だけ集計・グラフ作成を行う（sections.py）
     st.divider()
-    st.subheader("📊 抜かれたかどうか (起点×抜き方)")
-    target_df['抜かれた'] = target_df['終わり方'].apply(lambda x: 1 if x == 'ショット' else 0)
-    target_df['抜かれなかった'] = target_df['終わり方'].apply(lambda x: 1 if x != 'ショット' else 0)
-    
-    df_pivot = pd.DataFrame(index=target_df['起点'].unique())
-    for d in ['イン抜き', 'アウト抜き']:
-        df_pivot[f"{d}で抜かれた"] = target_df[target_df['抜き方'] == d].groupby('起点')['抜かれた'].sum()
-    df_pivot = df_pivot.fillna(0).astype(int)
-    df_pivot['抜かれた合計'] = df_pivot.sum(axis=1)
-    df_pivot['抜かれなかった'] = target_df.groupby('起点')['抜かれなかった'].sum()
-    st.table(df_pivot)
+    tab_pos, tab_origin, tab_rank = lazy_tabs(
+        ["📍 被ショット位置", "📊 起点×抜き方", "⚠️ 苦手なAT"], key="1on1_df_sections")
 
-    # 【修正点】回数ではなく、割合（被ショット数 / その起点での対戦数）を表示するヒートマップに変更
-    st.plotly_chart(create_df_origin_ratio_heatmap(target_df, title="起点別 被ショット率マップ (3×3)"), use_container_width=True)
+    # --- 【修正】ショットを打たれた場所の2x5ヒートマップ ---
+    if is_open(tab_pos):
+        with tab_pos:
+            st.subheader("📍 ショットを打たれた位置の失点率")
+            if 'ショット位置' in target_df.columns:
+                perf.plotly_chart(create_shot_position_heatmap(target_df, mode="DF", title="どのエリアからのショットで失点しやすいか (失点率)", key=df_key), use_container_width=True)
+            else:
+                st.info("スプレッドシートに「ショット位置」の列がまだありません。")
+
+    if is_open(tab_origin):
+        with tab_origin:
+            st.subheader("📊 抜かれたかどうか (起点×抜き方)")
+            def origin_pivot():
+                marked = target_df.assign(
+                    抜かれた=count_where(target_df, target_df['終わり方'] == 'ショット'),
+                    抜かれなかった=count_where(target_df, target_df['終わり方'] != 'ショット'),
+                )
+
+                df_pivot = pd.DataFrame(index=marked['起点'].unique())
+                for d in ['イン抜き', 'アウト抜き']:
+                    df_pivot[f"{d}で抜かれた"] = marked[marked['抜き方'] == d].groupby('起点', observed=True)['抜かれた'].sum()
+                df_pivot = df_pivot.fillna(0).astype(int)
+                df_pivot['抜かれた合計'] = df_pivot.sum(axis=1)
+                df_pivot['抜かれなかった'] = marked.groupby('起点', observed=True)['抜かれなかった'].sum()
+                return df_pivot
+
+            st.table(cached_table(df_key + ('起点×抜き方',), origin_pivot))
+
+            # 【修正点】回数ではなく、割合（被ショット数 / その起点での対戦数）を表示するヒートマップに変更
+            perf.plotly_chart(create_df_origin_ratio_heatmap(target_df, title="起点別 被ショット率マップ (3×3)", key=df_key), use_container_width=True)
 
     # ----------------------------------------------------
     # 【追加】DFの苦手なATランキング
     # ----------------------------------------------------
-    st.divider()
-    if selected_df == "全体":
-        st.subheader("🏆 全ATの突破率ランキング (DF全体が抜かれた割合)")
-    else:
-        st.subheader(f"⚠️ {selected_df} の苦手なATランキング (抜かれた割合)")
-        
-    at_stats = target_df.groupby('AT').agg(
-        対戦数=('終わり方', 'count'),
-        抜かれた数=('終わり方', lambda x: (x == 'ショット').sum())
-    ).reset_index()
-    
-    at_stats['抜かれた割合(%)'] = (at_stats['抜かれた数'] / at_stats['対戦数'] * 100).round(1)
-    
-    # 抜かれた割合が高い順（苦手な順）にソート
-    at_stats = at_stats.sort_values(by=['抜かれた割合(%)', '対戦数'], ascending=[False, False])
-    at_stats = at_stats.reset_index(drop=True)
-    at_stats.index = at_stats.index + 1
-    
-    st.dataframe(at_stats, use_container_width=True)
+    if is_open(tab_rank):
+        with tab_rank:
+            if selected_df == "全体":
+                st.subheader("🏆 全ATの突破率ランキング (DF全体が抜かれた割合)")
+            else:
+                st.subheader(f"⚠️ {selected_df} の苦手なATランキング (抜かれた割合)")
+
+            def weak_at_ranking():
+                at_stats = load_matchups("AT×DF").for_col(
+                    None if selected_df == "全体" else selected_df, start_dt, end_dt
+                )[['対戦', 'ショット']].rename(columns={'対戦': '対戦数', 'ショット': '抜かれた数'}).reset_index()
+
+                at_stats['抜かれた割合(%)'] = (at_stats['抜かれた数'] / at_stats['対戦数'] * 100).round(1)
+
+                # 抜かれた割合が高い順（苦手な順）にソート
+                at_stats = at_stats.sort_values(by=['抜かれた割合(%)', '対戦数'], ascending=[False, False])
+                at_stats = at_stats.reset_index(drop=True)
+                at_stats.index = at_stats.index + 1
+                return at_stats
+
+            st.dataframe(cached_table(df_key + ('苦手なAT',), weak_at_ranking), use_container_width=True)
 
 # --- 【🟡 ゴーリー詳細分析】 ---
 elif mode == "🟡 ゴーリー分析":
@@ -523,13 +470,13 @@ elif mode == "🟡 ゴーリー分析":
     if selected_g == "全体":
         g_full_df = df.dropna(subset=['ゴーリー']).copy()
     else:
-        g_full_df = df[df['ゴーリー'] == selected_g].copy()
+        g_full_df = filter_by_date(cube.slice('ゴーリー', selected_g))
 
     unique_at_options = set(g_full_df['AT'].dropna().unique().tolist() + test_members)
     # 【新規】シューター（AT）選択プルダウン
     at_options = ["全体"] + sorted(list(g_full_df['AT'].dropna().unique()))
     selected_at = st.sidebar.selectbox("シューター(AT)を絞り込む", at_options)
-    
+
     # データのフィルタリング
     if selected_at == "全体":
         g_df = g_full_df
@@ -537,87 +484,112 @@ elif mode == "🟡 ゴーリー分析":
     else:
         g_df = g_full_df[g_full_df['AT'] == selected_at]
         header_name = selected_at
-    
+
     st.header(f"🧤 ゴーリー: {selected_g} (対 {header_name}) の分析結果")
+    g_key = view_key + ('ゴーリー', selected_g, 'AT', selected_at)
 
-    # --- 【修正】打たれた場所の2x5ヒートマップ ---
-    st.subheader("📍 打たれた位置別のセーブ率")
-    if 'ショット位置' in g_df.columns:
-        st.plotly_chart(create_shot_position_heatmap(g_df, mode="G", title="どのエリアからのショットを止めやすいか (セーブ率)"), use_container_width=True)
-    else:
-        st.info("スプレッドシートに「ショット位置」の列がまだありません。")
-        
-    st.subheader(f"📊 {header_name} に対するセーブ実績")
-    shot_results = g_df[g_df['結果'].isin(['ゴール', 'セーブ'])]
-    
-    if not shot_results.empty:
-        # シューター別のセーブ率算出
-        at_stats = shot_results.groupby('AT').agg(
-            対戦数=('結果', 'count'),
-            セーブ数=('結果', lambda x: (x == 'セーブ').sum())
-        ).reset_index()
-        at_stats['セーブ率(%)'] = (at_stats['セーブ数'] / at_stats['対戦数'] * 100).round(1)
-        at_stats['ラベル'] = at_stats['AT'] + " (" + at_stats['セーブ率(%)'].astype(str) + "%)"
-        
-        # 円グラフでセーブ成功の内訳を表示
-        fig_save_pie = px.pie(at_stats, values='セーブ数', names='ラベル', hole=0.4, title="誰のショットをよく止めているか")
-        st.plotly_chart(fig_save_pie, use_container_width=True)
-    else:
-        st.info("集計可能なショットデータがまだありません。")
+    # 以下はタブに分け、開いているタブの分だけ集計・グラフ作成を行う（sections.py）
+    tab_pos, tab_save, tab_rank = lazy_tabs(
+        ["📍 位置・コース別 セーブ率", "📊 セーブ実績・内訳", "⚠️ 苦手なAT"], key="1on1_g_sections")
 
-    st.divider()
+    # --- 【修正】打たれた場所の2x5ヒートマップ ---
+    if is_open(tab_pos):
+        with tab_pos:
+            st.subheader("📍 打たれた位置別のセーブ率")
+            if 'ショット位置' in g_df.columns:
+                perf.plotly_chart(create_shot_position_heatmap(g_df, mode="G", title="どのエリアからのショットを止めやすいか (セーブ率)", key=g_key), use_container_width=True)
+            else:
+                st.info("スプレッドシートに「ショット位置」の列がまだありません。")
+
+            st.divider()
+
+            # 3. ヒートマップセクション
+            col_h1, col_h2 = st.columns(2)
+            with col_h1:
+                # 【修正点】回数ではなく、割合（セーブ数 / その起点から打たれたショット数）の2x2マップ
+                perf.plotly_chart(create_goalie_origin_ratio_heatmap(g_df, title="起点別 セーブ率マップ (2×2)", key=g_key), use_container_width=True)
+            with col_h2:
+                # 【修正点】回数ではなく、割合（セーブ数 / そのコースに打たれたショット数）の3x3マップ
+                perf.plotly_chart(create_goalie_course_ratio_heatmap(g_df, title="コース別 セーブ率分布 (3×3)", key=g_key), use_container_width=True)
+
+    if is_open(tab_save):
+        with tab_save:
+            st.subheader(f"📊 {header_name} に対するセーブ実績")
+            shot_results = g_df[g_df['結果'].isin(['ゴール', 'セーブ'])]
+
+            if not shot_results.empty:
+                def save_pie():
+                    # シューター別のセーブ率算出
+                    at_stats = shot_results.assign(
+                        セーブ=count_where(shot_results, shot_results['結果'] == 'セーブ')
+                    ).groupby('AT', observed=True).agg(
+                        対戦数=('件数', 'sum'),
+                        セーブ数=('セーブ', 'sum')
+                    ).reset_index()
+                    at_stats['セーブ率(%)'] = (at_stats['セーブ数'] / at_stats['対戦数'] * 100).round(1)
+                    at_stats['ラベル'] = at_stats['AT'].astype(str) + " (" + at_stats['セーブ率(%)'].astype(str) + "%)"
+                    # 円グラフでセーブ成功の内訳を表示
+                    return px.pie(at_stats, values='セーブ数', names='ラベル', hole=0.4, title="誰のショットをよく止めているか")
+
+                # 集計ごとキャッシュする（同じゴーリー・AT・期間なら集計もやり直さない）
+                fig_save_pie = cached_figure(g_key + ('セーブ実績',), save_pie)
+                perf.plotly_chart(fig_save_pie, use_container_width=True)
+            else:
+                st.info("集計可能なショットデータがまだありません。")
 
-    # 2. 円グラフセクション
-    col_pie1, col_pie2 = st.columns(2)
-    with col_pie1:
-        st.subheader("🥯 シューター(AT)の割合")
-        fig_at_pie = px.pie(g_df, names='AT', hole=0.3, title="対戦したシューター分布")
-        st.plotly_chart(fig_at_pie, use_container_width=True)
-        
-    with col_pie2:
-        st.subheader("🥯 抜き方の割合")
-        dodge_df = g_df[g_df['抜き方'] != "NULL"]
-        fig_dodge_pie = px.pie(dodge_df, names='抜き方', hole=0.3, title="許した抜き方の分布")
-        st.plotly_chart(fig_dodge_pie, use_container_width=True)
+            st.divider()
 
-    st.divider()
+            # 2. 円グラフセクション
+            col_pie1, col_pie2 = st.columns(2)
+            with col_pie1:
+                st.subheader("🥯 シューター(AT)の割合")
+                fig_at_pie = cached_figure(g_key + ('シューター',), lambda: px.pie(g_df, names='AT', values='件数', hole=0.3, title="対戦したシューター分布"))
+                perf.plotly_chart(fig_at_pie, use_container_width=True)
 
-    # 3. ヒートマップセクション
-    col_h1, col_h2 = st.columns(2)
-    with col_h1:
-        # 【修正点】回数ではなく、割合（セーブ数 / その起点から打たれたショット数）の2x2マップ
-        st.plotly_chart(create_goalie_origin_ratio_heatmap(g_df, title="起点別 セーブ率マップ (2×2)"), use_container_width=True)
-    with col_h2:
-        # 【修正点】回数ではなく、割合（セーブ数 / そのコースに打たれたショット数）の3x3マップ
-        st.plotly_chart(create_goalie_course_ratio_heatmap(g_df, title="コース別 セーブ率分布 (3×3)"), use_container_width=True)
+            with col_pie2:
+                st.subheader("🥯 抜き方の割合")
+                dodge_df = g_df[g_df['抜き方'] != "NULL"]
+                fig_dodge_pie = cached_figure(g_key + ('抜き方',), lambda: px.pie(dodge_df, names='抜き方', values='件数', hole=0.3, title="許した抜き方の分布"))
+                perf.plotly_chart(fig_dodge_pie, use_container_width=True)
 
     # ----------------------------------------------------
     # 【追加】ゴーリーの苦手なATランキング
     # ----------------------------------------------------
-    st.divider()
-    if selected_g == "全体":
-        st.subheader("🏆 全ATの決定率ランキング (ゴーリー全体から見たセーブ率ワースト)")
-    else:
-        st.subheader(f"⚠️ {selected_g} の苦手なATランキング (セーブ率ワースト)")
-        
-    # ※特定のシューターで絞り込んでいる場合でも、ランキングは全員の中から出すため「g_full_df」を使用
-    g_full_shot_results = g_full_df[g_full_df['結果'].isin(['ゴール', 'セーブ'])]
-    
-    if not g_full_shot_results.empty:
-        g_ranking_stats = g_full_shot_results.groupby('AT').agg(
-            被ショット数=('結果', 'count'),
-            セーブ数=('結果', lambda x: (x == 'セーブ').sum())
-        ).reset_index()
-        
-        g_ranking_stats['セーブ率(%)'] = (g_ranking_stats['セーブ数'] / g_ranking_stats['被ショット数'] * 100).round(1)
-        
-        # セーブ率が低い順（苦手な順）にソート
-        g_ranking_stats = g_ranking_stats.sort_values(by=['セーブ率(%)', '被ショット数'], ascending=[True, False])
-        g_ranking_stats = g_ranking_stats.reset_index(drop=True)
-        g_ranking_stats.index = g_ranking_stats.index + 1
-        
-        st.dataframe(g_ranking_stats, use_container_width=True)
+    if is_open(tab_rank):
+        with tab_rank:
+            if selected_g == "全体":
+                st.subheader("🏆 全ATの決定率ランキング (ゴーリー全体から見たセーブ率ワースト)")
+            else:
+                st.subheader(f"⚠️ {selected_g} の苦手なATランキング (セーブ率ワースト)")
+
+            def weak_at_ranking():
+                # ※特定のシューターで絞り込んでいる場合でも、ランキングは全員の中から出す
+                g_ranking_stats = load_matchups("AT×ゴーリー").for_col(
+                    None if selected_g == "全体" else selected_g, start_dt, end_dt, present='被ショット'
+                )[['被ショット', 'セーブ']].rename(columns={'被ショット': '被ショット数', 'セーブ': 'セーブ数'}).reset_index()
+
+                g_ranking_stats['セーブ率(%)'] = (g_ranking_stats['セーブ数'] / g_ranking_stats['被ショット数'] * 100).round(1)
+
+                # セーブ率が低い順（苦手な順）にソート
+                g_ranking_stats = g_ranking_stats.sort_values(by=['セーブ率(%)', '被ショット数'], ascending=[True, False])
+                g_ranking_stats = g_ranking_stats.reset_index(drop=True)
+                g_ranking_stats.index = g_ranking_stats.index + 1
+                return g_ranking_stats
+
+            # ランキングはATの絞り込みに関係しないので、キーにATを含めない
+            g_ranking_stats = cached_table(view_key + ('ゴーリー', selected_g, '苦手なAT'), weak_at_ranking)
+            if not g_ranking_stats.empty:
+                st.dataframe(g_ranking_stats, use_container_width=True)
 # --- 【📊 全データ】 ---
 else:
     st.header("📊 全データ一覧")
-    st.dataframe(df.sort_values('タイムスタンプ', ascending=False))
+    # キューブには生の行が無いので、ここで初めて読み込む
+    with perf.span("load"):
+        rows_df = load_data()
+    # 並べ替え・絞り込みはサーバー側で行い、表示するページの行だけを渡す
+    browse("1on1app:all", rows_df, key="all", hidden=['件数'], sort='タイムスタンプ', start=start_dt, end=end_dt)
+
+# ==========================================
+# 処理時間（?perf=1 でサイドバーに表示・LAX_PERF_LOG に記録）
+# ==========================================
+perf.finish()
@@ -1,61 +1,71 @@
+import os
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import numpy as np
+from practice_data import (
+    load_freeshoot_sheet, load_freeshoot_sheet_cube, load_freeshoot_sheet_counts_cube, freeshoot_matchups, freeshoot_trends,
+)
+from data_fetch import per_version
+from heatmaps import ratio_grid, AREA_2x5, COURSE_3x3
+from time_index import time_range, time_bounds
+from trends import PERIODS
+from figure_cache import cached_figure, data_version, figure_builder
+import perf
+from refresher import current
+from data_browser import browse
+from sections import lazy_tabs, is_open
 
 # ページ設定
 st.set_page_config(page_title="フリシュー総合分析ダッシュボード", layout="wide", page_icon="🥍")
+perf.begin("app.py")
 st.title("🥍 フリシュー 総合戦略分析ダッシュボード")
 
 # ==========================================
 # 1. データの読み込み (Googleスプレッドシート)
 # ==========================================
-@st.cache_data(ttl=30)
+# 取得元のURL・列の整形は practice_data.py（1on1app.py・practice_app.py と共通）
+# スプレッドシートは追記のみなので、前回から増えた行だけをパース・整形して追加する
+# 取得はバックグラウンドの更新（refresher.py）が30秒ごとに行い、画面は最後に取得できた表をすぐ受け取る。
+# 取得元を待つのは起動直後の1回だけ。更新に失敗しても前の表を表示し続け、サイドバーに注意書きを出す
 def load_data():
-    RAW_URL = "https://docs.google.com/spreadsheets/d/1Bx8lfO0kx0771QewN3J92CL7P0_M-IRx92jXPW7ELqs/edit?usp=sharing"
-    if "/edit" in RAW_URL:
-        csv_url = RAW_URL.split("/edit")[0] + "/export?format=csv"
-    else:
-        csv_url = RAW_URL
-        
-    try:
-        df_raw = pd.read_csv(csv_url)
-        if df_raw.empty:
-            return pd.DataFrame()
-            
-        # 最初の7列を抜き出して名前を固定
-        df = df_raw.iloc[:, :7].copy()
-        df.columns = ['日時', 'ゴーリー', '背番号', '打つ位置', 'シュートエリア', 'コース', '結果']
-        
-        # データの整形
-        df['背番号'] = "#" + df['背番号'].astype(str).str.extract('(\d+)', expand=False).str.zfill(2)
-        df['日時_raw'] = pd.to_datetime(df['日時'], errors='coerce') # フィルター用に日時型を保持
-        df['日時'] = df['日時_raw'].dt.date
-        df['ゴール'] = (df['結果'] == 'ゴール').astype(int)
-        df['セーブ'] = (df['結果'] == 'セーブ').astype(int)
-        df['枠内'] = ((df['結果'] == 'ゴール') | (df['結果'] == 'セーブ')).astype(int)
-        
-        return df
-    except Exception as e:
-        st.error(f"データの読み込みに失敗しました: {e}")
-        return pd.DataFrame()
+    return current("freeshoot_sheet", load_freeshoot_sheet, pd.DataFrame())
+
+# 画面の集計は「日付×ゴーリー×シューター×位置×エリア×コース×結果」の件数キューブから行う。
+# キューブはデータの版ごとに1回だけ作られ、選手の切り替えはキューブの切り出しだけで済む。
+# 生の行は 📊 全データ を開いた時だけ使う。
+# 【集計モード】複数シーズン分のCSVなど、全行をメモリに載せたくない場合は
+# チャンクごとに読み込んで件数へ畳み込み、生の行を持たずにキューブを作る
+# （2回目からは、前回から追記された行だけを畳み込む）
+STREAMING_INGEST = os.environ.get("LAX_STREAMING_INGEST") == "1"
 
-raw_df = load_data()
+def build_cube():
+    if STREAMING_INGEST:
+        return load_freeshoot_sheet_counts_cube()
+    return load_freeshoot_sheet_cube()
+
+def load_cube():
+    return current("freeshoot_sheet:cube:streaming" if STREAMING_INGEST else "freeshoot_sheet:cube", build_cube)
+
+with perf.span("load"):
+    cube = load_cube()
+raw_df = cube.table if cube is not None else pd.DataFrame()
 
 if raw_df.empty:
     st.warning("データがまだ読み込めません。Unityアプリからデータを送信してください。")
-    st.stop()
+    perf.stop()
 
 # ==========================================
 # サイドバー：期間フィルター
 # ==========================================
 st.sidebar.header("📅 期間フィルター")
 
-valid_dates_df = raw_df.dropna(subset=['日時_raw'])
+# キューブの表は時刻順に並べてあるので、最初と最後の日付は両端を見るだけで分かる
+date_bounds = time_bounds(raw_df)
+start_dt, end_dt = None, None
 
-if not valid_dates_df.empty:
-    min_date = valid_dates_df['日時_raw'].min().date()
-    max_date = valid_dates_df['日時_raw'].max().date()
+if date_bounds is not None:
+    min_date, max_date = (t.date() for t in date_bounds)
     
     selected_date_range = st.sidebar.date_input(
         "分析する期間を選択",
@@ -69,63 +79,48 @@ if not valid_dates_df.empty:
             start_date, end_date = selected_date_range
             start_dt = pd.to_datetime(start_date)
             end_dt = pd.to_datetime(end_date) + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
-            df = raw_df[(raw_df['日時_raw'] >= start_dt) & (raw_df['日時_raw'] <= end_dt)].copy()
         elif len(selected_date_range) == 1:
             start_date = selected_date_range[0]
             start_dt = pd.to_datetime(start_date)
             end_dt = start_dt + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
-            df = raw_df[(raw_df['日時_raw'] >= start_dt) & (raw_df['日時_raw'] <= end_dt)].copy()
-        else:
-            df = raw_df.copy()
-    else:
-        df = raw_df.copy()
-else:
-    df = raw_df.copy()
+
+# 期間の絞り込みは時刻列の二分探索で行の範囲を求めて切り出すだけ（マスクもコピーも作らない）。
+# 返す表は元の表と中身を共有するので、画面側では書き換えないこと
+def filter_by_date(frame):
+    if start_dt is None:
+        return frame
+    return time_range(frame, start_dt, end_dt)
+
+df = filter_by_date(raw_df)
+
+# グラフのキャッシュのキー（データの版と期間）。選手・画面はグラフごとに足す
+view_key = (data_version(cube), start_dt, end_dt)
+
+# 苦手ランキング用の対戦表（シューター×ゴーリー）。データの版ごとに1回だけ作るので、
+# 選手・期間を切り替えても対戦表の行（列）を取り出して並べ替えるだけで済む
+def load_matchups():
+    return per_version("app:matchups", raw_df, freeshoot_matchups)["シューター×ゴーリー"]
+
+# 成績の合計と推移は、シューター・ゴーリーごとの日別の累積件数（データの版ごとに1回だけ作る）から求める。
+# 期間の合計は引き算1回、日・週・月の推移は区切りごとに引き算1回で、期間を動かしても行を読み直さない
+def load_trends(col):
+    return per_version("app:trends", raw_df, freeshoot_trends)[col]
 
 st.sidebar.markdown("---")
 
 # ==========================================
 # 2. 共通ヒートマップ関数
 # ==========================================
+# セルごとの集計は heatmaps.py（全セルを1パスで数える）。シューターは ゴール/件数、ゴーリーは セーブ/枠内
+# key=（データの版・期間・選手）を渡すと、集計ごとグラフを使い回す（figure_cache.py）
 
 # 2x5 シュートエリアヒートマップ
+@figure_builder
 def create_area_heatmap(data_df, title="", mode="shooter"):
-    # キーを文字列('1')に変更
-    area_map = {
-        '1': (0, 0), '2': (0, 1), '3': (0, 2), '4': (0, 3), '5': (0, 4),
-        '6': (1, 0), '7': (1, 1), '8': (1, 2), '9': (1, 3), '10': (1, 4)
-    }
-    z = np.zeros((2, 5))
-    text_labels = np.full((2, 5), "", dtype=object)
-
-    # ★ここを追加：空白(NaN)や小数(1.0)を、綺麗な文字列('1')に変換する
-    data_df = data_df.copy()
-    data_df['シュートエリア_clean'] = pd.to_numeric(data_df['シュートエリア'], errors='coerce').fillna(0).astype(int).astype(str)
-
-    for area_num, (r, c) in area_map.items():
-        # ★修正：綺麗な文字列の列から探す
-        area_data = data_df[data_df['シュートエリア_clean'] == area_num]
-        total = len(area_data)
-        
-        if total > 0:
-            if mode == "shooter":
-                success = area_data['ゴール'].sum()
-                rate = (success / total) * 100
-                label = f"[{area_num}]<br>{success}/{total}<br>({rate:.1f}%)"
-            else:
-                on_target = area_data['枠内'].sum()
-                if on_target > 0:
-                    saves = area_data['セーブ'].sum()
-                    rate = (saves / on_target) * 100
-                    label = f"[{area_num}]<br>{saves}/{on_target}<br>({rate:.1f}%)"
-                else:
-                    rate = 0
-                    label = f"[{area_num}]<br>0/0<br>(0.0%)"
-            z[r][c] = rate
-            text_labels[r][c] = label
-        else:
-            z[r][c] = 0
-            text_labels[r][c] = f"[{area_num}]<br>0/0<br>(0.0%)"
+    if mode == "shooter":
+        z, text_labels = ratio_grid(data_df['シュートエリア'], AREA_2x5, data_df['ゴール'], data_df['件数'], cell_labels=True)
+    else:
+        z, text_labels = ratio_grid(data_df['シュートエリア'], AREA_2x5, data_df['セーブ'], data_df['枠内'], cell_labels=True)
 
     colorscale = "Reds" if mode == "shooter" else "Blues"
     c_label = "決定率(%)" if mode == "shooter" else "セーブ率(%)"
@@ -140,42 +135,17 @@ def create_area_heatmap(data_df, title="", mode="shooter"):
     return fig
 
 # 3x3 コース別ヒートマップ
+@figure_builder
 def create_course_heatmap(data_df, title="", mode="shooter"):
-    grid_color = np.zeros((3, 3))
-    grid_text = np.empty((3, 3), dtype=object)
-    mapping = {
-        '1': (0, 0), '2': (0, 1), '3': (0, 2),
-        '4': (1, 0), '5': (1, 1), '6': (1, 2),
-        '7': (2, 0), '8': (2, 1), '9': (2, 2)
-    }
-    
-    data_df = data_df.copy()
-    data_df['コース_clean'] = pd.to_numeric(data_df['コース'], errors='coerce').fillna(0).astype(int).astype(str)
-    
-    for course_num, (r, c) in mapping.items():
-        course_data = data_df[data_df['コース_clean'] == course_num]
-        
-        if mode == "shooter":
-            total_shots = len(course_data)
-            success = len(course_data[course_data['結果'] == 'ゴール'])
-            colorscale = 'Reds'
-            c_label = "決定率(%)"
-            base_total = total_shots
-        else:
-            on_target_data = course_data[course_data['枠内'] == 1]
-            base_total = len(on_target_data)
-            success = len(on_target_data[on_target_data['結果'] == 'セーブ'])
-            colorscale = 'Blues'
-            c_label = "セーブ率(%)"
-            
-        if base_total > 0:
-            rate = (success / base_total) * 100
-            grid_color[r, c] = rate
-            grid_text[r, c] = f"{success}/{base_total}<br>({rate:.1f}%)"
-        else:
-            grid_color[r, c] = 0
-            grid_text[r, c] = "0/0<br>(0.0%)"
-            
+    if mode == "shooter":
+        grid_color, grid_text = ratio_grid(data_df['コース'], COURSE_3x3, data_df['ゴール'], data_df['件数'])
+        colorscale = 'Reds'
+        c_label = "決定率(%)"
+    else:
+        grid_color, grid_text = ratio_grid(data_df['コース'], COURSE_3x3, data_df['セーブ'], data_df['枠内'])
+        colorscale = 'Blues'
+        c_label = "セーブ率(%)"
+
     fig = px.imshow(
         grid_color, labels=dict(x="左右", y="位置", color=c_label),
         x=['左', '中', '右'], y=['上', '中', '下'], color_continuous_scale=colorscale, title=title
@@ -184,6 +154,14 @@ def create_course_heatmap(data_df, title="", mode="shooter"):
     fig.update_layout(width=450, height=450, coloraxis_showscale=True)
     return fig
 
+# 日・週・月ごとの 率 = num/den の推移（trend は DailyTotals.trend の表）
+@figure_builder
+def create_trend_chart(trend, num, den, title=""):
+    trend = trend.assign(率=trend[num] / trend[den])
+    fig = px.line(trend, x='日時', y='率', markers=True, title=title)
+    fig.update_layout(yaxis=dict(tickformat=".0%", range=[-0.1, 1.1]))
+    return fig
+
 # ==========================================
 # 3. サイドバー (分析モード切替)
 # ==========================================
@@ -198,16 +176,18 @@ mode = st.sidebar.radio("表示モード", ["🏢 チーム全体", "🔴 シュ
 if mode == "🏢 チーム全体":
     st.header("🏢 チーム全体の成績")
     
+    team = load_trends('背番号').totals(None, start_dt, end_dt)
+    total = team['件数']
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("総シュート数", f"{len(df)} 本")
+        st.metric("総シュート数", f"{total} 本")
     with col2:
-        goals = df['ゴール'].sum()
-        rate = (goals / len(df) * 100) if len(df) > 0 else 0
+        goals = team['ゴール']
+        rate = (goals / total * 100) if total > 0 else 0
         st.metric("総ゴール数 (決定率)", f"{goals} 本 ({rate:.1f}%)")
     with col3:
-        saves = df['セーブ'].sum()
-        on_target = df['枠内'].sum()
+        saves = team['セーブ']
+        on_target = team['枠内']
         save_rate = (saves / on_target * 100) if on_target > 0 else 0
         st.metric("チーム全体セーブ率", f"{save_rate:.1f}%")
 
@@ -215,9 +195,9 @@ if mode == "🏢 チーム全体":
     st.subheader("📍 チーム得点傾向 (エリア・コース)")
     col_h1, col_h2 = st.columns([3, 2])
     with col_h1:
-        st.plotly_chart(create_area_heatmap(df, title="どのエリアから決めているか", mode="shooter"), use_container_width=True)
+        perf.plotly_chart(create_area_heatmap(df, title="どのエリアから決めているか", mode="shooter", key=view_key), use_container_width=True)
     with col_h2:
-        st.plotly_chart(create_course_heatmap(df, title="どのコースに決めているか", mode="shooter"), use_container_width=True)
+        perf.plotly_chart(create_course_heatmap(df, title="どのコースに決めているか", mode="shooter", key=view_key), use_container_width=True)
 
 # --- 【🔴 シューター分析】 ---
 elif mode == "🔴 シューター分析":
@@ -228,49 +208,60 @@ elif mode == "🔴 シューター分析":
         s_df = df.copy()
         st.header("🔴 シューター全員 の分析結果")
     else:
-        s_df = df[df['背番号'] == selected_shooter].copy()
+        s_df = filter_by_date(cube.slice('背番号', selected_shooter))
         st.header(f"👤 シューター: {selected_shooter} の分析結果")
+    s_key = view_key + ('背番号', selected_shooter)
+    s_player = None if selected_shooter == "全体" else selected_shooter
         
+    s_totals = load_trends('背番号').totals(s_player, start_dt, end_dt)
+    total = s_totals['件数']
     col_info1, col_info2, col_info3 = st.columns(3)
     with col_info1:
-        st.metric("総シュート数", len(s_df))
+        st.metric("総シュート数", total)
     with col_info2:
-        goals = s_df['ゴール'].sum()
-        rate = (goals / len(s_df) * 100) if len(s_df) > 0 else 0
+        goals = s_totals['ゴール']
+        rate = (goals / total * 100) if total > 0 else 0
         st.metric("ゴール数", goals)
     with col_info3:
         st.metric("ショット決定率", f"{rate:.1f}%")
 
+    # 以下はタブに分け、開いているタブの分だけ集計・グラフ作成を行う（sections.py）
     st.divider()
-    col_t1, col_t2 = st.columns([3, 2])
-    with col_t1:
-        st.subheader("📈 決定率の推移")
-        trend = s_df.groupby('日時').agg(率=('ゴール', 'mean')).reset_index()
-        fig_trend = px.line(trend, x='日時', y='率', markers=True, title="日別の決定率変化")
-        fig_trend.update_layout(yaxis=dict(tickformat=".0%", range=[-0.1, 1.1]))
-        st.plotly_chart(fig_trend, use_container_width=True)
-    with col_t2:
-        st.subheader("📊 結果の内訳")
-        st.plotly_chart(px.pie(s_df, names='結果', hole=0.4, title="シュート結果"), use_container_width=True)
+    tab_trend, tab_pos, tab_rank = lazy_tabs(
+        ["📈 推移・内訳", "📍 位置・コース別 決定率", "🏆 苦手なゴーリー"], key="app_shooter_sections")
 
-    st.divider()
-    st.subheader("📍 打った位置とコースの決定率")
-    col_h1, col_h2 = st.columns([3, 2])
-    with col_h1:
-        st.plotly_chart(create_area_heatmap(s_df, title="打ったエリア別の決定率", mode="shooter"), use_container_width=True)
-    with col_h2:
-        st.plotly_chart(create_course_heatmap(s_df, title="コース別の決定率", mode="shooter"), use_container_width=True)
+    if is_open(tab_trend):
+        with tab_trend:
+            col_t1, col_t2 = st.columns([3, 2])
+            with col_t1:
+                st.subheader("📈 決定率の推移")
+                s_period = st.radio("集計の単位", list(PERIODS), horizontal=True, key="s_trend_period")
+                s_trend = load_trends('背番号').trend(s_player, start_dt, end_dt, s_period, present='件数')
+                perf.plotly_chart(create_trend_chart(s_trend, 'ゴール', '件数', title=f"{s_period}別の決定率変化", key=s_key), use_container_width=True)
+            with col_t2:
+                st.subheader("📊 結果の内訳")
+                fig_pie = cached_figure(s_key + ('結果の内訳',), lambda: px.pie(s_df, names='結果', values='件数', hole=0.4, title="シュート結果"))
+                perf.plotly_chart(fig_pie, use_container_width=True)
 
-    st.divider()
-    st.subheader("🏆 苦手なゴーリーランキング (シュートを止められた割合)")
-    g_stats = s_df[s_df['枠内']==1].groupby('ゴーリー').agg(
-        枠内シュート数=('枠内', 'count'),
-        セーブされた数=('セーブ', 'sum')
-    ).reset_index()
-    g_stats['阻止された割合(%)'] = (g_stats['セーブされた数'] / g_stats['枠内シュート数'] * 100).round(1)
-    g_stats = g_stats.sort_values(by=['阻止された割合(%)', '枠内シュート数'], ascending=[False, False]).reset_index(drop=True)
-    g_stats.index = g_stats.index + 1
-    st.dataframe(g_stats, use_container_width=True)
+    if is_open(tab_pos):
+        with tab_pos:
+            st.subheader("📍 打った位置とコースの決定率")
+            col_h1, col_h2 = st.columns([3, 2])
+            with col_h1:
+                perf.plotly_chart(create_area_heatmap(s_df, title="打ったエリア別の決定率", mode="shooter", key=s_key), use_container_width=True)
+            with col_h2:
+                perf.plotly_chart(create_course_heatmap(s_df, title="コース別の決定率", mode="shooter", key=s_key), use_container_width=True)
+
+    if is_open(tab_rank):
+        with tab_rank:
+            st.subheader("🏆 苦手なゴーリーランキング (シュートを止められた割合)")
+            g_stats = load_matchups().for_row(
+                None if selected_shooter == "全体" else selected_shooter, start_dt, end_dt, unknown=True, present='枠内'
+            )[['枠内', 'セーブ']].rename(columns={'枠内': '枠内シュート数', 'セーブ': 'セーブされた数'}).reset_index()
+            g_stats['阻止された割合(%)'] = (g_stats['セーブされた数'] / g_stats['枠内シュート数'] * 100).round(1)
+            g_stats = g_stats.sort_values(by=['阻止された割合(%)', '枠内シュート数'], ascending=[False, False]).reset_index(drop=True)
+            g_stats.index = g_stats.index + 1
+            st.dataframe(g_stats, use_container_width=True)
 
 # --- 【🔵 ゴーリー分析】 ---
 elif mode == "🔵 ゴーリー分析":
@@ -281,54 +272,72 @@ elif mode == "🔵 ゴーリー分析":
         g_df = df.copy()
         st.header("🔵 ゴーリー全員 の分析結果")
     else:
-        g_df = df[df['ゴーリー'] == selected_g].copy()
+        g_df = filter_by_date(cube.slice('ゴーリー', selected_g))
         st.header(f"🧤 ゴーリー: {selected_g} の分析結果")
+    g_key = view_key + ('ゴーリー', selected_g)
+    g_player = None if selected_g == "全体" else selected_g
         
-    on_target_df = g_df[g_df['枠内'] == 1].copy()
+    g_totals = load_trends('ゴーリー').totals(g_player, start_dt, end_dt)
+    on_target = g_totals['枠内']
     
     col_info1, col_info2, col_info3 = st.columns(3)
     with col_info1:
-        st.metric("被枠内シュート数", len(on_target_df))
+        st.metric("被枠内シュート数", on_target)
     with col_info2:
-        saves = on_target_df['セーブ'].sum()
+        saves = g_totals['セーブ']
         st.metric("セーブ数", saves)
     with col_info3:
-        rate = (saves / len(on_target_df) * 100) if len(on_target_df) > 0 else 0
+        rate = (saves / on_target * 100) if on_target > 0 else 0
         st.metric("セーブ率", f"{rate:.1f}%")
 
+    # 以下はタブに分け、開いているタブの分だけ集計・グラフ作成を行う（sections.py）
     st.divider()
-    col_t1, col_t2 = st.columns([3, 2])
-    with col_t1:
-        st.subheader("📈 セーブ率の推移")
-        trend = on_target_df.groupby('日時').agg(率=('セーブ', 'mean')).reset_index()
-        fig_trend = px.line(trend, x='日時', y='率', markers=True, title="日別のセーブ率変化")
-        fig_trend.update_layout(yaxis=dict(tickformat=".0%", range=[-0.1, 1.1]))
-        st.plotly_chart(fig_trend, use_container_width=True)
-    with col_t2:
-        st.subheader("🥯 シュートを打ってきた選手")
-        st.plotly_chart(px.pie(g_df, names='背番号', hole=0.3, title="対戦したシューター分布"), use_container_width=True)
+    tab_trend, tab_pos, tab_rank = lazy_tabs(
+        ["📈 推移・対戦シューター", "📍 位置・コース別 セーブ率", "⚠️ 苦手なシューター"], key="app_goalie_sections")
 
-    st.divider()
-    st.subheader("📍 打たれた位置とコースのセーブ率")
-    col_h1, col_h2 = st.columns([3, 2])
-    with col_h1:
-        st.plotly_chart(create_area_heatmap(g_df, title="エリア別 セーブ率マップ", mode="goalie"), use_container_width=True)
-    with col_h2:
-        st.plotly_chart(create_course_heatmap(g_df, title="コース別 セーブ率マップ", mode="goalie"), use_container_width=True)
+    if is_open(tab_trend):
+        with tab_trend:
+            col_t1, col_t2 = st.columns([3, 2])
+            with col_t1:
+                st.subheader("📈 セーブ率の推移")
+                g_period = st.radio("集計の単位", list(PERIODS), horizontal=True, key="g_trend_period")
+                g_trend = load_trends('ゴーリー').trend(g_player, start_dt, end_dt, g_period, present='枠内')
+                perf.plotly_chart(create_trend_chart(g_trend, 'セーブ', '枠内', title=f"{g_period}別のセーブ率変化", key=g_key), use_container_width=True)
+            with col_t2:
+                st.subheader("🥯 シュートを打ってきた選手")
+                fig_pie = cached_figure(g_key + ('対戦したシューター',), lambda: px.pie(g_df, names='背番号', values='件数', hole=0.3, title="対戦したシューター分布"))
+                perf.plotly_chart(fig_pie, use_container_width=True)
 
-    st.divider()
-    st.subheader("⚠️ 苦手なシューターランキング (失点してしまった割合)")
-    s_stats = on_target_df.groupby('背番号').agg(
-        被枠内シュート=('枠内', 'count'),
-        失点数=('ゴール', 'sum')
-    ).reset_index()
-    s_stats['失点率(%)'] = (s_stats['失点数'] / s_stats['被枠内シュート'] * 100).round(1)
-    s_stats = s_stats.sort_values(by=['失点率(%)', '被枠内シュート'], ascending=[False, False]).reset_index(drop=True)
-    s_stats.index = s_stats.index + 1
-    st.dataframe(s_stats, use_container_width=True)
+    if is_open(tab_pos):
+        with tab_pos:
+            st.subheader("📍 打たれた位置とコースのセーブ率")
+            col_h1, col_h2 = st.columns([3, 2])
+            with col_h1:
+                perf.plotly_chart(create_area_heatmap(g_df, title="エリア別 セーブ率マップ", mode="goalie", key=g_key), use_container_width=True)
+            with col_h2:
+                perf.plotly_chart(create_course_heatmap(g_df, title="コース別 セーブ率マップ", mode="goalie", key=g_key), use_container_width=True)
+
+    if is_open(tab_rank):
+        with tab_rank:
+            st.subheader("⚠️ 苦手なシューターランキング (失点してしまった割合)")
+            s_stats = load_matchups().for_col(
+                None if selected_g == "全体" else selected_g, start_dt, end_dt, unknown=True, present='枠内'
+            )[['枠内', 'ゴール']].rename(columns={'枠内': '被枠内シュート', 'ゴール': '失点数'}).reset_index()
+            s_stats['失点率(%)'] = (s_stats['失点数'] / s_stats['被枠内シュート'] * 100).round(1)
+            s_stats = s_stats.sort_values(by=['失点率(%)', '被枠内シュート'], ascending=[False, False]).reset_index(drop=True)
+            s_stats.index = s_stats.index + 1
+            st.dataframe(s_stats, use_container_width=True)
 
 # --- 【📊 全データ】 ---
 else:
     st.header("📊 全データ一覧")
-    st.dataframe(df.drop(columns=['日時_raw']).sort_values('日時', ascending=False), use_container_width=True)
+    # キューブには生の行が無いので、ここで初めて読み込む
+    with perf.span("load"):
+        rows_df = load_data()
+    # 並べ替え・絞り込みはサーバー側で行い、表示するページの行だけを渡す
+    browse("app:all", rows_df, key="all", hidden=['日時_raw', '件数'], sort='日時', start=start_dt, end=end_dt)
 
+# ==========================================
+# 処理時間（?perf=1 でサイドバーに表示・LAX_PERF_LOG に記録）
+# ==========================================
+perf.finish()
@@ -0,0 +1,6 @@
+# ==========================================
+# ベンチマーク（合成データの生成と、各ダッシュボードの計算経路の計測）
+# ==========================================
+# python -m bench.synth  … 合成データを bench/data/ に書き出す
+# python -m bench.run    … 読み込み・整形・絞り込み・集計・グラフ作成の時間とメモリを計る
+# python -m bench.rerun  … 各アプリを AppTest で動かし、画面ごとの再実行の時間（p50・p95）を計る
@@ -0,0 +1,226 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import unicodedata
+import warnings
+from datetime import datetime, timezone
+from io import BytesIO
+from unittest import mock
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# ==========================================
+# 再実行のレイテンシ計測（Streamlit AppTest でアプリを画面なしで動かす）
+# ==========================================
+# 各アプリを AppTest で起動し、サイドバーのラジオ（表示モード・練習種目・メニュー）の全ての値と、
+# その画面にあるセレクトボックス（選手・試合）・開いた分だけ計算するタブの全ての値を順に選んで、
+# 1回の再実行（at.run()）の時間を測る。
+# データは bench/synth.py の合成データ（bench/data/<size>/）を、取得元の代わりに
+#   スプレッドシート : urllib.request.urlopen を差し替えてファイルを返す
+#   S3               : data_fetch のS3クライアントをローカルの代わり（get_object だけ）にする
+#   試合のDB         : 一時ディレクトリの SQLite に試合のJSONを取り込む（保存済みの試合から選ぶ）
+# で渡す。スナップショットも一時ディレクトリに書き、.cache/ の本物には触れない。
+#
+#   python -m bench.rerun                          # 全アプリ・10万行・3周
+#   python -m bench.rerun --apps app.py --size 1k  # アプリ・データ量を絞る
+#   python -m bench.rerun --json rerun.json        # 結果（1回ごとの時間）を保存
+APPS = ("app.py", "1on1app.py", "practice_app.py", "match-dashboard.py")
+
+
+# ==========================================
+# 取得元の代わり
+# ==========================================
+class LocalS3:
+    """S3クライアントの代わり（get_object だけ。ETag が同じなら 304 を返す）"""
+
+    def __init__(self, objects: dict):
+        now = datetime.now(timezone.utc)
+        self._objects = {key: (body, '"%s"' % hashlib.md5(body).hexdigest(), now) for key, body in objects.items()}
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None, IfModifiedSince=None):
+        from botocore.exceptions import ClientError
+        if Key not in self._objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        body, etag, modified = self._objects[Key]
+        if IfNoneMatch == etag or (IfModifiedSince is not None and IfModifiedSince >= modified):
+            raise ClientError({"Error": {"Code": "304"}, "ResponseMetadata": {"HTTPStatusCode": 304}}, "GetObject")
+        return {"Body": BytesIO(body), "ETag": etag, "LastModified": modified}
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def stand_ins(data_dir: str, tmp: str):
+    """合成データを取得元の代わりに渡す準備をし、urlopen の差し替えを返す（モジュールの読み込み前に呼ぶ）"""
+    os.environ["LAX_SNAPSHOT_DIR"] = os.path.join(tmp, "snapshots")
+    os.environ["LAX_MATCH_DB"] = os.path.join(tmp, "match_store.sqlite")
+    os.environ.setdefault("AWS_DEFAULT_REGION", "ap-northeast-1")
+
+    import data_fetch
+    import match_store
+    import practice_data as pd_
+
+    pages = {
+        pd_.FREESHOOT_SHEET_URL: _read(os.path.join(data_dir, "freeshoot_sheet.csv")),
+        pd_.ONE_ON_ONE_SHEET_URL: _read(os.path.join(data_dir, "1on1_sheet.csv")),
+        pd_.ONE_ON_ONE_RECORDER_URL: _read(os.path.join(data_dir, "1on1_recorder.csv")),
+    }
+    objects = {pd_.S3_KEY_FS: _read(os.path.join(data_dir, "freeshoot_recorder.csv"))}
+    for key in pd_.KEYS_6on6:
+        objects[key] = _read(os.path.join(data_dir, key.rsplit("/", 1)[-1]))
+    data_fetch._client = LocalS3(objects)
+
+    matches = os.path.join(data_dir, "matches")
+    if os.path.isdir(matches):
+        match_store.import_folder(matches)
+
+    def urlopen(url, *args, **kwargs):
+        url = url if isinstance(url, str) else url.full_url
+        if url not in pages:
+            raise OSError(f"合成データがありません: {url}")
+        return BytesIO(pages[url])
+    return mock.patch("urllib.request.urlopen", urlopen)
+
+
+# ==========================================
+# 画面の巡回
+# ==========================================
+class Recorder:
+    """アプリごとの再実行1回ずつの時間（ms）と例外"""
+
+    def __init__(self, app: str):
+        self.app = app
+        self.samples = []   # {"app", "pass", "interaction", "value", "ms", "error"}
+
+    def run(self, at, n_pass: int, interaction: str, value=None):
+        t0 = time.perf_counter()
+        at.run()
+        ms = (time.perf_counter() - t0) * 1000
+        error = str(at.exception[0].value)[:200] if len(at.exception) else None
+        self.samples.append({"app": self.app, "pass": n_pass, "interaction": interaction,
+                             "value": str(value), "ms": ms, "error": error})
+
+
+def _options(widget, limit: int):
+    """(位置, 表示名) の並び。値は表示名ではなく位置で選ぶ（format_func のあるセレクトボックスもあるため）"""
+    options = list(enumerate(widget.options))
+    return options if not limit else options[:limit]
+
+
+def _tab_keys(at) -> list:
+    """開いたタブだけを計算するタブ（sections.lazy_tabs）の key。値は今開いているタブの名前"""
+    labels = {t.label for t in at.tabs}
+    return [k for k, v in at.session_state.items() if isinstance(v, str) and v in labels]
+
+
+def walk(at, rec: Recorder, n_pass: int, limit: int, depth: int = 0, path: str = ""):
+    """ラジオを外側から順に全ての値にし、一番内側の画面ではセレクトボックスの全ての値と全てのタブを選ぶ"""
+    radios = list(at.sidebar.radio)
+    if depth < len(radios):
+        label = radios[depth].label
+        for option in radios[depth].options:
+            at.sidebar.radio[depth].set_value(option)
+            rec.run(at, n_pass, f"{path}{label} → {option}", option)
+            walk(at, rec, n_pass, limit, depth + 1, f"{path}{option} › ")
+        return
+    for i, box in enumerate(list(at.sidebar.selectbox)):
+        for j, option in _options(box, limit):
+            at.sidebar.selectbox[i].select_index(j)
+            rec.run(at, n_pass, f"{path}{box.label}", option)
+    for key in _tab_keys(at):
+        for tab in [t.label for t in at.tabs]:
+            at.session_state[key] = tab
+            rec.run(at, n_pass, f"{path}タブ → {tab}", tab)
+
+
+def drive(app: str, passes: int, limit: int, timeout: float) -> list:
+    from streamlit.testing.v1 import AppTest
+    rec = Recorder(app)
+    at = AppTest.from_file(os.path.join(ROOT, app), default_timeout=timeout)
+    rec.run(at, 0, "起動")
+    if app == "match-dashboard.py" and len(at.sidebar.selectbox) and len(at.sidebar.selectbox[0].options) > 1:
+        # アップロードの代わりに、保存済みの最初の試合を表示した状態から始める
+        at.sidebar.selectbox[0].select_index(1)
+        rec.run(at, 0, f"起動 › {at.sidebar.selectbox[0].label}", at.sidebar.selectbox[0].options[1])
+    for n_pass in range(1, passes + 1):
+        walk(at, rec, n_pass, limit)
+    return rec.samples
+
+
+# ==========================================
+# 集計・表示
+# ==========================================
+def _pad(s: str, width: int) -> str:
+    """全角文字を2桁として左寄せする"""
+    return s + " " * max(0, width - sum(2 if unicodedata.east_asian_width(c) in "WF" else 1 for c in s))
+
+
+def summarize(samples: list) -> list:
+    """アプリ・操作ごとの回数・p50・p95・最大（ms）と、1周目（キャッシュが冷えた状態。cold）の中央値"""
+    groups = {}
+    for s in samples:
+        groups.setdefault((s["app"], s["interaction"]), []).append(s)
+    rows = []
+    for (app, interaction), group in groups.items():
+        ms = np.array([s["ms"] for s in group])
+        cold = [s["ms"] for s in group if s["pass"] <= 1]
+        rows.append({
+            "app": app, "interaction": interaction, "n": len(ms),
+            "p50": float(np.percentile(ms, 50)), "p95": float(np.percentile(ms, 95)), "max": float(ms.max()),
+            "cold_p50": float(np.median(cold)) if cold else None,
+            "errors": sum(1 for s in group if s["error"]),
+        })
+    return rows
+
+
+def print_summary(rows: list):
+    header = f"{_pad('app', 20)} {_pad('interaction', 56)} {'n':>4} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'cold p50':>9} {'err':>4}"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        cold = "" if r["cold_p50"] is None else f"{r['cold_p50']:.0f}"
+        print(f"{_pad(r['app'], 20)} {_pad(r['interaction'], 56)} {r['n']:>4} {r['p50']:>9.0f} {r['p95']:>9.0f} "
+              f"{r['max']:>9.0f} {cold:>9} {r['errors'] or '':>4}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streamlit の再実行のレイテンシ（AppTest・合成データ）")
+    parser.add_argument("--apps", default=",".join(APPS), help="計測するアプリ（カンマ区切り）")
+    parser.add_argument("--size", default="100k", help="合成データの行数（1k, 100k, 1m または数値）")
+    parser.add_argument("--passes", type=int, default=3, help="全画面を巡回する回数")
+    parser.add_argument("--max-options", type=int, default=0, help="セレクトボックスごとに選ぶ値の上限（0 は全て）")
+    parser.add_argument("--timeout", type=float, default=300, help="1回の再実行のタイムアウト（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="1回ごとの時間を JSON で保存するパス")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    warnings.filterwarnings("ignore")
+    from bench import synth
+    data_dir = os.path.join(synth.DATA_DIR, args.size)
+    if not os.path.isdir(data_dir):
+        synth.write_dataset(args.size, synth.SIZES.get(args.size) or int(args.size), seed=args.seed)
+
+    samples = []
+    with tempfile.TemporaryDirectory(prefix="lax-rerun-") as tmp, stand_ins(data_dir, tmp):
+        for app in args.apps.split(","):
+            samples += drive(app, args.passes, args.max_options, args.timeout)
+
+    rows = summarize(samples)
+    print_summary(rows)
+    failed = [s for s in samples if s["error"]]
+    if failed:
+        print(f"\n例外 {len(failed)} 件（最初）: {failed[0]['app']} {failed[0]['interaction']}={failed[0]['value']}: {failed[0]['error']}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"summary": rows, "samples": samples}, f, ensure_ascii=False, indent=1)
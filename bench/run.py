@@ -0,0 +1,361 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import unicodedata
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import match_data
+import match_store
+from bench import synth
+from heatmaps import ratio_grid, AREA_2x5, COURSE_3x3, ORIGIN_3x3, ORIGIN_2x2
+from practice_data import (
+    KEYS_6on6, NORMALIZERS_6on6,
+    normalize_freeshoot_sheet, normalize_freeshoot_recorder, normalize_1on1,
+    freeshoot_cube, one_on_one_cube, freeshoot_matchups, freeshoot_trends, one_on_one_matchups,
+)
+from time_index import sort_by_time, time_bounds, time_range
+
+# ==========================================
+# 計算経路のベンチマーク（全ダッシュボード）
+# ==========================================
+# 合成データ（bench/synth.py）を取得元と同じ形（CSV・JSONのバイト列）で用意し、
+#   load      : バイト列 → DataFrame（pd.read_csv / json）
+#   normalize : 列名・表記・型をそろえる（practice_data・match_data）
+#   index     : 時刻順の並べ替え・件数キューブ・対戦表（データの版ごとに1回）
+#   filter    : 期間（最後の1/3）と選手（最も記録の多い選手）の絞り込み
+#   aggregate : 画面ごとの集計（ヒートマップ・円グラフ・推移・ランキング）
+#   figure    : グラフを作って JSON にする（st.plotly_chart・グラフのキャッシュと同じ）
+# の時間（中央値）と、tracemalloc で測った確保メモリのピークを、画面（表示モード）ごとに出す。
+#
+#   python -m bench.run --sizes 1k,100k         # 結果を表で表示
+#   python -m bench.run --json bench/base.json  # 結果を保存（以後の変更の比較用）
+#   python -m bench.run --baseline bench/base.json  # 保存した結果との比（今回 / 基準）も表示
+
+
+# ==========================================
+# 計測
+# ==========================================
+class Suite:
+    """段階ごとの時間・メモリを記録する"""
+
+    def __init__(self, label: str, rows: int, repeat: int, memory: bool):
+        self.label, self.rows_n, self.repeat, self.memory = label, rows, repeat, memory
+        self.results = []
+
+    def measure(self, dashboard: str, view: str, stage: str, fn):
+        """fn() を repeat 回実行して中央値を記録し、最後の戻り値を返す"""
+        times = []
+        for _ in range(self.repeat):
+            t0 = time.perf_counter()
+            out = fn()
+            times.append(time.perf_counter() - t0)
+        peak = None
+        if self.memory:
+            tracemalloc.start()
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        self.results.append({
+            "size": self.label, "rows": self.rows_n, "dashboard": dashboard, "view": view, "stage": stage,
+            "ms": statistics.median(times) * 1000, "peak_mb": None if peak is None else peak / 2**20,
+        })
+        return out
+
+
+def csv_bytes(frame: pd.DataFrame) -> bytes:
+    return frame.to_csv(index=False).encode("utf-8")
+
+
+def read_csv(body: bytes) -> pd.DataFrame:
+    return pd.read_csv(BytesIO(body), encoding="utf-8")
+
+
+def last_third(table: pd.DataFrame):
+    """表の期間の最後の1/3（日単位。開始・終了の日を含む）"""
+    bounds = time_bounds(table)
+    if bounds is None:
+        return None
+    lo, hi = bounds
+    start = (lo + (hi - lo) * 2 / 3).normalize()
+    return start, hi.normalize() + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+
+
+def top(series: pd.Series):
+    """最も記録の多い値（選手の選択に使う）"""
+    return series.value_counts().index[0]
+
+
+def to_json(*figs):
+    return [f.to_json() for f in figs]
+
+
+def heat(z, text=None):
+    fig = px.imshow(z, color_continuous_scale="Reds")
+    if text is not None:
+        fig.update_traces(text=text, texttemplate="%{text}")
+    return fig
+
+
+def pie(frame, names, values=None):
+    return px.pie(frame, names=names, values=values, hole=0.4)
+
+
+# ==========================================
+# フリシュー（app.py・practice_app.py）
+# ==========================================
+def bench_freeshoot(suite: Suite, dashboard: str, body: bytes, normalize):
+    raw = suite.measure(dashboard, "-", "load", lambda: read_csv(body))
+    rows = suite.measure(dashboard, "-", "normalize", lambda: normalize(raw.copy()))
+
+    def index():
+        cube = freeshoot_cube(sort_by_time(rows, "日時_raw"))
+        return cube, freeshoot_matchups(cube.table)["シューター×ゴーリー"], freeshoot_trends(cube.table)
+    cube, matchups, trends = suite.measure(dashboard, "-", "index", index)
+    period = last_third(cube.table)
+    df = time_range(cube.table, *period)
+    shooter, goalie = top(rows["背番号"]), top(rows["ゴーリー"])
+
+    view = "🏢 チーム全体"
+    grids = suite.measure(dashboard, view, "aggregate", lambda: (
+        ratio_grid(df["シュートエリア"], AREA_2x5, df["ゴール"], df["件数"]),
+        ratio_grid(df["コース"], COURSE_3x3, df["ゴール"], df["件数"])))
+    suite.measure(dashboard, view, "figure", lambda: to_json(*(heat(*g) for g in grids)))
+
+    view = "🔴 シューター分析"
+    s_df = suite.measure(dashboard, view, "filter", lambda: time_range(cube.slice("背番号", shooter), *period))
+    agg = suite.measure(dashboard, view, "aggregate", lambda: (
+        trends["背番号"].trend(shooter, *period, present="件数").assign(率=lambda t: t["ゴール"] / t["件数"]),
+        s_df.groupby("結果", observed=True)["件数"].sum().reset_index(),
+        ratio_grid(s_df["シュートエリア"], AREA_2x5, s_df["ゴール"], s_df["件数"]),
+        ratio_grid(s_df["コース"], COURSE_3x3, s_df["ゴール"], s_df["件数"]),
+        matchups.for_row(shooter, *period, present="枠内")))
+    suite.measure(dashboard, view, "figure", lambda: to_json(
+        px.line(agg[0], x="日時", y="率", markers=True), pie(agg[1], "結果", "件数"), heat(*agg[2]), heat(*agg[3])))
+
+    view = "🔵 ゴーリー分析"
+    g_df = suite.measure(dashboard, view, "filter", lambda: time_range(cube.slice("ゴーリー", goalie), *period))
+    agg = suite.measure(dashboard, view, "aggregate", lambda: (
+        trends["ゴーリー"].trend(goalie, *period, present="枠内").assign(率=lambda t: t["セーブ"] / t["枠内"]),
+        g_df.groupby("背番号", observed=True)["件数"].sum().reset_index(),
+        ratio_grid(g_df["シュートエリア"], AREA_2x5, g_df["セーブ"], g_df["枠内"]),
+        ratio_grid(g_df["コース"], COURSE_3x3, g_df["セーブ"], g_df["枠内"]),
+        matchups.for_col(goalie, *period, present="枠内")))
+    suite.measure(dashboard, view, "figure", lambda: to_json(
+        px.line(agg[0], x="日時", y="率", markers=True), pie(agg[1], "背番号", "件数"), heat(*agg[2]), heat(*agg[3])))
+
+
+# ==========================================
+# 1on1（1on1app.py はキューブ、practice_app.py は生の行）
+# ==========================================
+def _one_on_one_views(suite: Suite, dashboard: str, table, slicer, matchups, period, at, df_player, goalie):
+    shot_of = lambda d: d["件数"].where(d["終わり方"] == "ショット", 0)
+
+    view = "🔴 AT分析"
+    at_df = suite.measure(dashboard, view, "filter", lambda: slicer("AT", at))
+    agg = suite.measure(dashboard, view, "aggregate", lambda: (
+        at_df.groupby("終わり方", observed=True)["件数"].sum().reset_index(),
+        at_df.groupby("抜き方", observed=True)["件数"].sum().reset_index(),
+        ratio_grid(at_df["ショット位置"], AREA_2x5, at_df["件数"].where(at_df["結果"] == "ゴール", 0), shot_of(at_df)),
+        ratio_grid(at_df["コース"], COURSE_3x3, at_df["件数"].where(at_df["結果"] == "ゴール", 0), shot_of(at_df)),
+        at_df.groupby(["起点", "抜き方"], observed=True)["件数"].sum().unstack(fill_value=0),
+        matchups["AT×DF"].for_row(at, *period)))
+    suite.measure(dashboard, view, "figure", lambda: to_json(
+        pie(agg[0], "終わり方", "件数"), pie(agg[1], "抜き方", "件数"), heat(*agg[2]), heat(*agg[3])))
+
+    view = "🔵 DF分析"
+    t_df = suite.measure(dashboard, view, "filter", lambda: slicer("DF", df_player))
+    agg = suite.measure(dashboard, view, "aggregate", lambda: (
+        ratio_grid(t_df["ショット位置"], AREA_2x5, t_df["件数"].where(t_df["結果"] == "ゴール", 0), shot_of(t_df)),
+        ratio_grid(t_df["起点"], ORIGIN_3x3, shot_of(t_df), t_df["件数"]),
+        t_df.groupby(["起点", "抜き方"], observed=True)["件数"].sum().unstack(fill_value=0),
+        matchups["AT×DF"].for_col(df_player, *period)))
+    suite.measure(dashboard, view, "figure", lambda: to_json(heat(*agg[0]), heat(*agg[1])))
+
+    view = "🟡 ゴーリー分析"
+    g_df = suite.measure(dashboard, view, "filter", lambda: slicer("ゴーリー", goalie))
+    agg = suite.measure(dashboard, view, "aggregate", lambda: (
+        ratio_grid(g_df["起点"], ORIGIN_2x2, g_df["件数"].where(g_df["結果"] == "セーブ", 0), shot_of(g_df)),
+        ratio_grid(g_df["コース"], COURSE_3x3, g_df["件数"].where(g_df["結果"] == "セーブ", 0), shot_of(g_df)),
+        g_df.groupby("AT", observed=True)["件数"].sum().reset_index(),
+        matchups["AT×ゴーリー"].for_col(goalie, *period, present="被ショット")))
+    suite.measure(dashboard, view, "figure", lambda: to_json(heat(*agg[0]), heat(*agg[1]), pie(agg[2], "AT", "件数")))
+
+
+def bench_one_on_one(suite: Suite, dashboard: str, body: bytes, cube_based: bool):
+    raw = suite.measure(dashboard, "-", "load", lambda: read_csv(body))
+    rows = suite.measure(dashboard, "-", "normalize", lambda: normalize_1on1(raw.copy()))
+
+    def index():
+        table = sort_by_time(rows, "タイムスタンプ")
+        cube = one_on_one_cube(table) if cube_based else None
+        return table, cube, one_on_one_matchups(cube.table if cube_based else table)
+    table, cube, matchups = suite.measure(dashboard, "-", "index", index)
+    period = last_third(cube.table if cube_based else table)
+    if cube_based:
+        slicer = lambda col, v: time_range(cube.slice(col, v), *period)
+    else:
+        df = time_range(table, *period)
+        slicer = lambda col, v: df[df[col] == v]
+    _one_on_one_views(suite, dashboard, table, slicer, matchups, period,
+                      top(rows["AT"]), top(rows["DF"]), top(rows["ゴーリー"]))
+
+
+# ==========================================
+# 6on6（practice_app.py）
+# ==========================================
+def bench_six_on_six(suite: Suite, bodies: dict):
+    dashboard = "practice_app.py 6on6"
+    raw = suite.measure(dashboard, "-", "load", lambda: {k: read_csv(b) for k, b in bodies.items()})
+    frames = suite.measure(dashboard, "-", "normalize", lambda: {k: NORMALIZERS_6on6[k](raw[k].copy()) for k in KEYS_6on6})
+    shot, to, gb, miss = (frames[k] for k in KEYS_6on6)
+    period = last_third(shot)
+    shot, to, gb, miss = suite.measure(dashboard, "-", "filter", lambda: [time_range(f, *period) for f in (shot, to, gb, miss)])
+    shooter = top(shot["shooter"])
+
+    view = "🥍 ショット分析"
+
+    def shot_views():
+        s = shot[shot["shooter"] == shooter]
+        goal = s["result"].eq("ゴール")
+        return (
+            ratio_grid(s["area"], AREA_2x5, goal, np.ones(len(s))),
+            ratio_grid(s["course"], COURSE_3x3, goal, np.ones(len(s))),
+            shot["origin"].value_counts().reset_index(),
+            shot.groupby(["side", "shooter"], observed=True).agg(
+                ショット=("result", "count"), ゴール=("result", lambda x: x.eq("ゴール").sum())).reset_index())
+    agg = suite.measure(dashboard, view, "aggregate", shot_views)
+    suite.measure(dashboard, view, "figure", lambda: to_json(
+        heat(*agg[0]), heat(*agg[1]), px.bar(agg[2], x="origin", y="count")))
+
+    for view, frame, col in (("🔄 TO分析", to, "cause"), ("⬆️ GB分析", gb, "side"), ("⚠️ 個人ミス分析", miss, "missType")):
+        player = "player1" if "player1" in frame.columns else "player"
+        agg = suite.measure(dashboard, view, "aggregate", lambda: (
+            frame[col].value_counts().reset_index(),
+            frame.groupby(player, observed=True).size().reset_index(name="件数").sort_values("件数", ascending=False)))
+        suite.measure(dashboard, view, "figure", lambda: to_json(pie(agg[0], col, "count")))
+
+
+# ==========================================
+# 試合データ（match-dashboard.py・シーズンのDB）
+# ==========================================
+def bench_matches(suite: Suite, n: int, seed: int):
+    dashboard = "match-dashboard.py"
+    docs = list(synth.match_exports(n, seed))
+    bodies = suite.measure(dashboard, "-", "load", lambda: [json.dumps(d, ensure_ascii=False).encode() for _, d in docs])
+    # 1試合分（5ファイル）の画面: アップロード → 表への変換
+    one_match = bodies[:5]
+
+    def parse():
+        match_data._files.clear()
+        return [match_data.load_match_file(b) for b in one_match]
+    files = suite.measure(dashboard, "-", "normalize", parse)
+    tables = {}
+    for mf in files:
+        tables.update(mf.tables)
+
+    view = "🏠 試合サマリー"
+    shots = tables["shots"]
+    agg = suite.measure(dashboard, view, "aggregate", lambda: (
+        shots.loc[shots["result"] == "goal", "team"].value_counts(),
+        shots[shots["result"] == "goal"].groupby(["q", "team"], observed=True).size().reset_index(name="n")))
+    suite.measure(dashboard, view, "figure", lambda: to_json(px.line(agg[1], x="q", y="n", color="team", markers=True)))
+
+    view = "🥅 ゴーリーデータ"
+    gs = tables["goalie_shots"]
+    agg = suite.measure(dashboard, view, "aggregate", lambda: [
+        np.bincount(gs.loc[(gs["side"] == side) & gs["course"].between(1, 9), "course"] - 1, minlength=9).reshape(3, 3)
+        for side in ("kyoto", "enemy")])
+    suite.measure(dashboard, view, "figure", lambda: to_json(*(heat(z) for z in agg)))
+
+    # シーズン: 全試合の取り込み → Q別シュート率
+    view = "📅 シーズン集計"
+    tmp = tempfile.mkdtemp(prefix="lax-bench-")
+    try:
+        def import_all():
+            db = os.path.join(tmp, f"season-{time.perf_counter_ns()}.sqlite")
+            con = match_store._connect(db)
+            with con:
+                for b in bodies:
+                    match_store._store(con, b, *match_store.parse_export(b))
+            con.close()
+            return db
+        db = suite.measure(dashboard, view, "index", import_all)
+        rates = suite.measure(dashboard, view, "aggregate", lambda: match_store.shot_rate_by_q(db=db))
+        suite.measure(dashboard, view, "figure", lambda: to_json(px.bar(rates, x="q", y="rate")))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+# ==========================================
+# 実行・表示
+# ==========================================
+def run(label: str, n: int, repeat: int, memory: bool, seed: int = 0, matches: bool = True) -> list:
+    suite = Suite(label, n, repeat, memory)
+    bench_freeshoot(suite, "app.py", csv_bytes(synth.freeshoot_sheet(n, seed)), normalize_freeshoot_sheet)
+    bench_freeshoot(suite, "practice_app.py フリシュー", csv_bytes(synth.freeshoot_recorder(n, seed)), normalize_freeshoot_recorder)
+    bench_one_on_one(suite, "1on1app.py", csv_bytes(synth.one_on_one_sheet(n, seed)), cube_based=True)
+    bench_one_on_one(suite, "practice_app.py 1on1", csv_bytes(synth.one_on_one_recorder(n, seed)), cube_based=False)
+    six = synth.six_on_six(n, seed)
+    bench_six_on_six(suite, {key: csv_bytes(six[key.rsplit("_", 1)[-1].removesuffix(".csv")]) for key in KEYS_6on6})
+    if matches:
+        bench_matches(suite, n, seed)
+    return suite.results
+
+
+def _pad(s: str, width: int) -> str:
+    """全角文字を2桁として左寄せする"""
+    return s + " " * max(0, width - sum(2 if unicodedata.east_asian_width(c) in "WF" else 1 for c in s))
+
+
+def print_table(results: list, baseline: dict = None):
+    header = f"{'size':>5} {_pad('dashboard', 28)} {_pad('view', 18)} {'stage':<9} {'ms':>10} {'peak MB':>8}"
+    if baseline:
+        header += f" {'vs base':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        line = (f"{r['size']:>5} {_pad(r['dashboard'], 28)} {_pad(r['view'], 18)} {r['stage']:<9} {r['ms']:>10.2f} "
+                f"{'' if r['peak_mb'] is None else format(r['peak_mb'], '.1f'):>8}")
+        if baseline:
+            base = baseline.get((r["size"], r["dashboard"], r["view"], r["stage"]))
+            line += f" {format(r['ms'] / base, '.2f') + 'x' if base else '':>8}"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ダッシュボードの計算経路のベンチマーク")
+    parser.add_argument("--sizes", default="1k,100k", help=f"行数（{', '.join(synth.SIZES)} または数値をカンマ区切り）")
+    parser.add_argument("--repeat", type=int, default=None, help="各段階の実行回数（省略時は 10万行未満で5回、それ以上で1回）")
+    parser.add_argument("--no-memory", action="store_true", help="tracemalloc によるメモリ計測を省く")
+    parser.add_argument("--no-matches", action="store_true", help="試合データ（JSON・シーズンのDB）を省く")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="結果を JSON で保存するパス")
+    parser.add_argument("--baseline", help="比較する基準の JSON（--json で保存したもの）")
+    args = parser.parse_args()
+
+    results = []
+    for label in args.sizes.split(","):
+        n = synth.SIZES.get(label) or int(label)
+        repeat = args.repeat or (5 if n < 100_000 else 1)
+        results += run(label, n, repeat, not args.no_memory, args.seed, not args.no_matches)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = {(r["size"], r["dashboard"], r["view"], r["stage"]): r["ms"] for r in json.load(f)}
+    print_table(results, baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=1)
@@ -0,0 +1,275 @@
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# 合成データの生成（ベンチマーク用）
+# ==========================================
+# 各取得元と同じ列名・表記で、指定した行数の練習データ・試合データを作る。
+#   フリシュー : スプレッドシート（7列）と記録ツール（S3 の CSV）
+#   1on1       : スプレッドシート（Googleフォーム）と記録ツール（公開CSV）
+#   6on6       : ショット・TO・GB・個人ミスの4表（S3 の CSV）
+#   試合       : 5ツールのエクスポートJSON（1試合 約270件。行数に合わせて試合数を決める）
+# 練習日は2日おき、1日の記録は数秒おき。選手・ゴーリーは出場回数に偏りを付け、
+# シューターの決定力とゴーリーのセーブ力で結果の確率を変える（対戦表・ランキングに差が出るように）。
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+GOALIES = ["#87 まりも", "#94 えぷ", "#12 たろう", "#3 はな"]
+NUMBERS = [0, 1, 2, 3, 5, 6, 7, 8, 9, 10, 11, 13, 14, 16, 18, 20, 21, 22, 24, 26,
+           27, 29, 31, 33, 35, 40, 44, 51, 57, 67, 77, 88]
+POSITIONS = ["左1", "左2", "中央", "右1", "右2"]
+MISSES = ["枠外", "コース外", "チェック", "フリスぺ"]
+ORIGINS = ["左上", "センター", "右上", "左横", "右横", "左裏", "右裏"]
+DODGES = ["イン抜き", "アウト抜き", "NULL"]
+ENDS = ["ショット", "DF勝ち", "TO"]
+TIME_FORMAT = "%Y/%m/%d %H:%M:%S"
+
+
+def _weights(n: int, rng: np.random.Generator) -> np.ndarray:
+    """出場回数の偏り（よく練習に来る選手ほど多い）"""
+    w = rng.pareto(1.5, n) + 0.2
+    return w / w.sum()
+
+
+def _timestamps(n: int, rng: np.random.Generator, start="2025-04-01 17:00") -> pd.Series:
+    """練習日ごとに数秒おきの記録時刻（練習日は最大300日、2日おき）"""
+    per_day = max(200, -(-n // 300))
+    day = np.arange(n) // per_day
+    step = rng.integers(2, 5, n)
+    # 秒の累積を日ごとに0から数え直す
+    cum = np.cumsum(step)
+    first = np.arange(0, n, per_day)
+    sec = cum - np.repeat(cum[first] - step[first], np.diff(np.r_[first, n]))
+    ts = pd.Timestamp(start) + pd.to_timedelta(day * 2, unit="D") + pd.to_timedelta(sec, unit="s")
+    return pd.Series(ts).dt.strftime(TIME_FORMAT)
+
+
+def _pick(values, n: int, rng: np.random.Generator, p=None) -> np.ndarray:
+    return np.asarray(values, dtype=object)[rng.choice(len(values), n, p=p)]
+
+
+def _freeshoot_core(n: int, rng: np.random.Generator):
+    shooter = rng.choice(len(NUMBERS), n, p=_weights(len(NUMBERS), rng))
+    goalie = rng.choice(len(GOALIES), n, p=_weights(len(GOALIES), rng))
+    skill = rng.uniform(0.35, 0.65, len(NUMBERS))[shooter]
+    save = rng.uniform(0.3, 0.6, len(GOALIES))[goalie]
+    on_target = rng.random(n) < 0.7
+    goal = on_target & (rng.random(n) < skill * (1 - save) * 1.4)
+    result = np.where(goal, "ゴール", np.where(on_target, "セーブ", _pick(MISSES, n, rng)))
+    return shooter, goalie, result
+
+
+def freeshoot_sheet(n: int, seed: int = 0) -> pd.DataFrame:
+    """フリシューのスプレッドシート（日時・ゴーリー・背番号・打つ位置・シュートエリア・コース・結果）"""
+    rng = np.random.default_rng(seed)
+    shooter, goalie, result = _freeshoot_core(n, rng)
+    return pd.DataFrame({
+        "日時": _timestamps(n, rng),
+        "ゴーリー": np.asarray(GOALIES, dtype=object)[goalie],
+        "背番号": [f"#{NUMBERS[i]}" for i in shooter],
+        "打つ位置": _pick(POSITIONS, n, rng),
+        "シュートエリア": rng.integers(1, 11, n),
+        "コース": rng.integers(1, 10, n),
+        "結果": result,
+    })
+
+
+def freeshoot_recorder(n: int, seed: int = 0) -> pd.DataFrame:
+    """フリシュー記録ツールのCSV（timestamp・goalie・shooter（番号のみ）・pos・area・target・result）"""
+    rng = np.random.default_rng(seed)
+    shooter, goalie, result = _freeshoot_core(n, rng)
+    return pd.DataFrame({
+        "timestamp": _timestamps(n, rng),
+        "goalie": np.asarray(GOALIES, dtype=object)[goalie],
+        "shooter": np.asarray(NUMBERS)[shooter],
+        "pos": _pick(POSITIONS, n, rng),
+        "area": rng.integers(1, 11, n),
+        "target": rng.integers(1, 10, n),
+        "result": result,
+    })
+
+
+def _one_on_one_core(n: int, rng: np.random.Generator) -> dict:
+    players = [f"#{i}" for i in NUMBERS]
+    at = rng.choice(len(players), n, p=_weights(len(players), rng))
+    df = rng.choice(len(players), n, p=_weights(len(players), rng))
+    beat = rng.uniform(0.3, 0.7, len(players))[at] * (1.3 - rng.uniform(0.3, 0.9, len(players))[df])
+    end = np.where(rng.random(n) < beat, "ショット", _pick(ENDS[1:], n, rng))
+    shot = end == "ショット"
+    result = np.where(shot, _pick(["ゴール", "セーブ", "枠外"], n, rng, p=[0.4, 0.4, 0.2]), "NULL")
+    return {
+        "at": np.asarray(players, dtype=object)[at],
+        "df": np.asarray(players, dtype=object)[df],
+        "goalie": _pick(GOALIES, n, rng, p=_weights(len(GOALIES), rng)),
+        "origin": _pick(ORIGINS, n, rng),
+        "dodge": _pick(DODGES, n, rng),
+        "end": end,
+        "hand": np.where(shot, _pick(["右手", "左手"], n, rng, p=[0.7, 0.3]), "NULL"),
+        "course": np.where(shot, rng.integers(1, 10, n).astype(str), ""),
+        "result": result,
+        "pos": np.where(shot, rng.integers(1, 11, n).astype(str), ""),
+    }
+
+
+def one_on_one_sheet(n: int, seed: int = 0) -> pd.DataFrame:
+    """1on1 のスプレッドシート（Googleフォームの列名）"""
+    rng = np.random.default_rng(seed)
+    c = _one_on_one_core(n, rng)
+    return pd.DataFrame({
+        "タイムスタンプ": _timestamps(n, rng), "AT": c["at"], "DF": c["df"], "ゴーリー": c["goalie"],
+        "起点": c["origin"], "抜き方": c["dodge"], "終わり方": c["end"], "ショットを打った手": c["hand"],
+        "ショットコース": c["course"], "ショット結果": c["result"], "ショット位置": c["pos"],
+    })
+
+
+def one_on_one_recorder(n: int, seed: int = 0) -> pd.DataFrame:
+    """1on1 記録ツールの公開CSV（英語の列名）"""
+    rng = np.random.default_rng(seed)
+    c = _one_on_one_core(n, rng)
+    return pd.DataFrame({
+        "timestamp": _timestamps(n, rng), "at": c["at"], "df": c["df"], "goalie": c["goalie"],
+        "origin": c["origin"], "dodge": c["dodge"], "endType": c["end"], "hand": c["hand"],
+        "shotPos": c["pos"], "course": c["course"], "result": c["result"],
+    })
+
+
+def six_on_six(n: int, seed: int = 0) -> dict:
+    """6on6 の4表（種類 → DataFrame）。どの表も n 行"""
+    rng = np.random.default_rng(seed)
+    players = [f"#{i}" for i in NUMBERS]
+    p = _weights(len(players), rng)
+    return {
+        "shot": pd.DataFrame({
+            "timestamp": _timestamps(n, rng), "side": _pick(["京大", "相手"], n, rng),
+            "shooter": _pick(players, n, rng, p), "area": rng.integers(1, 11, n), "course": rng.integers(1, 10, n),
+            "result": _pick(["ゴール", "セーブ", "枠外"], n, rng, p=[0.3, 0.4, 0.3]),
+            "origin": _pick(ORIGINS, n, rng), "atkStyle": _pick(["セット", "ブレイク", "NULL"], n, rng),
+        }),
+        "to": pd.DataFrame({
+            "timestamp": _timestamps(n, rng), "side": _pick(["AT", "DF"], n, rng),
+            "cause": _pick(["パスミス", "キャッチミス", "チェック", "ファール"], n, rng),
+            "set": rng.integers(1, 6, n), "player1": _pick(players, n, rng, p),
+        }),
+        "gb": pd.DataFrame({
+            "timestamp": _timestamps(n, rng), "side": _pick(["AT", "DF"], n, rng),
+            "player": _pick(players, n, rng, p), "set": rng.integers(1, 6, n),
+        }),
+        "miss": pd.DataFrame({
+            "timestamp": _timestamps(n, rng), "side": _pick(["AT", "DF"], n, rng),
+            "player": _pick(players, n, rng, p), "missType": _pick(["パス", "キャッチ", "グラボ"], n, rng),
+            "recover": _pick(["リカバーあり", "リカバーなし"], n, rng),
+        }),
+    }
+
+
+# ==========================================
+# 試合のエクスポートJSON
+# ==========================================
+ENEMIES = ["同志社", "関学", "立命館", "京産", "神戸", "阪大", "関大", "近大"]
+EVENTS_PER_MATCH = 270
+
+
+def _match(i: int, rng: np.random.Generator) -> dict:
+    """1試合分の5ファイル（データの種類 → JSON）"""
+    meta = {"enemy": ENEMIES[i % len(ENEMIES)],
+            "date": (pd.Timestamp("2025-04-01") + pd.Timedelta(days=i * 3)).strftime("%Y-%m-%d"), "qCount": 4}
+    q = lambda k: rng.integers(1, 5, k).tolist()
+    side = lambda k: _pick(["kyoto", "enemy"], k, rng).tolist()
+    shots = [{"team": t, "result": r, "q": qq, "attack": a, "player": str(pl)}
+             for t, r, qq, a, pl in zip(side(80), _pick(["goal", "save", "miss"], 80, rng, p=[0.3, 0.4, 0.3]), q(80),
+                                        _pick(["", "セット", "ブレイク", "ファスト"], 80, rng), _pick(NUMBERS, 80, rng))]
+    turnovers = [{"side": s, "cause": c, "q": qq}
+                 for s, c, qq in zip(side(40), _pick(["キャッチミス", "パスミス", "チェック"], 40, rng), q(40))]
+    draws = [{"q": qq, "result": r, "drawer": str(d), "getWay": w}
+             for qq, r, d, w in zip(q(30), _pick(["ok", "ng", "foul"], 30, rng, p=[0.5, 0.4, 0.1]),
+                                    _pick([7, 18, 27], 30, rng), _pick(["直接", "GB", "ウィング", ""], 30, rng))]
+    gb = [{"q": qq, "side": s, "loc": l} for qq, s, l in zip(q(40), side(40), _pick(["self", "center", "enemy"], 40, rng))]
+    fouls = [{"q": qq, "player": str(pl), "type": t}
+             for qq, pl, t in zip(q(20), _pick(NUMBERS, 20, rng), _pick(["スラッシング", "プッシング", "ホールディング"], 20, rng))]
+    goalie_shots = [{"side": s, "result": r, "q": qq, "goalieNum": 1 if s == "kyoto" else 2, "course": c}
+                    for s, r, qq, c in zip(side(60), _pick(["goal", "save", "miss"], 60, rng, p=[0.3, 0.5, 0.2]),
+                                           q(60), rng.integers(1, 10, 60).tolist())]
+
+    def count(records, **cond):
+        return sum(all(r.get(k) == v for k, v in cond.items()) for r in records)
+
+    def save_summary(s):
+        total = count(goalie_shots, side=s)
+        goals, saves = count(goalie_shots, side=s, result="goal"), count(goalie_shots, side=s, result="save")
+        return {"total_shots": total, "goals": goals, "saves": saves,
+                "save_rate_pct": round(saves / (goals + saves) * 100, 1) if goals + saves else None}
+
+    k_gb, e_gb = count(gb, side="kyoto"), count(gb, side="enemy")
+    got, lost = count(draws, result="ok"), count(draws, result="ng")
+    by_player, by_type = {}, {}
+    for f in fouls:
+        by_player[f["player"]] = by_player.get(f["player"], 0) + 1
+        by_type[f["type"]] = by_type.get(f["type"], 0) + 1
+    return {
+        "game": {"meta": {**meta, "tool": "GameDataTool v2"}, "shots": shots, "turnovers": turnovers,
+                 "clearance": {str(k): {"ok": int(rng.integers(0, 8)), "ng": int(rng.integers(0, 4))} for k in (1, 2, 3)}},
+        "possession": {"meta": {**meta, "tool": "PossessionTool"},
+                       "of_possession": {"by_q": [{"q": k, "set_count": int(rng.integers(2, 8)), "total_sec": int(rng.integers(60, 300)),
+                                                   "goal_count": int(rng.integers(0, 4)), "to_count": int(rng.integers(0, 4)),
+                                                   "avg_goal_sec": int(rng.integers(20, 60))} for k in range(1, 5)]},
+                       "clrd_possession": {"by_q": [{"q": k, "kyoto_sec": (ks := int(rng.integers(30, 60))), "enemy_sec": 90 - ks,
+                                                     "kyoto_pct": round(ks / 90 * 100)} for k in range(1, 5)]}},
+        "gb_foul": {"meta": {**meta, "tool": "GBFoulTool"},
+                    "gb": {"records": gb, "summary": {
+                        "kyoto_get": k_gb, "enemy_get": e_gb, "kyoto_pct": round(k_gb / max(k_gb + e_gb, 1) * 100, 1),
+                        "by_location": [{"loc": l, "kyoto": count(gb, side="kyoto", loc=l), "enemy": count(gb, side="enemy", loc=l)}
+                                        for l in ("self", "center", "enemy")]}},
+                    "fouls": {"records": fouls, "summary": {"total": len(fouls), "by_player": by_player, "by_type": by_type}}},
+        "draw": {"meta": {**meta, "tool": "DrawTool"}, "draws": draws,
+                 "summary": {"total": len(draws), "got": got, "lost": lost,
+                             "get_rate_pct": round(got / max(got + lost, 1) * 100)}},
+        "goalie": {"meta": {**meta, "tool": "GoalieTool"}, "shots": goalie_shots,
+                   "goalies": {"kyoto": [{"num": 1, "hand": "右", "fromQ": 1}], "enemy": [{"num": 2, "hand": "左", "fromQ": 1}]},
+                   "summary": {"kyoto": save_summary("kyoto"), "enemy": save_summary("enemy")}},
+    }
+
+
+def match_exports(n: int, seed: int = 0):
+    """合計およそ n 件のイベントになる試合数ぶんのエクスポート（(ファイル名, JSON) を順に返す）"""
+    rng = np.random.default_rng(seed)
+    for i in range(max(1, -(-n // EVENTS_PER_MATCH))):
+        for tool, doc in _match(i, rng).items():
+            yield f"match{i:05d}_{tool}.json", doc
+
+
+# ==========================================
+# 書き出し
+# ==========================================
+def write_dataset(label: str, n: int, out_dir: str = DATA_DIR, seed: int = 0, matches: bool = True) -> str:
+    """bench/data/<label>/ に全取得元の合成データを書き出し、そのディレクトリを返す"""
+    d = os.path.join(out_dir, label)
+    os.makedirs(d, exist_ok=True)
+    freeshoot_sheet(n, seed).to_csv(os.path.join(d, "freeshoot_sheet.csv"), index=False)
+    freeshoot_recorder(n, seed).to_csv(os.path.join(d, "freeshoot_recorder.csv"), index=False)
+    one_on_one_sheet(n, seed).to_csv(os.path.join(d, "1on1_sheet.csv"), index=False)
+    one_on_one_recorder(n, seed).to_csv(os.path.join(d, "1on1_recorder.csv"), index=False)
+    for kind, frame in six_on_six(n, seed).items():
+        frame.to_csv(os.path.join(d, f"6on6_{kind}.csv"), index=False)
+    if matches:
+        md = os.path.join(d, "matches")
+        os.makedirs(md, exist_ok=True)
+        for name, doc in match_exports(n, seed):
+            with open(os.path.join(md, name), "w", encoding="utf-8") as f:
+                json.dump(doc, f, ensure_ascii=False)
+    return d
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ベンチマーク用の合成データを書き出す")
+    parser.add_argument("--sizes", default="1k,100k", help=f"行数（{', '.join(SIZES)} または数値をカンマ区切り）")
+    parser.add_argument("--out", default=DATA_DIR)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-matches", action="store_true", help="試合のJSONは書き出さない")
+    args = parser.parse_args()
+    for label in args.sizes.split(","):
+        n = SIZES.get(label) or int(label)
+        print(write_dataset(label, n, args.out, args.seed, matches=not args.no_matches))
@@ -0,0 +1,225 @@
+import argparse
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from time_index import DAY_NS, NAT_NS
+
+# ==========================================
+# 練習イベントの固定長バイナリログ（np.memmap で読む）
+# ==========================================
+# 1イベント = 1レコード（NumPy の構造化 dtype。フリシューなら16バイト）を <kind>.bin に追記していく。
+# 名前（選手・結果など）は列ごとの辞書 <kind>.names.json に登録した順の番号（-1 は空欄）で持ち、
+# エリア・コースは int8 のコード、日時は int64 のナノ秒（空欄は NAT_NS）で持つ。
+# 読む側は np.memmap で開くだけなので、CSV のパースも文字列の整形も無い
+# （ファイルは OS のページキャッシュを通じて全プロセスで共有される）。
+# ダッシュボードに渡すのは pandas の表なので、列はレコードから取り出してコピーする（ゼロコピーではない）。
+# ただし取り出すのは前回から増えたレコードの分だけで、前回の表に連結する。
+# 1件追記されるごとに全シーズン分を読み直すことはない（名前の列は、新しい名前が出たときだけカテゴリを付け直す）。
+#
+# 書く側は「辞書 → レコード」の順に書くので、読む側が先にファイルの長さを見てから辞書を読めば、
+# 読んだレコードの番号は必ず辞書に載っている（書きかけの最後のレコードは次回に回す）。
+#
+# ダッシュボードは LAX_BINLOG にディレクトリを指定すると、フリシュー・1on1 の記録ツールのデータをここから読む。
+#
+#   python binlog.py freeshoot freeshoot.csv --dir .cache/binlog   # 記録ツールのCSV（か .jsonl）を取り込む
+#   python ingest_server.py --binlog .cache/binlog                # 届いたイベントも追記する
+BINLOG_DIR = os.environ.get("LAX_BINLOG")
+FORMAT_VERSION = 1
+
+
+class BinLog:
+    """種類ごとの固定長レコードのログと名前の辞書
+
+    fields: (列名, 型, NumPy の型) の並び。型は "time"（日時）・"name"（辞書の番号）・"code"（int8 などの整数）
+    derive: 取り出した列の表 → 整形済みの表（日付・フラグなど、ほかの列から作れる列を足す）
+    """
+
+    def __init__(self, path: str, fields, derive=None):
+        self.path = path
+        self.names_path = path[:-len(".bin")] + ".names.json" if path.endswith(".bin") else path + ".names.json"
+        self.fields = list(fields)
+        self.derive = derive
+        self.dtype = np.dtype([(col, np.int64 if kind == "time" else dt) for col, kind, dt in self.fields])
+        self._lock = threading.Lock()
+        self._size = None
+        self._frame = pd.DataFrame()
+        self._seen = {}   # 名前の列 → 読んだレコードに出てきた辞書の番号（bool の並び）
+
+    # ---- 書く側 ----
+    def _read_meta(self) -> dict:
+        try:
+            with open(self.names_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return {"format": FORMAT_VERSION, "dtype": self.dtype.descr, "columns": None, "names": {}}
+        if meta.get("format") != FORMAT_VERSION or [tuple(d) for d in meta.get("dtype", [])] != self.dtype.descr:
+            raise ValueError(f"{self.path} は別の形式のログです（作り直してください）")
+        return meta
+
+    def append(self, frame: pd.DataFrame) -> int:
+        """整形済みの表の行をレコードにして追記する。戻り値は追記した件数"""
+        if frame.empty:
+            return 0
+        with self._lock:
+            meta = self._read_meta()
+            if meta["columns"] is None:
+                meta["columns"] = [str(c) for c in frame.columns]
+            rec = np.zeros(len(frame), dtype=self.dtype)
+            changed = False
+            for col, kind, dt in self.fields:
+                if col not in frame.columns:
+                    rec[col] = -1 if kind == "name" else (NAT_NS if kind == "time" else 0)
+                    continue
+                s = frame[col]
+                if kind == "time":
+                    rec[col] = pd.to_datetime(s, errors="coerce").to_numpy(dtype="datetime64[ns]").view(np.int64)
+                elif kind == "code":
+                    rec[col] = s.to_numpy()
+                else:
+                    names = meta["names"].setdefault(col, [])
+                    if isinstance(s.dtype, pd.CategoricalDtype):
+                        # カテゴリの型（str / string）も、整形した表と同じにして返す
+                        meta.setdefault("categories", {})[col] = str(s.cat.categories.dtype)
+                    values = s.astype(object).where(s.notna(), None)
+                    values = values.where(values.isna(), values.astype(str))   # 辞書は文字列で持つ
+                    known = set(names)
+                    added = [v for v in pd.unique(values.dropna()) if v not in known]
+                    if added:
+                        names.extend(added)
+                        changed = True
+                    if len(names) > np.iinfo(dt).max:
+                        raise ValueError(f"{col} の名前が多すぎます（{np.dtype(dt)} に収まりません）")
+                    rec[col] = pd.Categorical(values, categories=names).codes
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            if changed or not os.path.exists(self.names_path):
+                tmp = f"{self.names_path}.{os.getpid()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(meta, f, ensure_ascii=False)
+                os.replace(tmp, self.names_path)
+            with open(self.path, "ab") as f:
+                # 書きかけのレコードが残っていたら（前回の書き込みが途中で止まった）、その続きからは書かない
+                tail = f.tell() % self.dtype.itemsize
+                if tail:
+                    f.truncate(f.tell() - tail)
+                f.write(rec.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            return len(rec)
+
+    # ---- 読む側 ----
+    def __len__(self) -> int:
+        try:
+            return os.path.getsize(self.path) // self.dtype.itemsize
+        except FileNotFoundError:
+            return 0
+
+    def version(self):
+        return self._size
+
+    def frame(self) -> pd.DataFrame:
+        """整形済みの表。レコードが増えていなければ前回と同じ DataFrame を返す
+        （増えていれば、増えた分だけを取り出して前回の表に連結した新しい DataFrame）"""
+        with self._lock:
+            n = len(self)
+            if n == self._size:
+                return self._frame
+            meta = self._read_meta()   # 長さを見てから辞書を読む（読んだレコードの名前は必ず載っている）
+            start = self._size or 0
+            if n < start:
+                # ファイルが作り直された（短くなった）ときは最初から読む
+                start, self._frame, self._seen = 0, pd.DataFrame(), {}
+            if n == 0:
+                self._frame, self._size = pd.DataFrame(), 0
+                return self._frame
+            rec = np.memmap(self.path, dtype=self.dtype, mode="r",
+                            offset=start * self.dtype.itemsize, shape=(n - start,))
+            cols = {}
+            for col, kind, _ in self.fields:
+                if kind == "time":
+                    # NAT_NS はそのまま NaT になる（単位は read_csv → to_datetime と同じマイクロ秒にそろえる）
+                    cols[col] = rec[col].view("datetime64[ns]").astype("datetime64[us]")
+                elif kind == "code":
+                    cols[col] = np.array(rec[col])
+                else:
+                    names = meta["names"].get(col, [])
+                    seen = self._seen.get(col, np.zeros(0, dtype=bool))
+                    seen = np.concatenate([seen, np.zeros(len(names) - len(seen), dtype=bool)])
+                    codes = np.asarray(rec[col], dtype=np.int32)
+                    seen[codes[codes >= 0]] = True
+                    self._seen[col] = seen
+                    cols[col] = _categorical(codes, names, meta.get("categories", {}).get(col), seen)
+            del rec
+            frame = pd.DataFrame(cols)
+            if self.derive is not None:
+                frame = self.derive(frame)
+            if start:
+                frame = _append(self._frame, frame)
+            else:
+                order = [c for c in meta["columns"] if c in frame.columns]
+                frame = frame[order + [c for c in frame.columns if c not in order]]
+            self._frame, self._size = frame, n
+            return frame
+
+
+def _append(base: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """前回の表に増えた分を連結する。新しい名前が出てカテゴリが増えた列だけ、前回の分のカテゴリを付け直す"""
+    grown = {c: base[c].cat.set_categories(new[c].cat.categories)
+             for c in base.columns
+             if isinstance(base[c].dtype, pd.CategoricalDtype) and base[c].dtype != new[c].dtype}
+    if grown:
+        base = base.assign(**grown)
+    return pd.concat([base, new[base.columns]], ignore_index=True)
+
+
+def _categorical(codes: np.ndarray, names: list, dtype=None, seen=None) -> pd.Categorical:
+    """辞書の番号 → カテゴリ（カテゴリは read_csv → astype('category') と同じく値の昇順にする）
+
+    seen は表全体で出てきた辞書の番号。カテゴリはそのうちの名前だけにする（省略時は codes に出てきた番号）
+    """
+    names = np.asarray(names, dtype=object)
+    codes = np.asarray(codes, dtype=np.int32)
+    if seen is None:
+        seen = np.zeros(len(names), dtype=bool)
+        seen[codes[codes >= 0]] = True
+    used = np.flatnonzero(seen)
+    used = used[np.argsort(names[used], kind="stable")]
+    remap = np.full(len(names) + 1, -1, dtype=np.int32)   # 空欄（-1）は -1 のまま
+    remap[used] = np.arange(len(used))
+    return pd.Categorical.from_codes(remap[codes], categories=pd.Index(list(names[used]), dtype=dtype))
+
+
+def date_column(ts: np.ndarray) -> np.ndarray:
+    """日時（datetime64）→ datetime.date の列（空欄は NaT）。日付の種類だけ date を作って並べる"""
+    ns = np.asarray(ts, dtype="datetime64[ns]").view(np.int64)
+    dated = ns != NAT_NS
+    days, inv = np.unique(ns[dated] // DAY_NS, return_inverse=True)
+    out = np.full(len(ns), pd.NaT, dtype=object)
+    out[dated] = days.astype("datetime64[D]").astype(object)[inv]
+    return out
+
+
+if __name__ == "__main__":
+    from practice_data import EVENT_KINDS, binlog
+    from data_fetch import parse_events
+    parser = argparse.ArgumentParser(description="記録ツールのCSV（S3・公開CSVと同じ列）かイベントログ（.jsonl）をバイナリログに追記する")
+    parser.add_argument("kind")
+    parser.add_argument("source", help="CSV か ingest_server.py のイベントログ（<kind>.jsonl）")
+    parser.add_argument("--dir", default=None, help="ログのディレクトリ（省略時は LAX_BINLOG）")
+    args = parser.parse_args()
+    if not (args.dir or BINLOG_DIR):
+        parser.error("--dir か LAX_BINLOG でログのディレクトリを指定してください")
+    log = binlog(args.kind, args.dir)
+    if args.source.endswith(".jsonl"):
+        with open(args.source, encoding="utf-8") as f:
+            raw = parse_events(line for line in f if line.strip())
+    else:
+        raw = pd.read_csv(args.source)
+    frame = EVENT_KINDS[args.kind](raw)
+    ts_col = next(col for col, kind, _ in log.fields if kind == "time")
+    # 時刻順に書いておくと、読む側の並べ替え（time_index.sort_by_time）が要らなくなる
+    added = log.append(frame.sort_values(ts_col, kind="stable", na_position="first"))
+    print(f"{args.kind}: {added} 件を追記（合計 {len(log)} 件・{os.path.getsize(log.path) / 2**20:.1f} MB）")
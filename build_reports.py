@@ -0,0 +1,361 @@
+import argparse
+import hashlib
+import html
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from urllib.parse import quote
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# ==========================================
+# 選手ごとのレポート（静的なHTML）をまとめて作る
+# ==========================================
+# 各アプリ（app.py・1on1app.py・practice_app.py）の選手ごとの画面（シューター・ゴーリー・AT・DF）を
+# Streamlit AppTest で画面なしに動かし、表示された見出し・指標・表・グラフ（Plotly の JSON）を
+# 1選手1ページの HTML に書き出す。タブは全てのタブを開いて並べる。
+# グラフのデータはページに埋め込み、plotly.js は出力先に1つだけ置いて各ページから相対パスで読む（ネット接続は要らない）。
+# 閲覧だけの人は Streamlit のサーバーを使わず、出力先のフォルダ（index.html から選手を選ぶ）を見ればよい。
+#
+# 選手を数人ずつの組に分けてプロセスプールで並列に作る（組ごとにアプリを1回起動して、選手を切り替えていく）。
+# ページごとに「その選手の行」とコードの指紋を manifest.json に控え、前回から変わったページだけを作り直す。
+# データから居なくなった選手のページは消す。
+#
+#   python build_reports.py                             # .cache/site に出力（本物の取得元から読む）
+#   python build_reports.py --out site --workers 8      # 出力先・並列数
+#   python build_reports.py --views app/shooter --force # ページの種類を絞る・全て作り直す
+#   python build_reports.py --data bench/data/1k        # bench/synth.py の合成データで試す
+DEFAULT_OUT = os.path.join(ROOT, ".cache", "site")
+BATCH_SIZE = 8
+PAGE_TIMEOUT = 300
+REPORT_FORMAT = 1   # ページの作りを変えたら上げる（全ページを作り直す）
+
+# ページの種類: 名前 → (アプリ, 練習種目, 表示モード, 選手を選ぶセレクトボックス, 選手の列, データ)
+VIEWS = {
+    "app/shooter":          ("app.py", None, "🔴 シューター分析", "分析するシューターを選択", "背番号", "freeshoot_sheet"),
+    "app/goalie":           ("app.py", None, "🔵 ゴーリー分析", "分析するゴーリーを選択", "ゴーリー", "freeshoot_sheet"),
+    "1on1app/at":           ("1on1app.py", None, "🔴 AT分析", "分析するATを選択", "AT", "1on1_sheet"),
+    "1on1app/df":           ("1on1app.py", None, "🔵 DF分析", "分析するDFを選択", "DF", "1on1_sheet"),
+    "1on1app/goalie":       ("1on1app.py", None, "🟡 ゴーリー分析", "分析するゴーリーを選択", "ゴーリー", "1on1_sheet"),
+    "practice/fs-shooter":  ("practice_app.py", "🥍 フリーシュー", "🔴 シューター分析", "シューターを選択", "背番号", "freeshoot_recorder"),
+    "practice/fs-goalie":   ("practice_app.py", "🥍 フリーシュー", "🔵 ゴーリー分析", "ゴーリーを選択", "ゴーリー", "freeshoot_recorder"),
+    "practice/1on1-at":     ("practice_app.py", "⚔️ 1on1", "🔴 AT分析", "ATを選択", "AT", "1on1_recorder"),
+    "practice/1on1-df":     ("practice_app.py", "⚔️ 1on1", "🔵 DF分析", "DFを選択", "DF", "1on1_recorder"),
+    "practice/1on1-goalie": ("practice_app.py", "⚔️ 1on1", "🟡 ゴーリー分析", "ゴーリーを選択", "ゴーリー", "1on1_recorder"),
+}
+ALL_PLAYERS = "全体"
+
+log = logging.getLogger(__name__)
+
+
+# ==========================================
+# 作るページと指紋
+# ==========================================
+def load_tables(names) -> dict:
+    """データ名 → 整形済みの表（アプリと同じローダー。practice_data は取得元の準備の後に読み込む）"""
+    import practice_data
+    loaders = {
+        "freeshoot_sheet": practice_data.load_freeshoot_sheet,
+        "1on1_sheet": practice_data.load_1on1_sheet,
+        "freeshoot_recorder": practice_data.load_freeshoot_recorder,
+        "1on1_recorder": practice_data.load_1on1_recorder,
+    }
+    return {name: loaders[name]() for name in names}
+
+
+def code_version() -> str:
+    """アプリと共通モジュールのソースの指紋（コードが変わったら全ページを作り直す）"""
+    h = hashlib.sha1(str(REPORT_FORMAT).encode())
+    for name in sorted(os.listdir(ROOT)):
+        if name.endswith(".py"):
+            with open(os.path.join(ROOT, name), "rb") as f:
+                h.update(name.encode() + b"\0" + f.read())
+    return h.hexdigest()
+
+
+def page_path(view: str, player: str) -> str:
+    """出力先からのページの相対パス（選手名の記号は _ にする）"""
+    slug = re.sub(r"[^\w-]+", "_", player).strip("_") or hashlib.sha1(player.encode()).hexdigest()[:8]
+    return f"{view}/{slug}.html"
+
+
+def plan(views, tables: dict, code: str) -> dict:
+    """ページの相対パス → (ページの種類, 選手, 指紋)。指紋は選手の行（全体は全ての行）とコードから作る"""
+    pages = {}
+    for view in views:
+        col, data = VIEWS[view][4], VIEWS[view][5]
+        table = tables[data]
+        if table.empty or col not in table.columns:
+            continue
+        rows = pd.util.hash_pandas_object(table, index=False).to_numpy()   # 1行ずつの指紋
+        groups = pd.Series(range(len(table))).groupby(table[col].astype(object).to_numpy(), sort=True)
+        players = [(ALL_PLAYERS, rows)] + [(str(p), rows[idx.to_numpy()]) for p, idx in groups]
+        for player, player_rows in players:
+            digest = hashlib.sha1(f"{code}\0{view}\0{player}\0".encode() + player_rows.tobytes()).hexdigest()
+            pages[page_path(view, player)] = (view, player, digest)
+    return pages
+
+
+# ==========================================
+# ページの書き出し（ワーカープロセス）
+# ==========================================
+PAGE_STYLE = """
+body{font-family:sans-serif;margin:1.5rem auto;max-width:1200px;padding:0 1rem;color:#262730}
+nav{margin-bottom:1rem}.row{display:flex;gap:1rem;flex-wrap:wrap}.row>div{flex:1;min-width:280px}
+.metric{font-size:.9rem;color:#555}.metric b{display:block;font-size:1.8rem;color:#262730}
+table{border-collapse:collapse;font-size:.85rem;margin:.5rem 0}th,td{border:1px solid #ddd;padding:.2rem .5rem;text-align:right}
+.tab{border-top:2px solid #ff4b4b;margin-top:1.5rem}.alert{background:#f0f2f6;padding:.5rem 1rem;border-radius:.3rem}
+"""
+
+
+class PageWriter:
+    """AppTest の要素の木 → HTML（グラフは Plotly の JSON をそのまま埋め込む）"""
+
+    def __init__(self):
+        self.charts = 0
+
+    def chart(self, spec: str) -> str:
+        self.charts += 1
+        div = f"chart{self.charts}"
+        spec = spec.replace("</", "<\\/")   # <script> の中に置くので、閉じタグに見える並びを崩す
+        return (f'<div id="{div}"></div><script>(function(f){{Plotly.newPlot("{div}",f.data,f.layout,'
+                f'{{responsive:true,displaylogo:false}});}})({spec});</script>')
+
+    def node(self, node, tabs: dict) -> str:
+        kind = getattr(node, "type", "")
+        children = getattr(node, "children", None)
+        if kind == "tab":
+            body = "".join(self.node(children[k], tabs) for k in sorted(children)) if children else tabs.get(node.label, "")
+            return f'<section class="tab"><h3>{html.escape(node.label)}</h3>{body}</section>'
+        if children is not None:
+            inner = "".join(self.node(children[k], tabs) for k in sorted(children))
+            if kind == "flex_container":
+                return f'<div class="row">{inner}</div>'
+            return f"<div>{inner}</div>" if kind == "column" else inner
+        if kind in ("title", "header", "subheader"):
+            tag = {"title": "h1", "header": "h2", "subheader": "h3"}[kind]
+            return f"<{tag}>{html.escape(str(node.value))}</{tag}>"
+        if kind in ("markdown", "caption"):
+            return f"<p>{html.escape(str(node.value))}</p>"
+        if kind in ("info", "warning", "error", "success"):
+            return f'<p class="alert">{html.escape(str(node.value))}</p>'
+        if kind == "metric":
+            return f'<div class="metric">{html.escape(str(node.label))}<b>{html.escape(str(node.value))}</b></div>'
+        if kind in ("dataframe", "table"):
+            return node.value.to_html(border=0)
+        if kind == "divider":
+            return "<hr>"
+        if kind == "plotly_chart":
+            return self.chart(node.proto.spec)
+        return ""   # 入力欄（ラジオ・セレクトボックス）などは出さない
+
+
+def _tab_groups(node) -> list:
+    """画面にあるタブの組ごとのタブの名前"""
+    children = getattr(node, "children", None) or {}
+    if getattr(node, "type", "") == "tab_container":
+        return [[children[k].label for k in sorted(children)]]
+    return [group for k in sorted(children) for group in _tab_groups(children[k])]
+
+
+def _tab_keys(at) -> dict:
+    """開いたタブだけを計算するタブ（sections.lazy_tabs）の key → (今開いているタブ, 同じ組のタブの名前)"""
+    groups = _tab_groups(at.main)
+    keys = {}
+    for k, v in at.session_state.items():
+        group = next((g for g in groups if isinstance(v, str) and v in g), None)
+        if group is not None:
+            keys[k] = (v, group)
+    return keys
+
+
+def render_page(at, view: str, player: str) -> str:
+    """今の画面（選手を選んだ後）を1ページの HTML にする。閉じているタブは開き直して中身を集める"""
+    writer = PageWriter()
+    tabs = {}
+    for key, (opened, labels) in _tab_keys(at).items():
+        for label in labels:
+            if label == opened or label in tabs:
+                continue
+            at.session_state[key] = label
+            at.run()
+            tab = next((t for t in at.tabs if t.label == label), None)
+            if tab is not None and tab.children:
+                tabs[label] = "".join(writer.node(tab.children[k], {}) for k in sorted(tab.children))
+        at.session_state[key] = opened
+        at.run()
+    body = writer.node(at.main, tabs)
+    label = VIEWS[view][2]
+    depth = view.count("/") + 1
+    return (f'<!DOCTYPE html><html lang="ja"><head><meta charset="utf-8"><title>{html.escape(player)} - {html.escape(label)}</title>'
+            f'<script src="{"../" * depth}plotly.min.js"></script><style>{PAGE_STYLE}</style></head><body>'
+            f'<nav><a href="{"../" * depth}index.html">← 一覧</a> ／ {html.escape(label)}</nav>{body}'
+            f'<footer><p class="metric">{time.strftime("%Y-%m-%d %H:%M")} 作成</p></footer></body></html>')
+
+
+def _use_stand_ins(data_dir: str):
+    """合成データ（bench/synth.py）を取得元の代わりにする。スナップショット・試合のDBはプロセスごとの一時ディレクトリに"""
+    from bench.rerun import stand_ins
+    stand_ins(data_dir, tempfile.mkdtemp(prefix="lax-reports-")).start()
+
+
+def _init_worker(data_dir):
+    logging.disable(logging.WARNING)   # アプリの警告（取得元の再試行など）はワーカーでは出さない
+    warnings.filterwarnings("ignore")
+    if data_dir:
+        _use_stand_ins(data_dir)
+
+
+def _select(widgets, label: str):
+    found = [w for w in widgets if w.label == label]
+    if not found:
+        raise LookupError(f"「{label}」が画面にありません")
+    return found[0]
+
+
+def render_batch(view: str, pages: list, out_dir: str) -> list:
+    """ワーカー: view のアプリを1回起動し、pages（(相対パス, 選手, 指紋) の並び）を順に書き出す。
+    戻り値は (相対パス, 指紋, エラー) の並び（エラーが無ければ None）"""
+    from streamlit.testing.v1 import AppTest
+    app, practice, mode, picker = VIEWS[view][:4]
+    at = AppTest.from_file(os.path.join(ROOT, app), default_timeout=PAGE_TIMEOUT)
+    at.run()
+    if practice:
+        _select(at.sidebar.radio, "練習種目").set_value(practice).run()
+    _select(at.sidebar.radio, "表示モード").set_value(mode).run()
+    done = []
+    for rel, player, digest in pages:
+        try:
+            box = _select(at.sidebar.selectbox, picker)
+            if player not in box.options:
+                raise LookupError(f"{player} は「{picker}」にありません")
+            box.set_value(player).run()
+            if len(at.exception):
+                raise RuntimeError(at.exception[0].value)
+            page = render_page(at, view, player)
+            path = os.path.join(out_dir, rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(page)
+            os.replace(tmp, path)
+            done.append((rel, digest, None))
+        except Exception as e:
+            done.append((rel, digest, f"{type(e).__name__}: {e}"))
+    return done
+
+
+# ==========================================
+# 一覧・全体の流れ
+# ==========================================
+def write_index(out_dir: str, manifest: dict):
+    """作ってあるページ（manifest.json）の一覧"""
+    groups = {}
+    order = lambda p: (list(VIEWS).index(p[1]["view"]), p[1]["player"] != ALL_PLAYERS, p[1]["player"])
+    for rel, page in sorted(((r, p) for r, p in manifest.items() if p["view"] in VIEWS), key=order):
+        groups.setdefault(page["view"], []).append((rel, page["player"]))
+    body = []
+    for view, links in groups.items():
+        app, practice, mode = VIEWS[view][:3]
+        title = " ／ ".join(x for x in (app, practice, mode) if x)
+        items = "".join(f'<li><a href="{quote(rel)}">{html.escape(player)}</a></li>' for rel, player in links)
+        body.append(f"<h2>{html.escape(title)}</h2><ul>{items}</ul>")
+    with open(os.path.join(out_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(f'<!DOCTYPE html><html lang="ja"><head><meta charset="utf-8"><title>選手別レポート</title>'
+                f'<style>{PAGE_STYLE}ul{{columns:4}}</style></head><body><h1>選手別レポート</h1>{"".join(body)}'
+                f'<p class="metric">{time.strftime("%Y-%m-%d %H:%M")} 更新</p></body></html>')
+
+
+def write_plotlyjs(out_dir: str):
+    """ページが読む plotly.js（Python の plotly に同梱のもの）を出力先に1つだけ置く"""
+    from plotly.offline import get_plotlyjs
+    path = os.path.join(out_dir, "plotly.min.js")
+    js = get_plotlyjs().encode("utf-8")
+    if not os.path.exists(path) or os.path.getsize(path) != len(js):
+        with open(path, "wb") as f:
+            f.write(js)
+
+
+def build(out_dir: str, views, workers: int, batch_size: int = BATCH_SIZE, force: bool = False, data_dir: str = None) -> dict:
+    """変わったページだけを作り直し、manifest.json と index.html を更新する。戻り値は件数の集計"""
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        manifest = {}
+
+    tables = load_tables({VIEWS[v][5] for v in views})
+    pages = plan(views, tables, code_version())
+    todo = {}
+    for rel, (view, player, digest) in pages.items():
+        if force or manifest.get(rel, {}).get("digest") != digest or not os.path.exists(os.path.join(out_dir, rel)):
+            todo.setdefault(view, []).append((rel, player, digest))
+
+    # データから居なくなった選手のページ（この実行で対象にした種類のうち）を消す
+    removed = [rel for rel, page in manifest.items() if page.get("view") in views and rel not in pages]
+    for rel in removed:
+        manifest.pop(rel)
+        try:
+            os.remove(os.path.join(out_dir, rel))
+        except FileNotFoundError:
+            pass
+
+    batches = [(view, items[i:i + batch_size]) for view, items in todo.items() for i in range(0, len(items), batch_size)]
+    errors = []
+    if batches:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data_dir,)) as pool:
+            futures = [pool.submit(render_batch, view, items, out_dir) for view, items in batches]
+            for future in as_completed(futures):
+                for rel, digest, error in future.result():
+                    if error is None:
+                        manifest[rel] = {"view": pages[rel][0], "player": pages[rel][1], "digest": digest}
+                    else:
+                        manifest.pop(rel, None)   # 次回また作る
+                        errors.append((rel, error))
+                        log.warning("%s を作れませんでした: %s", rel, error)
+
+    write_plotlyjs(out_dir)
+    write_index(out_dir, manifest)
+    tmp = manifest_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, manifest_path)
+    return {"pages": len(pages), "rebuilt": sum(len(items) for items in todo.values()) - len(errors),
+            "unchanged": len(pages) - sum(len(items) for items in todo.values()), "removed": len(removed), "errors": errors}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="選手ごとのレポート（静的なHTML）を並列に作る（変わったページだけ）")
+    parser.add_argument("--out", default=DEFAULT_OUT, help="出力先のフォルダ")
+    parser.add_argument("--views", default=",".join(VIEWS), help="作るページの種類（カンマ区切り）: " + ", ".join(VIEWS))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="並列に動かすプロセスの数")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="1つのワーカーがまとめて作る選手の数")
+    parser.add_argument("--force", action="store_true", help="変わっていないページも作り直す")
+    parser.add_argument("--data", help="取得元の代わりに使う合成データ（bench/data/<size>）")
+    args = parser.parse_args()
+    views = [v for v in args.views.split(",") if v]
+    unknown = [v for v in views if v not in VIEWS]
+    if unknown:
+        parser.error(f"ページの種類が違います: {', '.join(unknown)}")
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    sys.path.insert(0, ROOT)
+    data_dir = os.path.abspath(args.data) if args.data else None
+    if data_dir:
+        _use_stand_ins(data_dir)
+    # ワーカーに渡す関数は __main__ ではなくモジュールの名前で送る（AppTest がワーカーの __main__ を差し替えるため）
+    import build_reports
+    t0 = time.perf_counter()
+    result = build_reports.build(os.path.abspath(args.out), views, args.workers, args.batch_size, args.force, data_dir)
+    print(f"{result['pages']} ページ: 作り直し {result['rebuilt']}・変更なし {result['unchanged']}・削除 {result['removed']}"
+          f"・失敗 {len(result['errors'])}（{time.perf_counter() - t0:.1f} 秒） → {os.path.join(args.out, 'index.html')}")
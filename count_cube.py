@@ -0,0 +1,52 @@
+import threading
+
+import pandas as pd
+
+import perf
+from stream_ingest import fold_counts
+from time_index import sort_by_time
+
+# ==========================================
+# 件数の集計キューブ
+# ==========================================
+# 日付・選手・エリア・コース・結果などのキーの組み合わせごとに、件数とフラグ列を合計した表。
+# 列名は生データと同じなので、件数で重み付けして集計している画面はそのまま使える。
+# データの版ごとに1回だけ作り、選手の切り替えは値ごとの行位置（索引）から取り出すだけにする。
+
+
+class CountCube:
+    """件数の集計キューブと、その切り出し
+
+    table: 集計済みの表（共有オブジェクトなので書き換えないこと）
+    slice(col, value): キー列 col が value の行だけを取り出す
+    """
+
+    def __init__(self, frame: pd.DataFrame, keys, sums):
+        self.keys = [k for k in keys if k in frame.columns]
+        self.table = fold_counts([frame], self.keys, sums) if not frame.empty else frame
+        self._index = {}   # 列名 → {値: 行位置の配列}
+        self._lock = threading.Lock()
+
+    def _positions(self, col: str) -> dict:
+        with self._lock:
+            idx = self._index.get(col)
+            if idx is None:
+                # 列ごとに最初の1回だけ作る（以降の切り出しは辞書を引くだけ）
+                idx = self.table.groupby(col, observed=True, sort=False).indices
+                self._index[col] = idx
+            return idx
+
+    def index_by_time(self, ts_col: str) -> "CountCube":
+        """表を ts_col の時刻順に並べ替える（切り出した表も時刻順のままなので、期間は二分探索で絞れる）"""
+        self.table = sort_by_time(self.table, ts_col)
+        with self._lock:
+            self._index.clear()
+        return self
+
+    @perf.timed("filter")
+    def slice(self, col: str, value) -> pd.DataFrame:
+        pos = self._positions(col).get(value)
+        if pos is None:
+            return self.table.iloc[0:0]
+        return self.table.take(pos)
+
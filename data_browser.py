@@ -0,0 +1,158 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+import perf
+from data_fetch import per_version
+from time_index import EPOCH_COL, time_positions
+
+# ==========================================
+# 全データ一覧（並べ替え・絞り込みをサーバー側で行い、1ページ分だけを表示する）
+# ==========================================
+# 全行を並べ替えて st.dataframe に渡す代わりに、データの版ごとに列ごとの並び順（行位置の並び）を
+# 一度だけ作っておき、表示するページの行だけを取り出して渡す。
+# 並び順は列ごとに初めて並べ替えたときに作る。期間・絞り込みの条件ごとの並び順は
+# その並び順から条件に合う行を抜き出したもので、直近の数件を覚えておく。
+# そのため、ページ送りと（一度並べ替えた列での）並べ替えの切り替えは、1ページ分の行数だけの処理で済む。
+PAGE_SIZE = 100
+PAGE_SIZES = (50, 100, 500)
+MAX_FILTER_CHOICES = 200   # これより種類の多い列（日時など）は絞り込みの候補に出さない
+RECENT_VIEWS = 16
+ORIGINAL_ORDER = "（記録順）"
+
+
+class DataBrowser:
+    """1つの表（データの版）の列ごとの並び順と、条件ごとの並び順の控え"""
+
+    def __init__(self, table: pd.DataFrame):
+        self.table = table
+        self._orders = {}                 # (列, 降順) → 全行の並び順
+        self._views = OrderedDict()       # (列, 降順, 期間, 絞り込み) → 条件に合う行の並び順
+        self._lock = threading.Lock()
+
+    def _keys(self, col: str) -> np.ndarray:
+        """列の値の昇順の順位（欠損は -1）。カテゴリはカテゴリの順（sort_values と同じ）"""
+        s = self.table[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            return s.cat.codes.to_numpy()
+        try:
+            return pd.factorize(s, sort=True)[0]
+        except TypeError:
+            # 数値と文字列が混ざった列などは、文字列として並べる
+            return pd.factorize(s.astype(str).where(s.notna()), sort=True)[0]
+
+    def order(self, col, descending: bool) -> np.ndarray:
+        """全行の並び順（行位置）。欠損は昇順・降順とも末尾。同じ値の行は、昇順では元の順、降順ではその逆
+        （時刻順の表なら、降順で同じ日付の中も新しい行が先になる）。col が None なら元の順"""
+        if col is None:
+            order = np.arange(len(self.table))
+            return order[::-1] if descending else order
+        key = (col, descending)
+        with self._lock:
+            hit = self._orders.get(key)
+        if hit is not None:
+            return hit
+        with perf.span("aggregate"):
+            ranks = self._keys(col).astype(np.int64)
+            if descending:
+                order = np.argsort(np.where(ranks < 0, -1, ranks), kind="stable")[::-1]
+            else:
+                order = np.argsort(np.where(ranks < 0, ranks.max() + 1, ranks), kind="stable")
+        with self._lock:
+            self._orders[key] = order
+        return order
+
+    def choices(self, col: str) -> list:
+        """絞り込みの候補（表に出てくる値。種類が多すぎる列は空）"""
+        s = self.table[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            codes = s.cat.codes.to_numpy()
+            values = s.cat.categories[np.unique(codes[codes >= 0])]
+        else:
+            values = s.dropna().unique()
+        if len(values) > MAX_FILTER_CHOICES:
+            return []
+        try:
+            return sorted(values)
+        except TypeError:
+            return sorted(values, key=str)
+
+    def rows(self, col, descending: bool, span=None, filters=()) -> np.ndarray:
+        """条件に合う行の並び順。span は行位置の範囲 (lo, hi)、filters は (列, 値の並び) の並び"""
+        key = (col, descending, span, filters)
+        with self._lock:
+            hit = self._views.get(key)
+            if hit is not None:
+                self._views.move_to_end(key)
+                return hit
+        order = self.order(col, descending)
+        if span is None and not filters:
+            return order
+        with perf.span("filter"):
+            keep = np.ones(len(self.table), dtype=bool)
+            if span is not None:
+                keep[:span[0]] = False
+                keep[span[1]:] = False
+            for c, values in filters:
+                keep &= self.table[c].isin(values).to_numpy()
+            rows = order[keep[order]]
+        with self._lock:
+            self._views[key] = rows
+            while len(self._views) > RECENT_VIEWS:
+                self._views.popitem(last=False)
+        return rows
+
+    def page(self, rows: np.ndarray, page: int, size: int, columns=None) -> pd.DataFrame:
+        """rows の page ページ目（0始まり）の行"""
+        picked = self.table.iloc[rows[page * size:(page + 1) * size]]
+        return picked if columns is None else picked[columns]
+
+
+def _reset_page(key: str):
+    st.session_state[f"{key}_page"] = 1
+
+
+def browse(name: str, table: pd.DataFrame, *, key: str, hidden=(), sort=None, descending: bool = True,
+           start=None, end=None):
+    """全データ一覧を表示する
+
+    name はデータの版ごとの並び順の控えの名前、table は共有の表（sort_by_time 済みなら start〜end で期間を絞る）。
+    hidden は表示しない列、sort は最初に並べ替える列（None なら記録順）。key は画面ごとに別の名前にする。
+    """
+    if table.empty:
+        st.info("データがありません。")
+        return
+    browser = per_version(f"{name}:browser", table, DataBrowser)
+    columns = [c for c in table.columns if c not in hidden and c != EPOCH_COL]
+    span = time_positions(table, start, end) if start is not None and EPOCH_COL in table.columns else None
+
+    c_sort, c_desc, c_filter, c_values = st.columns([2, 1, 2, 3])
+    sort_options = [ORIGINAL_ORDER] + columns
+    sort_col = c_sort.selectbox("並べ替え", sort_options, index=sort_options.index(sort) if sort in columns else 0,
+                                key=f"{key}_sort", on_change=_reset_page, args=(key,))
+    desc = c_desc.toggle("降順", value=descending, key=f"{key}_desc", on_change=_reset_page, args=(key,))
+    filter_col = c_filter.selectbox("絞り込む列", ["なし"] + columns, key=f"{key}_filter_col", on_change=_reset_page, args=(key,))
+    filters = ()
+    if filter_col != "なし":
+        options = browser.choices(filter_col)
+        if options:
+            picked = c_values.multiselect("値", options, key=f"{key}_filter_{filter_col}", on_change=_reset_page, args=(key,))
+            if picked:
+                filters = ((filter_col, tuple(picked)),)
+        else:
+            c_values.caption("値の種類が多い列は絞り込めません")
+
+    rows = browser.rows(None if sort_col == ORIGINAL_ORDER else sort_col, desc, span, filters)
+    c_size, c_page, c_count = st.columns([1, 1, 3])
+    size = c_size.selectbox("表示件数", PAGE_SIZES, index=PAGE_SIZES.index(PAGE_SIZE), key=f"{key}_size",
+                            on_change=_reset_page, args=(key,))
+    pages = max(1, -(-len(rows) // size))
+    if st.session_state.setdefault(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    page = c_page.number_input("ページ", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    first = (page - 1) * size
+    c_count.caption(f"全 {len(rows):,} 件中 {min(first + 1, len(rows)):,}–{min(first + size, len(rows)):,} 件目（{page} / {pages} ページ）")
+    st.dataframe(browser.page(rows, page - 1, size, columns), use_container_width=True)
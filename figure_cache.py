@@ -0,0 +1,141 @@
+import functools
+import itertools
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import plotly.io as pio
+
+import perf
+
+# ==========================================
+# グラフのキャッシュ（全ダッシュボード共通・プロセス内で共有）
+# ==========================================
+# 作ったグラフを JSON にして (データの版, 絞り込み条件, 画面, モード) ごとに持っておき、
+# 同じ条件のグラフは集計も px.imshow / px.pie / px.line も省いて JSON から戻すだけにする。
+# 全閲覧者で共有するので、誰かが見たばかりのシューター・ゴーリーはすぐに表示できる。
+# 件数が上限を超えたら、最も長く使われていないものから捨てる（LRU）。
+# 画面に出す集計表（ピボット表・ランキング）も同じ仕組みで持つ（cached_table）。
+FIGURE_CACHE_SIZE = int(os.environ.get("LAX_FIGURE_CACHE_SIZE", "256"))
+
+
+class FigureCache:
+    """グラフの JSON を LRU で持つ"""
+    kind = "figure"   # 計測（perf.py）での名前
+
+    def __init__(self, max_entries: int = FIGURE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # キー → グラフの JSON
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, build):
+        """key のグラフがあればそれを、無ければ build() で作って覚えたものを返す"""
+        try:
+            hash(key)
+        except TypeError:
+            with perf.span(self.kind):
+                return build()   # キーにできない条件（表やマスクそのもの）を含む場合は毎回作る
+        with self._lock:
+            stored = self._entries.get(key)
+            if stored is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        perf.count(self.kind, stored is not None)
+        with perf.span(self.kind):
+            if stored is not None:
+                return self._load(stored)
+            value = build()
+            stored = self._dump(value)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = stored
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def _dump(self, fig):
+        return fig.to_json()
+
+    def _load(self, js):
+        return pio.from_json(js)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class TableCache(FigureCache):
+    """画面に出す集計表（DataFrame）を LRU で持つ。返す表は共有なので書き換えないこと"""
+    kind = "table"
+
+    def _dump(self, table):
+        return table
+
+    def _load(self, table):
+        return table
+
+
+_figures = FigureCache()
+_tables = TableCache()
+
+
+def cached_figure(key, build):
+    """key（データの版・絞り込み条件・画面を表すタプル）ごとに build() のグラフを使い回す"""
+    return _figures.get_or_build(key, build)
+
+
+def cached_table(key, build):
+    """key ごとに build() の集計表（ピボット表・ランキングなど）を使い回す"""
+    return _tables.get_or_build(key, build)
+
+
+def _key_part(v):
+    # 関数（絞り込み条件のラムダなど）は再実行のたびに作り直されるので名前で表す
+    return getattr(v, "__qualname__", v) if callable(v) else v
+
+
+def figure_builder(func):
+    """グラフを作る関数に付ける。key= を渡した呼び出しだけ (関数, key, 残りの引数) でキャッシュする
+
+    先頭の引数（集計する表）の中身は key で表すこと（例: (data_version(cube), 期間, 選手)）。
+    """
+    name = (func.__code__.co_filename, func.__qualname__)
+
+    @functools.wraps(func)
+    def wrapper(data, *args, key=None, **kwargs):
+        if key is None:
+            return func(data, *args, **kwargs)
+        full_key = (name, key, tuple(_key_part(a) for a in args),
+                    tuple(sorted((k, _key_part(v)) for k, v in kwargs.items())))
+        return cached_figure(full_key, lambda: func(data, *args, **kwargs))
+    return wrapper
+
+
+# ==========================================
+# データの版のトークン
+# ==========================================
+# ローダー・キューブは版が変わらない限り同じオブジェクトを返すので、オブジェクトごとに
+# 番号を振って版として使う（番号は使い回さないので、作り直された表とは必ず別のキーになる）
+_versions = {}   # id(obj) → 番号
+_versions_lock = threading.Lock()
+_counter = itertools.count(1)
+
+
+def _forget(obj_id: int):
+    with _versions_lock:
+        _versions.pop(obj_id, None)
+
+
+def data_version(obj) -> int:
+    """obj（共有の表・キューブ）の版を表す番号"""
+    with _versions_lock:
+        token = _versions.get(id(obj))
+        if token is None:
+            token = next(_counter)
+            _versions[id(obj)] = token
+            weakref.finalize(obj, _forget, id(obj))
+        return token
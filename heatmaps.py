@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+import perf
+
+# ==========================================
+# ヒートマップの集計エンジン（全ダッシュボード共通）
+# ==========================================
+# セルの値（エリア番号・コース番号・起点名）→ グリッド上の (行, 列) をレイアウトとして持ち、
+# 全行をいったんセル番号に変換してから np.bincount 1回で全セルの分子・分母を数える。
+# セルごとにDataFrameを絞り込み直す必要がないので、行数が増えても1パスで済む。
+
+
+class GridLayout:
+    """セルの値 → グリッド上の (行, 列) の対応表"""
+
+    def __init__(self, cells: dict, shape):
+        self.cells = cells
+        self.shape = shape
+        self.size = shape[0] * shape[1]
+        self._flat = {k: r * shape[1] + c for k, (r, c) in cells.items()}
+        # 整数コード用の変換表（コード → セル番号、対象外は -1）
+        if all(isinstance(k, int) for k in cells):
+            self._lut = np.full(max(cells) + 1, -1, dtype=np.int64)
+            for k, i in self._flat.items():
+                self._lut[k] = i
+        else:
+            self._lut = None
+
+    def flat_index(self, keys: pd.Series) -> np.ndarray:
+        """各行のセル番号（グリッドを1列に並べた番号。どのセルにも入らない行は -1）"""
+        if self._lut is not None:
+            codes = np.asarray(keys, dtype=np.int64)
+            inside = (codes >= 0) & (codes < len(self._lut))
+            return np.where(inside, self._lut[np.where(inside, codes, 0)], -1)
+        if isinstance(keys.dtype, pd.CategoricalDtype):
+            # カテゴリごとに1回だけ引いて、あとは各行のカテゴリ番号で取り出す
+            per_cat = np.array([self._flat.get(str(c), -1) for c in keys.cat.categories] + [-1], dtype=np.int64)
+            return per_cat[keys.cat.codes.to_numpy()]
+        return keys.map(self._flat).fillna(-1).to_numpy(dtype=np.int64)
+
+
+AREA_2x5 = GridLayout({
+    1: (0, 0), 2: (0, 1), 3: (0, 2), 4: (0, 3), 5: (0, 4),
+    6: (1, 0), 7: (1, 1), 8: (1, 2), 9: (1, 3), 10: (1, 4),
+}, (2, 5))
+COURSE_3x3 = GridLayout({
+    1: (0, 0), 2: (0, 1), 3: (0, 2),
+    4: (1, 0), 5: (1, 1), 6: (1, 2),
+    7: (2, 0), 8: (2, 1), 9: (2, 2),
+}, (3, 3))
+ORIGIN_3x3 = GridLayout({
+    '左上': (0, 0), 'センター': (0, 1), '右上': (0, 2),
+    '左横': (1, 0), '右横': (1, 2),
+    '左裏': (2, 0), '右裏': (2, 2),
+}, (3, 3))
+ORIGIN_2x2 = GridLayout({'左上': (0, 0), '右上': (0, 1), '左裏': (1, 0), '右裏': (1, 1)}, (2, 2))
+
+
+@perf.timed("aggregate")
+def grid_sums(keys: pd.Series, layout: GridLayout, weights=None) -> np.ndarray:
+    """セルごとの合計（weights 省略時は行数）"""
+    idx = layout.flat_index(keys)
+    inside = idx >= 0
+    w = None if weights is None else np.asarray(weights, dtype=np.float64)[inside]
+    sums = np.bincount(idx[inside], weights=w, minlength=layout.size)
+    return np.rint(sums).astype(np.int64).reshape(layout.shape)
+
+
+@perf.timed("aggregate")
+def ratio_grid(keys: pd.Series, layout: GridLayout, success, total=None, cell_labels: bool = False):
+    """セルごとの 成功数/母数 を数え、px.imshow にそのまま渡せる (z, text) を返す
+
+    success: 各行が分子に何件入るか（0/1 の列・bool マスク・件数列など）
+    total:   各行が分母に何件入るか（省略時は1行=1件）
+    cell_labels: テキストの先頭にセルの値（[3] など）を付ける
+    母数0のセルは 0/0 (0.0%)、どのセルの値にも当たらないマスは空欄（z は NaN）。
+    """
+    num = grid_sums(keys, layout, success)
+    den = grid_sums(keys, layout, total)
+    z = np.full(layout.shape, np.nan)
+    text = np.full(layout.shape, "", dtype=object)
+    for key, (r, c) in layout.cells.items():
+        n, d = num[r, c], den[r, c]
+        rate = (n / d) * 100 if d > 0 else 0
+        if d <= 0:
+            n = d = 0
+        z[r, c] = rate
+        prefix = f"[{key}]<br>" if cell_labels else ""
+        text[r, c] = f"{prefix}{n}/{d}<br>({rate:.1f}%)"
+    return z, text
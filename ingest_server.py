@@ -0,0 +1,145 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from binlog import BINLOG_DIR
+from data_fetch import event_log_path, events_frame
+from practice_data import BINLOG_SPECS, EVENT_KINDS, binlog
+
+# ==========================================
+# 練習の記録を直接受け取るサーバー（イベントログへの追記と、ダッシュボードへの通知）
+# ==========================================
+# 記録ツール（またはその代わり）が1件ごとに POST したイベントを、種類ごとのログ <kind>.jsonl に
+# 1行ずつ追記する（書き込みのたびに fsync するので、応答を返したイベントは消えない）。
+# ダッシュボードは LAX_EVENT_LOG に同じディレクトリを指定すると、S3・公開CSVの代わりにこのログを読み、
+# /wait で待ち合わせて、届いたイベントだけを表に追加する（data_fetch.EventLogTable・follow_ingest）。
+#
+#   POST /events/<kind>   本文は JSON のオブジェクト1つか、その配列（記録ツールのCSVと同じ列名）
+#                         kind: freeshoot, 1on1, 6on6_shot, 6on6_to, 6on6_gb, 6on6_miss
+#                         → {"seq": 通し番号, "count": 追記した件数}
+#   GET  /wait?after=N&timeout=秒   通し番号が N から変わるまで待って {"seq": 通し番号} を返す
+#   GET  /health
+#
+# --binlog（または LAX_BINLOG）を指定すると、フリシュー・1on1 は整形してバイナリログ（binlog.py）にも追記する。
+# 正本は JSONL のほうで、バイナリログへの追記に失敗してもイベントは受け付ける（JSONL から取り込み直せる）。
+#
+#   LAX_EVENT_LOG=.cache/events python ingest_server.py --port 8600
+DEFAULT_LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "events")
+MAX_BODY = 1 << 20
+MAX_WAIT = 60
+
+log = logging.getLogger(__name__)
+
+
+class EventLog:
+    """種類ごとの JSONL への追記と、追記の通し番号（待ち合わせ用）"""
+
+    def __init__(self, log_dir: str, binlog_dir: str = None):
+        self.log_dir = log_dir
+        self.binlog_dir = binlog_dir
+        os.makedirs(log_dir, exist_ok=True)
+        self.seq = 0   # このプロセスで追記した回数（再起動すると0に戻るが、待つ側は「変わったか」だけを見る）
+        self._changed = threading.Condition()
+        self._write_lock = threading.Lock()
+
+    def append(self, kind: str, events: list) -> int:
+        data = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in events).encode("utf-8")
+        with self._write_lock, open(event_log_path(kind, self.log_dir), "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            if self.binlog_dir and kind in BINLOG_SPECS:
+                try:
+                    binlog(kind, self.binlog_dir).append(EVENT_KINDS[kind](events_frame(events)))
+                except Exception as e:
+                    log.error("%s をバイナリログに追記できませんでした（JSONL には記録済み）: %s", kind, e)
+        with self._changed:
+            self.seq += 1
+            self._changed.notify_all()
+            return self.seq
+
+    def wait(self, after, timeout: float) -> int:
+        with self._changed:
+            self._changed.wait_for(lambda: self.seq != after, timeout=timeout)
+            return self.seq
+
+
+def make_handler(log: EventLog):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, body: dict):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            parts = urlparse(self.path).path.strip("/").split("/")
+            if len(parts) != 2 or parts[0] != "events" or parts[1] not in EVENT_KINDS:
+                return self._reply(404, {"error": f"POST /events/<kind>（kind は {', '.join(EVENT_KINDS)}）"})
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                return self._reply(400, {"error": "Content-Length が数値ではありません"})
+            if length < 0:
+                return self._reply(400, {"error": "Content-Length が負の値です"})
+            if length > MAX_BODY:
+                return self._reply(413, {"error": "本文が大きすぎます"})
+            try:
+                body = json.loads(self.rfile.read(length) or b"null")
+            except ValueError as e:
+                return self._reply(400, {"error": f"JSONを読めません: {e}"})
+            events = body if isinstance(body, list) else [body]
+            if not events or not all(isinstance(e, dict) for e in events):
+                return self._reply(400, {"error": "イベントは JSON のオブジェクト（またはその配列）で送ってください"})
+            seq = log.append(parts[1], events)
+            self._reply(200, {"seq": seq, "count": len(events)})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/health":
+                return self._reply(200, {"ok": True, "seq": log.seq})
+            if url.path != "/wait":
+                return self._reply(404, {"error": "not found"})
+            q = parse_qs(url.query)
+            after = q.get("after", [""])[0]
+            after = int(after) if after.lstrip("-").isdigit() else None
+            try:
+                timeout = min(float(q.get("timeout", [25])[0]), MAX_WAIT)
+            except ValueError:
+                return self._reply(400, {"error": "timeout は秒数で指定してください"})
+            self._reply(200, {"seq": log.wait(after, timeout) if timeout > 0 else log.seq})
+
+        def log_message(self, fmt, *args):
+            pass   # 1件ごとのアクセスログは出さない
+
+    return Handler
+
+
+def serve(log_dir: str, host: str = "127.0.0.1", port: int = 8600, binlog_dir: str = None) -> ThreadingHTTPServer:
+    """サーバーを作って返す（serve_forever は呼び出し側で）"""
+    server = ThreadingHTTPServer((host, port), make_handler(EventLog(log_dir, binlog_dir)))
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="練習の記録（イベント）を受け取り、ログに追記してダッシュボードに知らせる")
+    parser.add_argument("--log-dir", default=os.environ.get("LAX_EVENT_LOG") or DEFAULT_LOG_DIR)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--binlog", default=BINLOG_DIR, help="バイナリログのディレクトリ（フリシュー・1on1 も追記する）")
+    args = parser.parse_args()
+    server = serve(args.log_dir, args.host, args.port, args.binlog)
+    binlog_note = f"・バイナリログ: {args.binlog}" if args.binlog else ""
+    print(f"{time.strftime('%H:%M:%S')} {args.host}:{args.port} で受付中（ログ: {args.log_dir}{binlog_note}）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
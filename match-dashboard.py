@@ -3,14 +3,18 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
-import json
 from datetime import datetime
+from figure_cache import cached_figure, figure_builder
+from match_data import load_match_file
+import match_store
+import perf
 
 st.set_page_config(
     page_title="京大ラクロス｜試合データ分析",
     page_icon="🥍",
     layout="wide"
 )
+perf.begin("match-dashboard.py")
 
 # ========== カスタムCSS ==========
 st.markdown("""
@@ -44,16 +48,30 @@ def sec_to_mmss(sec):
     m, s = divmod(int(sec), 60)
     return f"{m}:{s:02d}"
 
+# groupby(...).size() の結果から、キーの組み合わせの件数を引く（無ければ0）
+def count_of(counts, *key):
+    return int(counts.get(key if len(key) > 1 else key[0], 0))
+
+# コース（0〜8、欠損は -1）ごとの件数。weights 省略時は本数
+def course_counts(shots, weights=None):
+    course = shots['course'].to_numpy()
+    inside = (course >= 0) & (course < 9)
+    w = None if weights is None else np.asarray(weights, dtype=np.float64)[inside]
+    return np.bincount(course[inside], weights=w, minlength=9)
+
+# key=（JSONの中身のハッシュ）を渡すと、同じファイルのグラフは作り直さない（figure_cache.py）
+@figure_builder
 def make_goalie_heatmap(shots, side, title, enemy_name="相手"):
+    cell = shots[shots['side'] == side]
+    totals = course_counts(cell)
+    saves_by_course = course_counts(cell, cell['result'] == 'save').astype(int)
     grid_color = np.zeros((3, 3))
     grid_text  = np.empty((3, 3), dtype=object)
     for r in range(3):
         for c in range(3):
             idx = r * 3 + c
-            cell = [s for s in shots if s.get('side') == side and s.get('course') == idx]
-            total = len(cell)
-            saves = len([s for s in cell if s.get('result') == 'save'])
-            goals = len([s for s in cell if s.get('result') == 'goal'])
+            total = int(totals[idx])
+            saves = int(saves_by_course[idx])
             if total > 0:
                 rate = saves / total * 100
                 grid_color[r, c] = rate
@@ -72,15 +90,12 @@ def make_goalie_heatmap(shots, side, title, enemy_name="相手"):
     fig.update_layout(height=320, margin=dict(t=40, b=10, l=10, r=10), coloraxis_showscale=False)
     return fig
 
+@figure_builder
 def make_shot_course_heatmap(shots, side, result_filter=None, title="", enemy_name="相手"):
-    filtered = [s for s in shots if s.get('side') == side]
+    mask = shots['side'] == side
     if result_filter:
-        filtered = [s for s in filtered if s.get('result') == result_filter]
-    grid = np.zeros((3, 3))
-    for s in filtered:
-        c = s.get('course', -1)
-        if 0 <= c < 9:
-            grid[c // 3][c % 3] += 1
+        mask &= shots['result'] == result_filter
+    grid = course_counts(shots[mask]).astype(float).reshape(3, 3)
     color_scale = 'Reds' if result_filter == 'goal' else 'OrRd'
     fig = px.imshow(
         grid, x=['左', '中', '右'], y=['上', '中', '下'],
@@ -111,31 +126,48 @@ data = {
     "goalie":     None,
 }
 
-tool_map = {
-    "GameDataTool":    "game",
-    "PossessionTool":  "possession",
-    "GBFoulTool":      "gb_foul",
-    "DrawTool":        "draw",
-    "GoalieTool":      "goalie",
-}
-
+# アップロードされたJSONはシーズンのDB（match_store.py）にも保存する（同じ試合・ツールは1つだけ）
+raw_files = []   # (ファイル名, JSONのバイト列)
+for f in uploaded_files or []:
+    raw = f.getvalue()
+    raw_files.append((f.name, raw))
+    try:
+        match_store.save_export(raw)
+    except Exception as e:
+        st.sidebar.warning(f"シーズンDBに保存できませんでした: {f.name}（{e}）")
+
+# 保存済みの試合は、アップロードし直さずに選んで表示できる
+try:
+    stored_matches = match_store.list_matches()
+except Exception as e:
+    stored_matches = pd.DataFrame(columns=["id", "date", "enemy"])
+if not stored_matches.empty:
+    st.sidebar.markdown("### 🗂 保存済みの試合")
+    labels = {int(r.id): f"{r.date} vs {r.enemy}" for r in stored_matches.itertuples()}
+    picked = st.sidebar.selectbox("表示する試合", [None, *labels],
+                                  format_func=lambda i: "（アップロードしたファイル）" if i is None else labels[i])
+    if picked is not None:
+        raw_files = [(labels[picked], raw) for raw in match_store.match_exports(picked)]
+
+# JSONのパースと表への変換は match_data.py（中身のハッシュごとに1回だけ。再実行・他の閲覧者とも共有）
 loaded_tools = []
 match_info   = {}
+versions     = {}   # ツール → JSONの中身のハッシュ（グラフのキャッシュのキー）
+tables       = {}   # 表の名前 → 型付きの表（shots・turnovers・draws・gb・fouls・goalie_shots）
 
-if uploaded_files:
-    for f in uploaded_files:
+if raw_files:
+    for name, raw in raw_files:
         try:
-            d = json.load(f)
-            tool_str = d.get("meta", {}).get("tool", "")
-            for key, val in tool_map.items():
-                if key in tool_str:
-                    data[val] = d
-                    loaded_tools.append(val)
-                    if not match_info:
-                        match_info = d.get("meta", {})
-                    break
+            mf = load_match_file(raw)
+            if mf.tool:
+                data[mf.tool] = mf.doc
+                versions[mf.tool] = mf.digest
+                tables.update(mf.tables)
+                loaded_tools.append(mf.tool)
+                if not match_info:
+                    match_info = mf.meta
         except Exception as e:
-            st.sidebar.error(f"読み込みエラー: {f.name}")
+            st.sidebar.error(f"読み込みエラー: {name}")
 
 # ロード状態表示
 st.sidebar.markdown("### 📦 ロード状態")
@@ -157,7 +189,7 @@ st.sidebar.markdown("---")
 menu = st.sidebar.radio(
     "📌 表示する分析",
     ["🏠 試合サマリー", "📊 スコア・ショット", "🔄 ターンオーバー",
-     "⏱ ポゼッション", "🏃 GB・ファール", "🥍 ドローデータ", "🥅 ゴーリーデータ"]
+     "⏱ ポゼッション", "🏃 GB・ファール", "🥍 ドローデータ", "🥅 ゴーリーデータ", "📅 シーズン集計"]
 )
 
 # ========================================
@@ -178,7 +210,7 @@ if match_info:
             icon, name = status_icons[t]
             st.markdown(f'<span class="tool-tag">{icon} {name}</span>', unsafe_allow_html=True)
 
-if not uploaded_files:
+if not raw_files and menu != "📅 シーズン集計":
     st.info("← サイドバーから各ツールのJSONをアップロードしてください")
     st.markdown("""
     **対応ツール（5種）:**
@@ -189,8 +221,11 @@ if not uploaded_files:
     - 🥅 ゴーリーデータ → `goalie_tool.html`
 
     各ツールの「出力」タブ → 「JSON出力」ボタンでファイルをダウンロードできます。
+
+    アップロードしたファイルはシーズンのDBにも保存され、次からはサイドバーの「保存済みの試合」から選べます。
+    フォルダごとまとめて取り込むときは `python match_store.py <フォルダ>` を実行してください。
     """)
-    st.stop()
+    perf.stop()
 
 st.markdown("---")
 
@@ -204,21 +239,23 @@ if menu == "🏠 試合サマリー":
     cols = st.columns(4)
 
     if data["game"]:
-        shots = data["game"].get("shots", [])
-        kyoto_score = len([s for s in shots if s["team"] == "kyoto" and s["result"] == "goal"])
-        enemy_score = len([s for s in shots if s["team"] == "enemy" and s["result"] == "goal"])
+        shots = tables["shots"]
+        goals_by_team = shots.loc[shots["result"] == "goal", "team"].value_counts()
+        shots_by_team = shots["team"].value_counts()
+        kyoto_score = count_of(goals_by_team, "kyoto")
+        enemy_score = count_of(goals_by_team, "enemy")
         with cols[0]:
             st.metric("京大 得点", kyoto_score)
         with cols[1]:
             st.metric(f"{enemy_name} 得点", enemy_score)
-        kyoto_shots = [s for s in shots if s["team"] == "kyoto"]
-        enemy_shots = [s for s in shots if s["team"] == "enemy"]
-        ks_rate = f"{kyoto_score/len(kyoto_shots)*100:.0f}%" if kyoto_shots else "—"
-        es_rate = f"{enemy_score/len(enemy_shots)*100:.0f}%" if enemy_shots else "—"
+        kyoto_shots = count_of(shots_by_team, "kyoto")
+        enemy_shots = count_of(shots_by_team, "enemy")
+        ks_rate = f"{kyoto_score/kyoto_shots*100:.0f}%" if kyoto_shots else "—"
+        es_rate = f"{enemy_score/enemy_shots*100:.0f}%" if enemy_shots else "—"
         with cols[2]:
-            st.metric("京大 シュート率", ks_rate, delta=f"{len(kyoto_shots)}本")
+            st.metric("京大 シュート率", ks_rate, delta=f"{kyoto_shots}本")
         with cols[3]:
-            st.metric(f"{enemy_name} シュート率", es_rate, delta=f"{len(enemy_shots)}本")
+            st.metric(f"{enemy_name} シュート率", es_rate, delta=f"{enemy_shots}本")
 
     st.markdown("---")
     col_s1, col_s2, col_s3 = st.columns(3)
@@ -259,13 +296,14 @@ if menu == "🏠 試合サマリー":
     if data["game"]:
         st.markdown("---")
         st.subheader("Q別スコア推移")
-        shots = data["game"].get("shots", [])
+        shots = tables["shots"]
         q_count = match_info.get("qCount", 4)
+        goals_by_q = shots[shots["result"] == "goal"].groupby(["q", "team"], observed=True).size()
         q_rows = []
         k_cum, e_cum = 0, 0
         for q in range(1, q_count + 1):
-            k = len([s for s in shots if s["q"] == q and s["team"] == "kyoto" and s["result"] == "goal"])
-            e = len([s for s in shots if s["q"] == q and s["team"] == "enemy" and s["result"] == "goal"])
+            k = count_of(goals_by_q, q, "kyoto")
+            e = count_of(goals_by_q, q, "enemy")
             k_cum += k; e_cum += e
             q_rows.append({"Q": f"Q{q}", "京大（累計）": k_cum, f"{enemy_name}（累計）": e_cum, "京大Q得点": k, f"{enemy_name}Q得点": e})
         q_df = pd.DataFrame(q_rows)
@@ -277,7 +315,7 @@ if menu == "🏠 試合サマリー":
         fig.update_layout(height=300, margin=dict(t=20, b=20), paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
                           font_color="#8ba3c7", legend=dict(orientation="h"))
         fig.update_xaxes(gridcolor="#1e2f4d"); fig.update_yaxes(gridcolor="#1e2f4d")
-        st.plotly_chart(fig, use_container_width=True)
+        perf.plotly_chart(fig, use_container_width=True)
 
 # ========================================
 # 📊 スコア・ショット
@@ -289,35 +327,38 @@ elif menu == "📊 スコア・ショット":
     if not data["game"]:
         st.warning("スコアシートのJSONをアップロードしてください")
     else:
-        shots = data["game"].get("shots", [])
+        shots = tables["shots"]
         q_count = match_info.get("qCount", 4)
+        # チーム×結果、Q×チーム×結果 の本数を1回ずつ数えておく
+        by_team = shots.groupby(["team", "result"], observed=True).size()
+        by_q = shots.groupby(["q", "team", "result"], observed=True).size()
 
         for team, label, color in [("kyoto", "京大", "#3b82f6"), ("enemy", enemy_name, "#ef4444")]:
-            ts = [s for s in shots if s["team"] == team]
-            goals = len([s for s in ts if s["result"] == "goal"])
-            saves = len([s for s in ts if s["result"] == "save"])
-            miss  = len([s for s in ts if s["result"] == "miss"])
-            rate  = f"{goals/len(ts)*100:.0f}%" if ts else "—"
+            n     = int((shots["team"] == team).sum())
+            goals = count_of(by_team, team, "goal")
+            saves = count_of(by_team, team, "save")
+            rate  = f"{goals/n*100:.0f}%" if n else "—"
             st.markdown(f"#### {'🔵' if team=='kyoto' else '🔴'} {label}")
             c1, c2, c3, c4 = st.columns(4)
-            c1.metric("総ショット", len(ts))
+            c1.metric("総ショット", n)
             c2.metric("得点", goals)
             c3.metric("シュート率", rate)
-            c4.metric("枠内率", f"{(goals+saves)/len(ts)*100:.0f}%" if ts else "—")
+            c4.metric("枠内率", f"{(goals+saves)/n*100:.0f}%" if n else "—")
 
         st.markdown("---")
 
         st.subheader("Q別ショット内訳")
+        shots_by_q = shots.groupby(["q", "team"], observed=True).size()
         q_rows = []
         for q in range(1, q_count + 1):
             for team, label in [("kyoto", "京大"), ("enemy", enemy_name)]:
-                ts = [s for s in shots if s["q"] == q and s["team"] == team]
-                if not ts: continue
-                goals = len([s for s in ts if s["result"] == "goal"])
-                saves = len([s for s in ts if s["result"] == "save"])
-                miss  = len([s for s in ts if s["result"] == "miss"])
-                rate  = f"{goals/len(ts)*100:.0f}%" if ts else "—"
-                q_rows.append({"Q": f"Q{q}", "チーム": label, "ショット": len(ts),
+                n = count_of(shots_by_q, q, team)
+                if not n: continue
+                goals = count_of(by_q, q, team, "goal")
+                saves = count_of(by_q, q, team, "save")
+                miss  = count_of(by_q, q, team, "miss")
+                rate  = f"{goals/n*100:.0f}%"
+                q_rows.append({"Q": f"Q{q}", "チーム": label, "ショット": n,
                                 "得点": goals, "セーブ": saves, "枠外": miss, "シュート率": rate})
         if q_rows:
             st.dataframe(pd.DataFrame(q_rows), use_container_width=True, hide_index=True)
@@ -325,9 +366,8 @@ elif menu == "📊 スコア・ショット":
         st.markdown("---")
 
         st.subheader("攻め方別集計（京大）")
-        k_shots = [s for s in shots if s["team"] == "kyoto" and s.get("attack")]
-        if k_shots:
-            attack_df = pd.DataFrame(k_shots)
+        attack_df = shots[(shots["team"] == "kyoto") & shots["attack"].fillna("").ne("")] if "attack" in shots.columns else shots.iloc[0:0]
+        if not attack_df.empty:
             attack_stats = attack_df.groupby("attack").agg(
                 ショット数=("result", "count"),
                 得点=("result", lambda x: (x == "goal").sum()),
@@ -339,10 +379,12 @@ elif menu == "📊 スコア・ショット":
             with col_at1:
                 st.dataframe(attack_stats, use_container_width=True, hide_index=True)
             with col_at2:
-                fig = px.pie(attack_stats, values="ショット数", names="attack",
-                             title="攻め方の分布", hole=0.4, color_discrete_sequence=px.colors.sequential.Blues_r)
-                fig.update_layout(height=320, margin=dict(t=40, b=0), paper_bgcolor="rgba(0,0,0,0)", font_color="#8ba3c7")
-                st.plotly_chart(fig, use_container_width=True)
+                def attack_pie():
+                    fig = px.pie(attack_stats, values="ショット数", names="attack",
+                                 title="攻め方の分布", hole=0.4, color_discrete_sequence=px.colors.sequential.Blues_r)
+                    fig.update_layout(height=320, margin=dict(t=40, b=0), paper_bgcolor="rgba(0,0,0,0)", font_color="#8ba3c7")
+                    return fig
+                perf.plotly_chart(cached_figure((versions["game"], "攻め方の分布"), attack_pie), use_container_width=True)
 
         cl = data["game"].get("clearance", {})
         if cl:
@@ -367,14 +409,14 @@ elif menu == "🔄 ターンオーバー":
     if not data["game"]:
         st.warning("スコアシートのJSONをアップロードしてください")
     else:
-        tos = data["game"].get("turnovers", [])
+        tos = tables["turnovers"]
         q_count = match_info.get("qCount", 4)
 
-        if not tos:
+        if tos.empty:
             st.info("ターンオーバーデータがありません")
         else:
-            kyoto_to = [t for t in tos if t["side"] == "kyoto"]
-            enemy_to = [t for t in tos if t["side"] == "enemy"]
+            kyoto_to = tos[tos["side"] == "kyoto"]
+            enemy_to = tos[tos["side"] == "enemy"]
 
             c1, c2, c3 = st.columns(3)
             c1.metric("京大 奪われたTO", len(kyoto_to))
@@ -387,34 +429,36 @@ elif menu == "🔄 ターンオーバー":
 
             with col_t1:
                 st.subheader("原因別（京大が奪われた）")
-                if kyoto_to:
-                    cause_df = pd.DataFrame(kyoto_to)["cause"].value_counts().reset_index()
+                if not kyoto_to.empty:
+                    cause_df = kyoto_to["cause"].value_counts().reset_index()
                     cause_df.columns = ["原因", "回数"]
                     fig = px.bar(cause_df, x="原因", y="回数", color="回数",
                                  color_continuous_scale="Reds", title="京大 奪われたTO原因")
                     fig.update_layout(height=300, paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
                                       font_color="#8ba3c7", showlegend=False, coloraxis_showscale=False)
                     fig.update_xaxes(gridcolor="#1e2f4d"); fig.update_yaxes(gridcolor="#1e2f4d")
-                    st.plotly_chart(fig, use_container_width=True)
+                    perf.plotly_chart(fig, use_container_width=True)
 
             with col_t2:
                 st.subheader("原因別（京大が奪った）")
-                if enemy_to:
-                    cause_df2 = pd.DataFrame(enemy_to)["cause"].value_counts().reset_index()
+                if not enemy_to.empty:
+                    cause_df2 = enemy_to["cause"].value_counts().reset_index()
                     cause_df2.columns = ["原因", "回数"]
                     fig2 = px.bar(cause_df2, x="原因", y="回数", color="回数",
                                   color_continuous_scale="Blues", title="京大 奪ったTO原因")
                     fig2.update_layout(height=300, paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
                                        font_color="#8ba3c7", showlegend=False, coloraxis_showscale=False)
                     fig2.update_xaxes(gridcolor="#1e2f4d"); fig2.update_yaxes(gridcolor="#1e2f4d")
-                    st.plotly_chart(fig2, use_container_width=True)
+                    perf.plotly_chart(fig2, use_container_width=True)
 
             st.markdown("---")
             st.subheader("Q別TOバランス")
+            k_by_q = kyoto_to["q"].value_counts()
+            e_by_q = enemy_to["q"].value_counts()
             q_rows = []
             for q in range(1, q_count + 1):
-                k = len([t for t in kyoto_to if t["q"] == q])
-                e = len([t for t in enemy_to if t["q"] == q])
+                k = count_of(k_by_q, q)
+                e = count_of(e_by_q, q)
                 q_rows.append({"Q": f"Q{q}", "京大奪われ": k, "京大奪った": e, "差": e - k})
             q_df = pd.DataFrame(q_rows)
             fig3 = go.Figure()
@@ -424,7 +468,7 @@ elif menu == "🔄 ターンオーバー":
                                 plot_bgcolor="rgba(0,0,0,0)", font_color="#8ba3c7",
                                 legend=dict(orientation="h"))
             fig3.update_xaxes(gridcolor="#1e2f4d"); fig3.update_yaxes(gridcolor="#1e2f4d")
-            st.plotly_chart(fig3, use_container_width=True)
+            perf.plotly_chart(fig3, use_container_width=True)
 
 # ========================================
 # ⏱ ポゼッション
@@ -464,7 +508,7 @@ elif menu == "⏱ ポゼッション":
             fig_of2.update_layout(height=300, paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
                                    font_color="#8ba3c7", coloraxis_showscale=False)
             fig_of2.update_xaxes(gridcolor="#1e2f4d"); fig_of2.update_yaxes(gridcolor="#1e2f4d")
-            st.plotly_chart(fig_of2, use_container_width=True)
+            perf.plotly_chart(fig_of2, use_container_width=True)
 
         st.markdown("---")
 
@@ -490,7 +534,7 @@ elif menu == "⏱ ポゼッション":
                                   title="Q別 CLRDポゼッション（積み上げ）",
                                   legend=dict(orientation="h"))
             fig_cl.update_xaxes(gridcolor="#1e2f4d"); fig_cl.update_yaxes(gridcolor="#1e2f4d")
-            st.plotly_chart(fig_cl, use_container_width=True)
+            perf.plotly_chart(fig_cl, use_container_width=True)
 
 # ========================================
 # 🏃 GB・ファール
@@ -503,8 +547,6 @@ elif menu == "🏃 GB・ファール":
         st.warning("GB・ファールのJSONをアップロードしてください")
     else:
         gb_data = data["gb_foul"]
-        gb_records = gb_data.get("gb", {}).get("records", [])
-        foul_records = gb_data.get("fouls", {}).get("records", [])
         gb_sum = gb_data.get("gb", {}).get("summary", {})
 
         st.subheader("🏃 GBゲット率")
@@ -513,7 +555,7 @@ elif menu == "🏃 GB・ファール":
         c2.metric(f"{enemy_name} GBゲット", gb_sum.get("enemy_get", 0))
         c3.metric("京大 ゲット率", f"{gb_sum.get('kyoto_pct', '—')}%" if gb_sum.get("kyoto_pct") is not None else "—")
 
-        if gb_records:
+        if not tables["gb"].empty:
             st.markdown("---")
             st.subheader("場所別 GBゲット")
             loc_data = gb_sum.get("by_location", [])
@@ -532,9 +574,9 @@ elif menu == "🏃 GB・ファール":
                                       plot_bgcolor="rgba(0,0,0,0)", font_color="#8ba3c7",
                                       legend=dict(orientation="h"))
                 fig_loc.update_xaxes(gridcolor="#1e2f4d"); fig_loc.update_yaxes(gridcolor="#1e2f4d")
-                st.plotly_chart(fig_loc, use_container_width=True)
+                perf.plotly_chart(fig_loc, use_container_width=True)
 
-        if foul_records:
+        if not tables["fouls"].empty:
             st.markdown("---")
             st.subheader("🚩 ファール分析")
             foul_sum = gb_data.get("fouls", {}).get("summary", {})
@@ -553,7 +595,7 @@ elif menu == "🏃 GB・ファール":
                     fig_ft.update_layout(height=300, paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
                                          font_color="#8ba3c7", coloraxis_showscale=False)
                     fig_ft.update_xaxes(gridcolor="#1e2f4d"); fig_ft.update_yaxes(gridcolor="#1e2f4d")
-                    st.plotly_chart(fig_ft, use_container_width=True)
+                    perf.plotly_chart(fig_ft, use_container_width=True)
 
             with col_f2:
                 st.markdown("**選手別ファール数**")
@@ -573,11 +615,11 @@ elif menu == "🥍 ドローデータ":
     if not data["draw"]:
         st.warning("ドローデータのJSONをアップロードしてください")
     else:
-        draws = data["draw"].get("draws", [])
+        draws = tables["draws"]
         summary = data["draw"].get("summary", {})
         q_count = match_info.get("qCount", 4)
 
-        if not draws:
+        if draws.empty:
             st.info("ドローデータがありません")
         else:
             c1, c2, c3, c4 = st.columns(4)
@@ -590,30 +632,30 @@ elif menu == "🥍 ドローデータ":
             st.markdown("---")
 
             st.subheader("Q別ドローゲット率")
+            draws_by_q = draws["q"].value_counts()
+            results_by_q = draws.groupby(["q", "result"], observed=True).size()
             q_rows = []
             for q in range(1, q_count + 1):
-                qd = [d for d in draws if d["q"] == q]
-                if not qd: continue
-                got  = len([d for d in qd if d["result"] == "ok"])
-                lost = len([d for d in qd if d["result"] == "ng"])
-                foul = len([d for d in qd if d["result"] == "foul"])
+                n = count_of(draws_by_q, q)
+                if not n: continue
+                got  = count_of(results_by_q, q, "ok")
+                lost = count_of(results_by_q, q, "ng")
+                foul = count_of(results_by_q, q, "foul")
                 total = got + lost
-                q_rows.append({"Q": f"Q{q}", "ドロー": len(qd), "京大○": got, "相手○": lost,
+                q_rows.append({"Q": f"Q{q}", "ドロー": n, "京大○": got, "相手○": lost,
                                 "ファール": foul, "ゲット率": f"{got/total*100:.0f}%" if total > 0 else "—"})
             if q_rows:
                 st.dataframe(pd.DataFrame(q_rows), use_container_width=True, hide_index=True)
 
             st.markdown("---")
             st.subheader("ドロワー別ゲット率")
-            drawer_stats = {}
-            for d in draws:
-                key = d.get("drawer") or "不明"
-                if key not in drawer_stats:
-                    drawer_stats[key] = {"ok": 0, "ng": 0, "foul": 0}
-                drawer_stats[key][d["result"]] += 1
+            # ドロワーごとの ok/ng/foul（表の並びは最初に出てきた順 → ゲット+失敗の多い順）
+            drawer = draws["drawer"].fillna("").astype(str).replace("", "不明") if "drawer" in draws.columns else pd.Series("不明", index=draws.index)
+            drawer_stats = (pd.crosstab(drawer, draws["result"])
+                            .reindex(index=drawer.unique(), columns=["ok", "ng", "foul"], fill_value=0))
 
             dr_rows = []
-            for num, cnt in sorted(drawer_stats.items(), key=lambda x: -(x[1]["ok"]+x[1]["ng"])):
+            for num, cnt in sorted(drawer_stats.to_dict("index").items(), key=lambda x: -(x[1]["ok"]+x[1]["ng"])):
                 t = cnt["ok"] + cnt["ng"]
                 rate = f"{cnt['ok']/t*100:.0f}%" if t > 0 else "—"
                 dr_rows.append({"ドロワー": f"#{num}", "ドロー数": t + cnt["foul"],
@@ -632,20 +674,20 @@ elif menu == "🥍 ドローデータ":
                     fig_dr.update_layout(height=320, paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
                                          font_color="#8ba3c7", legend=dict(orientation="h"))
                     fig_dr.update_xaxes(gridcolor="#1e2f4d"); fig_dr.update_yaxes(gridcolor="#1e2f4d")
-                    st.plotly_chart(fig_dr, use_container_width=True)
+                    perf.plotly_chart(fig_dr, use_container_width=True)
 
             st.markdown("---")
             st.subheader("取り方別集計")
-            way_counts = {}
-            for d in draws:
-                w = d.get("getWay")
-                if w: way_counts[w] = way_counts.get(w, 0) + 1
-            if way_counts:
-                way_df = pd.DataFrame(list(way_counts.items()), columns=["取り方", "回数"]).sort_values("回数", ascending=False)
-                fig_way = px.pie(way_df, values="回数", names="取り方", hole=0.4,
-                                 color_discrete_sequence=px.colors.sequential.Purples_r)
-                fig_way.update_layout(height=320, paper_bgcolor="rgba(0,0,0,0)", font_color="#8ba3c7")
-                st.plotly_chart(fig_way, use_container_width=True)
+            ways = draws["getWay"].fillna("") if "getWay" in draws.columns else pd.Series("", index=draws.index)
+            way_counts = ways[ways != ""].value_counts(sort=False)
+            if not way_counts.empty:
+                def way_pie():
+                    way_df = pd.DataFrame(list(way_counts.items()), columns=["取り方", "回数"]).sort_values("回数", ascending=False)
+                    fig_way = px.pie(way_df, values="回数", names="取り方", hole=0.4,
+                                     color_discrete_sequence=px.colors.sequential.Purples_r)
+                    fig_way.update_layout(height=320, paper_bgcolor="rgba(0,0,0,0)", font_color="#8ba3c7")
+                    return fig_way
+                perf.plotly_chart(cached_figure((versions["draw"], "取り方別"), way_pie), use_container_width=True)
 
 # ========================================
 # 🥅 ゴーリーデータ
@@ -657,12 +699,12 @@ elif menu == "🥅 ゴーリーデータ":
     if not data["goalie"]:
         st.warning("ゴーリーデータのJSONをアップロードしてください")
     else:
-        shots   = data["goalie"].get("shots", [])
+        shots   = tables["goalie_shots"]
         goalies = data["goalie"].get("goalies", {})
         summary = data["goalie"].get("summary", {})
         q_count = match_info.get("qCount", 4)
 
-        if not shots:
+        if shots.empty:
             st.info("ゴーリーデータがありません")
         else:
             for side, label, color in [("kyoto", "🔵 京大G", "#3b82f6"), ("enemy", f"🔴 {enemy_name}G", "#ef4444")]:
@@ -680,36 +722,38 @@ elif menu == "🥅 ゴーリーデータ":
             st.subheader("コース別 セーブ率ヒートマップ")
             col_h1, col_h2 = st.columns(2)
             with col_h1:
-                fig_k = make_goalie_heatmap(shots, "kyoto", f"京大G — コース別セーブ率", enemy_name)
-                st.plotly_chart(fig_k, use_container_width=True)
+                fig_k = make_goalie_heatmap(shots, "kyoto", f"京大G — コース別セーブ率", enemy_name, key=versions["goalie"])
+                perf.plotly_chart(fig_k, use_container_width=True)
             with col_h2:
-                fig_e = make_goalie_heatmap(shots, "enemy", f"{enemy_name}G — コース別セーブ率", enemy_name)
-                st.plotly_chart(fig_e, use_container_width=True)
+                fig_e = make_goalie_heatmap(shots, "enemy", f"{enemy_name}G — コース別セーブ率", enemy_name, key=versions["goalie"])
+                perf.plotly_chart(fig_e, use_container_width=True)
 
             st.markdown("---")
 
             st.subheader("被ショットコース分布")
             col_s1, col_s2 = st.columns(2)
             with col_s1:
-                fig_ks = make_shot_course_heatmap(shots, "kyoto", title=f"京大G — 被ショット数")
-                st.plotly_chart(fig_ks, use_container_width=True)
+                fig_ks = make_shot_course_heatmap(shots, "kyoto", title=f"京大G — 被ショット数", key=versions["goalie"])
+                perf.plotly_chart(fig_ks, use_container_width=True)
             with col_s2:
-                fig_es = make_shot_course_heatmap(shots, "enemy", title=f"{enemy_name}G — 被ショット数")
-                st.plotly_chart(fig_es, use_container_width=True)
+                fig_es = make_shot_course_heatmap(shots, "enemy", title=f"{enemy_name}G — 被ショット数", key=versions["goalie"])
+                perf.plotly_chart(fig_es, use_container_width=True)
 
             st.markdown("---")
             st.subheader("Q別セーブ率")
+            shots_by_q = shots.groupby(["q", "side"], observed=True).size()
+            results_by_q = shots.groupby(["q", "side", "result"], observed=True).size()
             q_rows = []
             for q in range(1, q_count + 1):
                 for side, label in [("kyoto", "京大"), ("enemy", enemy_name)]:
-                    qs = [s for s in shots if s["q"] == q and s["side"] == side]
-                    if not qs: continue
-                    goal = len([s for s in qs if s["result"] == "goal"])
-                    save = len([s for s in qs if s["result"] == "save"])
-                    miss = len([s for s in qs if s["result"] == "miss"])
+                    n = count_of(shots_by_q, q, side)
+                    if not n: continue
+                    goal = count_of(results_by_q, q, side, "goal")
+                    save = count_of(results_by_q, q, side, "save")
+                    miss = count_of(results_by_q, q, side, "miss")
                     total = goal + save
                     rate = f"{save/total*100:.0f}%" if total > 0 else "—"
-                    q_rows.append({"Q": f"Q{q}", "G": label, "被ショット": len(qs),
+                    q_rows.append({"Q": f"Q{q}", "G": label, "被ショット": n,
                                    "失点": goal, "セーブ": save, "枠外": miss, "セーブ率": rate})
             if q_rows:
                 st.dataframe(pd.DataFrame(q_rows), use_container_width=True, hide_index=True)
@@ -719,9 +763,9 @@ elif menu == "🥅 ゴーリーデータ":
             g_rows = []
             for side, label in [("kyoto", "京大"), ("enemy", enemy_name)]:
                 for g in goalies.get(side, []):
-                    g_shots = [s for s in shots if s["side"] == side and s.get("goalieNum") == g["num"]]
-                    goal = len([s for s in g_shots if s["result"] == "goal"])
-                    save = len([s for s in g_shots if s["result"] == "save"])
+                    g_shots = shots[(shots["side"] == side) & (shots["goalieNum"] == g["num"])] if "goalieNum" in shots.columns else shots.iloc[0:0]
+                    goal = int((g_shots["result"] == "goal").sum())
+                    save = int((g_shots["result"] == "save").sum())
                     total = goal + save
                     rate = f"{save/total*100:.0f}%" if total > 0 else "—"
                     g_rows.append({"チーム": label, "背番号": f"#{g['num']}", "利き腕": g["hand"],
@@ -729,3 +773,78 @@ elif menu == "🥅 ゴーリーデータ":
                                    "失点": goal, "セーブ率": rate})
             if g_rows:
                 st.dataframe(pd.DataFrame(g_rows), use_container_width=True, hide_index=True)
+
+# ========================================
+# 📅 シーズン集計
+# ========================================
+elif menu == "📅 シーズン集計":
+    st.markdown('<div class="section-badge">SEASON</div>', unsafe_allow_html=True)
+    st.subheader("シーズン集計")
+
+    if stored_matches.empty:
+        st.warning("保存済みの試合がありません。JSONをアップロードするか、`python match_store.py <フォルダ>` で取り込んでください")
+    else:
+        col_f1, col_f2 = st.columns(2)
+        with col_f1:
+            dates = pd.to_datetime(stored_matches["date"], errors="coerce").dropna()
+            rng = st.date_input("期間", value=(dates.min().date(), dates.max().date())) if not dates.empty else ()
+        with col_f2:
+            enemies = st.multiselect("対戦相手", sorted(stored_matches["enemy"].unique()))
+        filters = {"enemies": enemies or None}
+        if isinstance(rng, (tuple, list)) and len(rng) == 2:
+            filters.update(start=rng[0].isoformat(), end=rng[1].isoformat())
+
+        season_matches = match_store.list_matches(**filters)
+        st.caption(f"{len(season_matches)}試合")
+        st.dataframe(season_matches.rename(columns={"date": "日付", "enemy": "相手", "q_count": "Q数", "tools": "データ"})
+                     .drop(columns=["id"]), use_container_width=True, hide_index=True)
+
+        st.markdown("---")
+        st.subheader("Q別シュート率")
+        rate_rows = []
+        for team, label in [("kyoto", "京大"), ("enemy", "相手")]:
+            for r in match_store.shot_rate_by_q(team, **filters).itertuples():
+                rate_rows.append({"Q": f"Q{r.q}", "チーム": label, "ショット": r.shots, "得点": r.goals,
+                                  "シュート率": f"{r.rate*100:.0f}%" if r.shots else "—", "率": r.rate * 100})
+        if not rate_rows:
+            st.info("ショットデータがありません")
+        else:
+            rate_df = pd.DataFrame(rate_rows)
+            fig_rate = px.bar(rate_df, x="Q", y="率", color="チーム", barmode="group", text="シュート率",
+                              color_discrete_map={"京大": "#3b82f6", "相手": "#ef4444"})
+            fig_rate.update_layout(height=300, yaxis_title="シュート率(%)", paper_bgcolor="rgba(0,0,0,0)",
+                                   plot_bgcolor="rgba(0,0,0,0)", font_color="#8ba3c7", legend=dict(orientation="h"))
+            fig_rate.update_xaxes(gridcolor="#1e2f4d"); fig_rate.update_yaxes(gridcolor="#1e2f4d")
+            perf.plotly_chart(fig_rate, use_container_width=True)
+            st.dataframe(rate_df.drop(columns=["率"]), use_container_width=True, hide_index=True)
+
+        col_d, col_t = st.columns(2)
+        with col_d:
+            st.subheader("Q別ドロー")
+            dr = match_store.event_counts("draws", by=("q", "result"), **filters)
+            if dr.empty:
+                st.info("ドローデータがありません")
+            else:
+                dr = dr.pivot_table(index="q", columns="result", values="n", aggfunc="sum", fill_value=0)
+                dr = dr.reindex(columns=["ok", "ng", "foul"], fill_value=0)
+                won = dr["ok"] + dr["ng"]
+                st.dataframe(pd.DataFrame({"Q": [f"Q{q}" for q in dr.index], "京大○": dr["ok"].values,
+                                           "相手○": dr["ng"].values, "ファール": dr["foul"].values,
+                                           "ゲット率": [f"{o/w*100:.0f}%" if w else "—" for o, w in zip(dr["ok"], won)]}),
+                             use_container_width=True, hide_index=True)
+        with col_t:
+            st.subheader("Q別ターンオーバー")
+            to = match_store.event_counts("turnovers", by=("q", "side"), **filters)
+            if to.empty:
+                st.info("ターンオーバーデータがありません")
+            else:
+                to = to.pivot_table(index="q", columns="side", values="n", aggfunc="sum", fill_value=0)
+                to = to.reindex(columns=["kyoto", "enemy"], fill_value=0)
+                st.dataframe(pd.DataFrame({"Q": [f"Q{q}" for q in to.index], "京大TO": to["kyoto"].values,
+                                           "相手TO": to["enemy"].values}),
+                             use_container_width=True, hide_index=True)
+
+# ==========================================
+# 処理時間（?perf=1 でサイドバーに表示・LAX_PERF_LOG に記録）
+# ==========================================
+perf.finish()
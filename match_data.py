@@ -0,0 +1,108 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+import perf
+
+# ==========================================
+# 試合データ（各ツールのJSON）の読み込み・整形
+# ==========================================
+# match-dashboard.py は、アップロードされたJSONをここで表に変換してから受け取る。
+# ファイルの中身のハッシュごとに1回だけパースし、ショット・TO・ドロー・GB・ファール・
+# ゴーリーのショットを列ごとの型付きの表にしておく。同じプロセス内なら再実行・
+# 他の閲覧者とも共有するので、メニューを切り替えてもJSONを読み直したり
+# リストを1件ずつ数え直したりしない。
+
+# ツールのメタ情報（meta.tool）に含まれる文字列 → データの種類
+TOOL_MAP = {
+    "GameDataTool":    "game",
+    "PossessionTool":  "possession",
+    "GBFoulTool":      "gb_foul",
+    "DrawTool":        "draw",
+    "GoalieTool":      "goalie",
+}
+
+# 表の名前 → (データの種類, JSON内の場所, カテゴリ列, 整数列)
+#   カテゴリ列: チーム・結果など、絞り込みに使う少数の値（空文字は欠損扱い）
+#   整数列    : Q・コース（int8。欠損は -1）
+# それ以外の列（原因・攻め方・ドロワーなど）は文字列のまま持つ
+MATCH_TABLES = {
+    "shots":        ("game",    ("shots",),           ["team", "result"], ["q"]),
+    "turnovers":    ("game",    ("turnovers",),       ["side"],           ["q"]),
+    "draws":        ("draw",    ("draws",),           ["result"],         ["q"]),
+    "gb":           ("gb_foul", ("gb", "records"),    [],                 []),
+    "fouls":        ("gb_foul", ("fouls", "records"), [],                 []),
+    "goalie_shots": ("goalie",  ("shots",),           ["side", "result"], ["q", "course"]),
+}
+
+MAX_FILES = 32   # 覚えておくファイル数（超えたら最も長く使われていないものから捨てる）
+
+
+class MatchFile:
+    """アップロードされた1ファイル分のデータ
+
+    tool:   データの種類（TOOL_MAP の値。どのツールでもなければNone）
+    digest: 中身のハッシュ（グラフのキャッシュのキーにも使う）
+    meta:   JSON の meta
+    doc:    パースしたJSON（集計済みの summary などはここから読む）
+    tables: 表の名前 → 型付きの表（共有オブジェクトなので書き換えないこと）
+    """
+
+    def __init__(self, digest: str, doc: dict):
+        self.digest = digest
+        self.doc = doc
+        self.meta = doc.get("meta", {})
+        self.tool = tool_of(self.meta)
+        self.tables = {name: _table(doc, path, categories, ints)
+                       for name, (tool, path, categories, ints) in MATCH_TABLES.items() if tool == self.tool}
+
+
+def tool_of(meta: dict):
+    """meta.tool の文字列 → データの種類（どのツールでもなければNone）"""
+    tool_str = (meta or {}).get("tool", "")
+    return next((v for k, v in TOOL_MAP.items() if k in tool_str), None)
+
+
+def records_of(doc: dict, path) -> list:
+    """JSON内の path（MATCH_TABLES の2番目）にあるレコードのリスト"""
+    records = doc
+    for key in path:
+        records = (records or {}).get(key, {})
+    return records or []
+
+
+def _table(doc: dict, path, categories, ints) -> pd.DataFrame:
+    df = pd.DataFrame.from_records(records_of(doc, path))
+    for c in categories:
+        s = df[c] if c in df.columns else pd.Series(pd.NA, index=df.index, dtype=object)
+        df[c] = s.where(s != "").astype("category")
+    for c in ints:
+        s = df[c] if c in df.columns else pd.Series(pd.NA, index=df.index, dtype=object)
+        df[c] = pd.to_numeric(s, errors="coerce").fillna(-1).astype("int8")
+    return df
+
+
+_files = OrderedDict()   # 中身のハッシュ → MatchFile
+_files_lock = threading.Lock()
+
+
+def load_match_file(raw: bytes) -> MatchFile:
+    """アップロードされたJSON（バイト列）→ MatchFile。同じ中身なら2回目以降はパースしない"""
+    digest = hashlib.sha1(raw).hexdigest()
+    with _files_lock:
+        mf = _files.get(digest)
+        if mf is not None:
+            _files.move_to_end(digest)
+            perf.count("match_file", True)
+            return mf
+    perf.count("match_file", False)
+    with perf.span("parse"):
+        mf = MatchFile(digest, json.loads(raw))
+    with _files_lock:
+        _files[digest] = mf
+        while len(_files) > MAX_FILES:
+            _files.popitem(last=False)
+    return mf
@@ -0,0 +1,282 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import perf
+from match_data import MATCH_TABLES, records_of, tool_of
+
+# ==========================================
+# シーズンの試合データ（ローカルの SQLite）
+# ==========================================
+# 各ツールからエクスポートしたJSONを、試合（日付・相手）とツールごとに1つだけ保存する。
+# 同じ試合・同じツールのファイルは、中身が同じなら読み飛ばし、違えば新しい方で置き換える。
+# ショット・TO・ドローなどの1件ずつは events にまとめて入れ、種類・Q・選手・試合の索引を張る。
+# シーズン集計（20試合のQ別シュート率など）は、アップロードし直さずに SQL の集計1回で出せる。
+MATCH_DB = os.environ.get(
+    "LAX_MATCH_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "match_store.sqlite")
+)
+# 表の作り・events に入れる列を変えたら上げる（古いDBは作り直す）
+SCHEMA_VERSION = 1
+
+# 表の名前 → (チーム側の列, 選手の列, 補足の列)
+#   補足の列: 攻め方・TOの原因・ドローの取り方など、シーズンで数えたい文字列
+EVENT_FIELDS = {
+    "shots":        ("team", "player",    "attack"),
+    "turnovers":    ("side", "player",    "cause"),
+    "draws":        (None,   "drawer",    "getWay"),
+    "gb":           ("side", "player",    "loc"),
+    "fouls":        ("side", "player",    "type"),
+    "goalie_shots": ("side", "goalieNum", "course"),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id      INTEGER PRIMARY KEY,
+    date    TEXT NOT NULL,
+    enemy   TEXT NOT NULL,
+    q_count INTEGER,
+    UNIQUE (date, enemy)
+);
+CREATE INDEX IF NOT EXISTS matches_enemy ON matches (enemy, date);
+CREATE TABLE IF NOT EXISTS files (
+    match_id    INTEGER NOT NULL REFERENCES matches (id),
+    tool        TEXT NOT NULL,
+    digest      TEXT NOT NULL,
+    raw         BLOB NOT NULL,
+    imported_at REAL,
+    PRIMARY KEY (match_id, tool)
+);
+CREATE INDEX IF NOT EXISTS files_digest ON files (digest);
+CREATE TABLE IF NOT EXISTS events (
+    match_id INTEGER NOT NULL REFERENCES matches (id),
+    kind     TEXT NOT NULL,
+    q        INTEGER,
+    side     TEXT,
+    result   TEXT,
+    player   TEXT,
+    detail   TEXT
+);
+CREATE INDEX IF NOT EXISTS events_kind_q      ON events (kind, q, match_id);
+CREATE INDEX IF NOT EXISTS events_kind_player ON events (kind, player);
+CREATE INDEX IF NOT EXISTS events_match       ON events (match_id, kind);
+"""
+
+_init_lock = threading.Lock()
+_initialized = set()   # 表を作り終えたDBのパス
+
+
+def _connect(path: str = None) -> sqlite3.Connection:
+    path = path or MATCH_DB
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    con = sqlite3.connect(path, timeout=30)
+    with _init_lock:
+        if path not in _initialized:
+            con.execute("PRAGMA journal_mode=WAL")
+            if con.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                con.executescript("DROP TABLE IF EXISTS events; DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS matches;")
+                con.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            con.executescript(_SCHEMA)
+            _initialized.add(path)
+    return con
+
+
+# ==========================================
+# 取り込み
+# ==========================================
+def _text(v):
+    return None if v is None or v == "" else str(v)
+
+
+def _q(v):
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_export(raw: bytes):
+    """JSON（バイト列）→ (中身のハッシュ, meta, データの種類, events の行)。どのツールでもなければ種類はNone"""
+    doc = json.loads(raw)
+    meta = doc.get("meta", {})
+    tool = tool_of(meta)
+    rows = []
+    for name, (t, path, _, _) in MATCH_TABLES.items():
+        if t != tool:
+            continue
+        side_col, player_col, detail_col = EVENT_FIELDS[name]
+        for r in records_of(doc, path):
+            rows.append((name, _q(r.get("q")), _text(r.get(side_col)) if side_col else None,
+                         _text(r.get("result")), _text(r.get(player_col)), _text(r.get(detail_col))))
+    return hashlib.sha1(raw).hexdigest(), meta, tool, rows
+
+
+def _read_and_parse(path: str):
+    with open(path, "rb") as f:
+        raw = f.read()
+    return (raw, *parse_export(raw))
+
+
+def _store(con: sqlite3.Connection, raw: bytes, digest: str, meta: dict, tool, rows) -> str:
+    """1ファイル分を書き込み、"added"・"updated"・"skipped" のどれかを返す（トランザクションは呼び出し側）"""
+    if tool is None or not meta.get("date") or not meta.get("enemy"):
+        return "skipped"
+    con.execute("INSERT OR IGNORE INTO matches (date, enemy, q_count) VALUES (?, ?, ?)",
+                (str(meta["date"]), str(meta["enemy"]), _q(meta.get("qCount"))))
+    match_id = con.execute("SELECT id FROM matches WHERE date = ? AND enemy = ?",
+                           (str(meta["date"]), str(meta["enemy"]))).fetchone()[0]
+    old = con.execute("SELECT digest FROM files WHERE match_id = ? AND tool = ?", (match_id, tool)).fetchone()
+    if old and old[0] == digest:
+        return "skipped"
+    kinds = [name for name, spec in MATCH_TABLES.items() if spec[0] == tool]
+    con.execute(f"DELETE FROM events WHERE match_id = ? AND kind IN ({','.join('?' * len(kinds))})", (match_id, *kinds))
+    con.executemany("INSERT INTO events (match_id, kind, q, side, result, player, detail) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(match_id, *r) for r in rows])
+    con.execute("INSERT OR REPLACE INTO files (match_id, tool, digest, raw, imported_at) VALUES (?, ?, ?, ?, ?)",
+                (match_id, tool, digest, raw, time.time()))
+    if meta.get("qCount"):
+        con.execute("UPDATE matches SET q_count = MAX(COALESCE(q_count, 0), ?) WHERE id = ?", (_q(meta["qCount"]), match_id))
+    return "updated" if old else "added"
+
+
+_known_digests = set()   # このプロセスで保存済みのハッシュ（再実行のたびにDBを引かない）
+_known_lock = threading.Lock()
+
+
+def save_export(raw: bytes, db: str = None) -> str:
+    """アップロードされた1ファイルを保存する。"added"・"updated"・"skipped" のどれかを返す"""
+    digest = hashlib.sha1(raw).hexdigest()
+    with _known_lock:
+        if (db, digest) in _known_digests:
+            return "skipped"
+    con = _connect(db)
+    try:
+        if con.execute("SELECT 1 FROM files WHERE digest = ?", (digest,)).fetchone():
+            status = "skipped"
+        else:
+            with con:
+                status = _store(con, raw, *parse_export(raw))
+    finally:
+        con.close()
+    with _known_lock:
+        _known_digests.add((db, digest))
+    return status
+
+
+def import_folder(folder: str, db: str = None, workers: int = None) -> dict:
+    """フォルダ内の *.json をまとめて取り込む。パースは複数プロセスで並列、書き込みは1トランザクション
+
+    戻り値: {"added": n, "updated": n, "skipped": n, "errors": [(ファイル, エラー), ...]}
+    """
+    paths = sorted(os.path.join(dp, f) for dp, _, fs in os.walk(folder) for f in fs if f.lower().endswith(".json"))
+    result = {"added": 0, "updated": 0, "skipped": 0, "errors": []}
+    if not paths:
+        return result
+    con = _connect(db)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool, con:
+            futures = [pool.submit(_read_and_parse, p) for p in paths]
+            for p, fut in zip(paths, futures):
+                try:
+                    parsed = fut.result()
+                except Exception as e:
+                    result["errors"].append((p, str(e)))
+                    continue
+                result[_store(con, *parsed)] += 1
+    finally:
+        con.close()
+    return result
+
+
+# ==========================================
+# 読み出し・シーズン集計
+# ==========================================
+def _where(start=None, end=None, enemies=None, match_ids=None):
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("m.date >= ?"); params.append(str(start))
+    if end is not None:
+        clauses.append("m.date <= ?"); params.append(str(end))
+    if enemies:
+        clauses.append(f"m.enemy IN ({','.join('?' * len(enemies))})"); params.extend(enemies)
+    if match_ids is not None:
+        clauses.append(f"m.id IN ({','.join('?' * len(match_ids)) or 'NULL'})"); params.extend(match_ids)
+    return (" AND ".join(clauses) or "1"), params
+
+
+def _query(sql: str, params, db: str = None) -> pd.DataFrame:
+    with perf.span("db"):
+        con = _connect(db)
+        try:
+            return pd.read_sql_query(sql, con, params=params)
+        finally:
+            con.close()
+
+
+def list_matches(start=None, end=None, enemies=None, db: str = None) -> pd.DataFrame:
+    """保存済みの試合（id, date, enemy, q_count, tools）。日付の新しい順"""
+    where, params = _where(start, end, enemies)
+    return _query(f"""
+        SELECT m.id, m.date, m.enemy, m.q_count, GROUP_CONCAT(f.tool, ',') AS tools
+        FROM matches m LEFT JOIN files f ON f.match_id = m.id
+        WHERE {where} GROUP BY m.id ORDER BY m.date DESC, m.enemy""", params, db)
+
+
+def match_exports(match_id: int, db: str = None) -> list:
+    """1試合分の保存済みJSON（バイト列）のリスト。load_match_file にそのまま渡せる"""
+    con = _connect(db)
+    try:
+        return [r[0] for r in con.execute("SELECT raw FROM files WHERE match_id = ? ORDER BY tool", (match_id,))]
+    finally:
+        con.close()
+
+
+def event_counts(kind: str, by=("q", "side", "result"), start=None, end=None, enemies=None,
+                 match_ids=None, player=None, db: str = None) -> pd.DataFrame:
+    """kind（MATCH_TABLES の名前）の件数を by の列ごとに数える（列: by..., n）"""
+    cols = [c for c in by if c in ("q", "side", "result", "player", "detail")]
+    where, params = _where(start, end, enemies, match_ids)
+    if player is not None:
+        where += " AND e.player = ?"; params.append(str(player))
+    group = ", ".join(f"e.{c}" for c in cols)
+    return _query(f"""
+        SELECT {group + ',' if cols else ''} COUNT(*) AS n
+        FROM events e JOIN matches m ON m.id = e.match_id
+        WHERE e.kind = ? AND {where}
+        {'GROUP BY ' + group + ' ORDER BY ' + group if cols else ''}""", [kind, *params], db)
+
+
+def shot_rate_by_q(team: str = "kyoto", start=None, end=None, enemies=None, match_ids=None,
+                   player=None, db: str = None) -> pd.DataFrame:
+    """Q別のショット数・得点・シュート率（列: q, shots, goals, rate）"""
+    where, params = _where(start, end, enemies, match_ids)
+    if player is not None:
+        where += " AND e.player = ?"; params.append(str(player))
+    df = _query(f"""
+        SELECT e.q, COUNT(*) AS shots, SUM(e.result = 'goal') AS goals
+        FROM events e JOIN matches m ON m.id = e.match_id
+        WHERE e.kind = 'shots' AND e.side = ? AND {where}
+        GROUP BY e.q ORDER BY e.q""", [team, *params], db)
+    df["rate"] = (df["goals"] / df["shots"]).round(3)
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="フォルダ内の試合JSONをシーズンのDBに取り込む")
+    parser.add_argument("folder")
+    parser.add_argument("--db", default=None, help=f"DBのパス（省略時は {MATCH_DB}）")
+    parser.add_argument("--workers", type=int, default=None, help="パースに使うプロセス数")
+    args = parser.parse_args()
+    t0 = time.perf_counter()
+    res = import_folder(args.folder, db=args.db, workers=args.workers)
+    print(f"追加 {res['added']} / 更新 {res['updated']} / 変更なし {res['skipped']} "
+          f"（{time.perf_counter() - t0:.2f}秒）")
+    for path, err in res["errors"]:
+        print(f"  エラー: {path}: {err}")
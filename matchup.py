@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+import perf
+from time_index import day_buckets, day_span
+
+# ==========================================
+# 対戦表（シューター×ゴーリー・AT×DF・AT×ゴーリー）
+# ==========================================
+# 2つの選手列の組み合わせごとに、指標（対戦数・ショット数・ゴール・セーブなど）の件数を日ごとに数える。
+# 数えるのは実際に出てきた（組み合わせ, 日）だけで、組み合わせ順・日付順に並べて累積和を取って持つ
+# （日数 × 行の選手 × 列の選手 の配列は作らないので、大きさは記録の行数までで、日数には比例しない）。
+# 期間の件数は組み合わせごとに二分探索した位置の累積和の引き算、
+# 選手ごとのランキングはその行（列）を取り出して並べ替えるだけ。
+# 期間は日単位（開始・終了の日付を含む。time_index.day_span）。日時の無い行は、期間を絞らないときだけ数える。
+def player_codes(s: pd.Series):
+    """選手列 → (名前の並び, 0始まりのコード。欠損は -1)。並びは groupby と同じ（カテゴリ順・値の昇順）"""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s.cat.categories, s.cat.codes.to_numpy()
+    codes, names = pd.factorize(s, sort=True)
+    return names, codes
+
+
+class MatchupMatrix:
+    """行の選手 × 列の選手 の対戦ごとの指標の件数
+
+    table は sort_by_time 済み（EPOCH_COL 付き）の表。measures は 指標名 → 行ごとの件数（1次元）。
+    for_row(選手) / for_col(選手) で、その選手と対戦した相手ごとの指標を DataFrame で返す。
+    """
+
+    def __init__(self, table: pd.DataFrame, row: str, col: str, measures: dict):
+        self.row, self.col = row, col
+        self.row_names, r = player_codes(table[row])
+        self.col_names, c = player_codes(table[col])
+        # 日の区分: 0 = 日時なし、1.. = 日付順
+        self.days, bucket = day_buckets(table)
+        # 選手のコードは +1 して 0 を「不明（欠損）」にする
+        self._shape = (len(self.row_names) + 1, len(self.col_names) + 1)
+        self._stride = len(self.days) + 2
+        pair = (r.astype(np.int64) + 1) * self._shape[1] + (c.astype(np.int64) + 1)
+        # 出てきた (組み合わせ, 日) を組み合わせ順・日付順に並べたもの
+        self._keys, inv = np.unique(pair * self._stride + bucket, return_inverse=True)
+        self._pairs = np.unique(self._keys // self._stride)
+        self._cum = {}   # 指標名 → _keys の順の累積和（先頭に0を足して、[hi] - [lo] で区間の合計）
+        for name, values in measures.items():
+            counts = np.bincount(inv.ravel(), weights=np.asarray(values, dtype=np.float64), minlength=len(self._keys))
+            self._cum[name] = np.concatenate([[0], np.cumsum(counts.round().astype(np.int64))])
+
+    def between(self, start=None, end=None) -> dict:
+        """期間（start〜end の日付。None なら全期間）の 指標名 → (行の選手+1)×(列の選手+1) の件数。添字0は不明"""
+        lo, hi = day_span(self.days, start, end)
+        # 組み合わせごとに、日の区分が lo 未満・hi 未満の最後の位置を探す
+        base = self._pairs * self._stride
+        at_lo = np.searchsorted(self._keys, base + lo)
+        at_hi = np.searchsorted(self._keys, base + hi)
+        out = {}
+        for name, cum in self._cum.items():
+            m = np.zeros(self._shape, dtype=np.int64)
+            m.flat[self._pairs] = cum[at_hi] - cum[at_lo]
+            out[name] = m
+        return out
+
+    def _against(self, mats, axis, pos, names, index_name, unknown, present):
+        if pos is None:
+            # 全員: 選手側を足し合わせる（unknown=True なら選手が空欄の行も含める）
+            first = 0 if unknown else 1
+            cols = {n: m.take(range(first, m.shape[axis]), axis=axis).sum(axis=axis)[1:] for n, m in mats.items()}
+        else:
+            cols = {n: m.take(pos + 1, axis=axis)[1:] for n, m in mats.items()}
+        out = pd.DataFrame(cols, index=pd.Index(names, name=index_name))
+        return out[out[present or next(iter(mats))] > 0]
+
+    @perf.timed("aggregate")
+    def for_row(self, player=None, start=None, end=None, *, unknown=False, present=None) -> pd.DataFrame:
+        """行の選手 player（None は全員）と対戦した列の選手ごとの指標。present の指標が0の相手は除く"""
+        pos = None if player is None else self.row_names.get_indexer([player])[0]
+        if pos is not None and pos < 0:
+            return pd.DataFrame(columns=list(self._cum), index=pd.Index([], name=self.col))
+        return self._against(self.between(start, end), 0, pos, self.col_names, self.col, unknown, present)
+
+    @perf.timed("aggregate")
+    def for_col(self, player=None, start=None, end=None, *, unknown=False, present=None) -> pd.DataFrame:
+        """列の選手 player（None は全員）と対戦した行の選手ごとの指標。present の指標が0の相手は除く"""
+        pos = None if player is None else self.col_names.get_indexer([player])[0]
+        if pos is not None and pos < 0:
+            return pd.DataFrame(columns=list(self._cum), index=pd.Index([], name=self.row))
+        return self._against(self.between(start, end), 1, pos, self.row_names, self.row, unknown, present)
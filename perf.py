@@ -0,0 +1,186 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+# ==========================================
+# 処理時間の計測（全ダッシュボード共通）
+# ==========================================
+# 取得・パース・整形・期間の絞り込み・集計・グラフ作成・st.plotly_chart の時間を、再実行ごとに区間名で合計する。
+# 区間は入れ子にでき、記録するのは自分の時間（内側の区間を除いた時間）なので、合計が再実行全体の内訳になる。
+# 計測するのは begin() を呼んだスレッド（スクリプトを実行しているスレッド）だけで、
+# 計測しない再実行では span() はほぼ何もしない。
+# 各アプリは先頭で begin()、最後に finish() を呼び、途中で止めるときは st.stop() の代わりに stop() を呼ぶ。
+#   ?perf=1 を付けて開く・LAX_PERF=1 … サイドバーに「⏱ perf」パネルを出す
+#   LAX_PERF_LOG=パス                   … 再実行ごとに1行のJSONを追記する（パネルの有無に関係なく）
+PERF_ENABLED = os.environ.get("LAX_PERF") == "1"
+PERF_LOG = os.environ.get("LAX_PERF_LOG")
+
+_run = contextvars.ContextVar("lax_perf_run", default=None)
+_log_lock = threading.Lock()
+
+
+class Run:
+    """1回の再実行の記録（区間名 → [回数, 自分の秒数]、キャッシュ名 → [ヒット, ミス]）"""
+
+    def __init__(self, app: str, panel: bool):
+        self.app = app
+        self.panel = panel
+        self.started = time.time()
+        self.t0 = time.perf_counter()
+        self.spans = {}
+        self.caches = {}
+        self._children = [0.0]   # 区間の入れ子ごとの、内側の区間の合計秒数
+
+    def enter(self):
+        self._children.append(0.0)
+
+    def exit(self, name: str, elapsed: float):
+        inner = self._children.pop()
+        self._children[-1] += elapsed
+        rec = self.spans.setdefault(name, [0, 0.0])
+        rec[0] += 1
+        rec[1] += elapsed - inner
+
+    def count(self, cache: str, hit: bool):
+        self.caches.setdefault(cache, [0, 0])[0 if hit else 1] += 1
+
+    def total(self) -> float:
+        return time.perf_counter() - self.t0
+
+    def as_record(self) -> dict:
+        total = self.total()
+        return {
+            "ts": self.started, "app": self.app, "total_ms": round(total * 1000, 2),
+            "other_ms": round((total - self._children[0]) * 1000, 2),
+            "spans": {k: {"n": n, "ms": round(s * 1000, 2)} for k, (n, s) in self.spans.items()},
+            "caches": {k: {"hit": h, "miss": m} for k, (h, m) in self.caches.items()},
+        }
+
+
+@contextmanager
+def span(name: str):
+    """name の区間の時間を計る（計測していない再実行では何もしない）"""
+    run = _run.get()
+    if run is None:
+        yield
+        return
+    run.enter()
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.exit(name, time.perf_counter() - t0)
+
+
+def timed(name: str):
+    """関数全体を name の区間として計るデコレーター"""
+    def deco(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _run.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def count(cache: str, hit: bool):
+    """キャッシュのヒット・ミスを数える"""
+    run = _run.get()
+    if run is not None:
+        run.count(cache, hit)
+
+
+# ==========================================
+# 再実行の始まりと終わり（各アプリから呼ぶ）
+# ==========================================
+def begin(app: str):
+    """スクリプトの先頭（st.set_page_config の後）で呼ぶ。計測が有効なら記録を始める"""
+    import streamlit as st
+    panel = PERF_ENABLED or st.query_params.get("perf") == "1"
+    _run.set(Run(app, panel) if panel or PERF_LOG else None)
+
+
+def plotly_chart(fig, **kwargs):
+    """st.plotly_chart（グラフの JSON 化と送信）を計る"""
+    import streamlit as st
+    with span("plotly_chart"):
+        return st.plotly_chart(fig, **kwargs)
+
+
+def finish():
+    """スクリプトの最後で呼ぶ（途中で止めるときは stop()）。JSONL に追記し、有効ならサイドバーにパネルを出す"""
+    run = _run.get()
+    if run is None:
+        return
+    _run.set(None)
+    record = run.as_record()
+    if PERF_LOG:
+        line = json.dumps(record, ensure_ascii=False)
+        with _log_lock, open(PERF_LOG, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    if run.panel:
+        _panel(record)
+
+
+def stop():
+    """st.stop() の代わり。止める前に finish() を済ませる
+    （st.stop() の後はスクリプトの残りが実行されず、止めた後は画面に何も足せないため）"""
+    import streamlit as st
+    finish()
+    st.stop()
+
+
+def _panel(record: dict):
+    import pandas as pd
+    import streamlit as st
+    with st.sidebar.expander("⏱ perf", expanded=True):
+        st.caption(f"この再実行: {record['total_ms']:.0f} ms")
+        rows = [(k, v["n"], v["ms"]) for k, v in record["spans"].items()]
+        rows.append(("その他（スクリプト・描画）", 1, record["other_ms"]))
+        spans = pd.DataFrame(rows, columns=["区間", "回数", "ms"]).sort_values("ms", ascending=False)
+        spans["割合(%)"] = (spans["ms"] / max(record["total_ms"], 1e-9) * 100).round(1)
+        st.dataframe(spans.round({"ms": 1}), hide_index=True, use_container_width=True)
+        if record["caches"]:
+            caches = pd.DataFrame([(k, v["hit"], v["miss"]) for k, v in record["caches"].items()],
+                                  columns=["キャッシュ", "ヒット", "ミス"])
+            st.dataframe(caches, hide_index=True, use_container_width=True)
+        frames = cached_frame_memory()
+        if not frames.empty:
+            st.caption(f"キャッシュ中の表: {frames['MB'].sum():.1f} MB")
+            st.dataframe(frames, hide_index=True, use_container_width=True)
+
+
+# ==========================================
+# キャッシュ中の表のメモリ
+# ==========================================
+# 共有の表は版が変わらない限り同じオブジェクトなので、測った値をオブジェクトごとに覚えておく
+_memory = {}   # id(表) → (弱参照, バイト数)
+_memory_lock = threading.Lock()
+
+
+def _nbytes(frame) -> int:
+    with _memory_lock:
+        hit = _memory.get(id(frame))
+        if hit is not None and hit[0]() is frame:
+            return hit[1]
+    n = int(frame.memory_usage(index=True, deep=True).sum())
+    with _memory_lock:
+        for key in [k for k, (ref, _) in _memory.items() if ref() is None]:
+            del _memory[key]
+        _memory[id(frame)] = (weakref.ref(frame), n)
+    return n
+
+
+def cached_frame_memory():
+    """プロセス内のキャッシュ（S3・スプレッドシート・版ごとの派生データ）が持つ表の行数とメモリ"""
+    import pandas as pd
+    from data_fetch import cached_frames
+    rows = [(name, len(frame), _nbytes(frame) / 2**20) for name, frame in cached_frames()]
+    return pd.DataFrame(rows, columns=["表", "行数", "MB"]).round({"MB": 2})
@@ -0,0 +1,387 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from binlog import BINLOG_DIR, BinLog, date_column
+from count_cube import CountCube
+from matchup import MatchupMatrix
+from trends import DailyTotals
+from data_fetch import EVENT_LOG_DIR, AppendOnlyCsv, EventLogTable, event_log_path, fetch_s3_csv, fetch_s3_many, per_version
+from practice_schema import (
+    apply_schema, practice_schema,
+    FREESHOOT_CATEGORIES, FREESHOOT_CODES, FREESHOOT_COUNTS,
+    ONE_ON_ONE_CATEGORIES, ONE_ON_ONE_CODES, ONE_ON_ONE_COUNTS,
+)
+from stream_ingest import fold_into
+from time_index import sort_by_time
+
+# ==========================================
+# 練習データの取得・整形（全ダッシュボード共通）
+# ==========================================
+# app.py / 1on1app.py / practice_app.py は、ここから整形済みの表を受け取る。
+# 取得元ごとにローダーを1つだけ持つので、同じプロセス内なら全画面・全閲覧者で
+# ダウンロードとパースはデータの版ごとに1回。別プロセスのダッシュボードとは
+# スナップショット（snapshot_cache）を通して、取得・整形済みの結果を共有する。
+# 返す表はどれも時刻順に並べてあり、時刻_ns 列（time_index）で期間を二分探索で絞り込める。
+#
+# 正規の列名
+#   フリシュー: 日時_raw(日時型) 日時(日付) ゴーリー 背番号 打つ位置 シュートエリア コース 結果 ゴール セーブ 枠内 件数
+#   1on1      : タイムスタンプ AT DF ゴーリー 起点 抜き方 終わり方 利き手 結果 コース ショット位置 件数
+#   6on6      : 記録ツールの列名のまま（ショット・TO・GB・個人ミスの4表。timestamp は日時型）
+
+# ★ 取得元（ご自身のものに書き換えてください）
+FREESHOOT_RAW_URL = "https://docs.google.com/spreadsheets/d/1Bx8lfO0kx0771QewN3J92CL7P0_M-IRx92jXPW7ELqs/edit?usp=sharing"
+if "/edit" in FREESHOOT_RAW_URL:
+    FREESHOOT_SHEET_URL = FREESHOOT_RAW_URL.split("/edit")[0] + "/export?format=csv"
+else:
+    FREESHOOT_SHEET_URL = FREESHOOT_RAW_URL
+
+ONE_ON_ONE_SHEET_ID = "1hRkai8KYkb2nM8ZHA5h56JGst8pp9t8jUHu2jV-Nd2E"
+ONE_ON_ONE_GID = "1086529984"
+ONE_ON_ONE_SHEET_URL = f"https://docs.google.com/spreadsheets/d/{ONE_ON_ONE_SHEET_ID}/export?format=csv&gid={ONE_ON_ONE_GID}"
+# 1on1記録ツールの公開CSV（列名は英語）
+ONE_ON_ONE_RECORDER_URL = "https://docs.google.com/spreadsheets/d/e/2PACX-1vTjSO0rzNBiVYDqDPig3pX7SQCpo0RpKSGT231yRACUdD4arhDjpiUP0bcd7IjPaQGUI-g_gLO6ntBk/pub?gid=0&single=true&output=csv"
+
+S3_BUCKET   = "your-bucket-name"
+S3_KEY_FS   = "practice/freeshot.csv"   # フリシュー記録ツール（Lambda → S3）
+S3_KEY_6on6_SHOT = "practice/6on6_shot.csv"
+S3_KEY_6on6_TO   = "practice/6on6_to.csv"
+S3_KEY_6on6_GB   = "practice/6on6_gb.csv"
+S3_KEY_6on6_MISS = "practice/6on6_miss.csv"
+KEYS_6on6 = (S3_KEY_6on6_SHOT, S3_KEY_6on6_TO, S3_KEY_6on6_GB, S3_KEY_6on6_MISS)
+
+# このプロセスで取得済みの表・別プロセスが保存したスナップショットがこれより新しければ、
+# 取得せずにそれを使う（バックグラウンドの更新の間隔 refresher.REFRESH_INTERVAL と揃える）
+SHARED_MAX_AGE = 30
+
+
+# ==========================================
+# 整形（取得元ごとの列名・表記ゆれを正規の形にそろえる）
+# ==========================================
+def normalize_freeshoot_sheet(df_raw: pd.DataFrame) -> pd.DataFrame:
+    """フリシューのスプレッドシート → 正規のフリシュー表"""
+    # 最初の7列を抜き出して名前を固定
+    df = df_raw.iloc[:, :7].copy()
+    df.columns = ['日時', 'ゴーリー', '背番号', '打つ位置', 'シュートエリア', 'コース', '結果']
+    df['背番号'] = "#" + df['背番号'].astype(str).str.extract(r'(\d+)', expand=False).str.zfill(2)
+    df['日時_raw'] = pd.to_datetime(df['日時'], errors='coerce') # フィルター用に日時型を保持
+    df['日時'] = df['日時_raw'].dt.date
+    return _freeshoot_flags(df)
+
+
+# 記録ツール（Lambda送信JSON）の列名 → 正規の列名
+FREESHOOT_RECORDER_COLUMNS = {
+    "timestamp": "日時", "pos": "打つ位置", "area": "シュートエリア", "target": "コース",
+    "result": "結果", "shooter": "背番号", "goalie": "ゴーリー",
+}
+
+
+def normalize_freeshoot_recorder(df: pd.DataFrame) -> pd.DataFrame:
+    """フリシュー記録ツールのCSV（S3） → 正規のフリシュー表"""
+    df = df.rename(columns={k: v for k, v in FREESHOOT_RECORDER_COLUMNS.items() if k in df.columns})
+    if "背番号" in df.columns:
+        df["背番号"] = df["背番号"].astype(str).apply(lambda x: x if x.startswith("#") else "#" + x)
+    if "日時" in df.columns:
+        df["日時_raw"] = pd.to_datetime(df["日時"], errors="coerce")
+        df["日時"] = df["日時_raw"].dt.date
+    if "結果" not in df.columns:
+        df["結果"] = ""
+    return _freeshoot_flags(df)
+
+
+def _freeshoot_flags(df: pd.DataFrame) -> pd.DataFrame:
+    df['ゴール'] = (df['結果'] == 'ゴール').astype(int)
+    df['セーブ'] = (df['結果'] == 'セーブ').astype(int)
+    df['枠内'] = df['結果'].isin(['ゴール', 'セーブ']).astype(int)
+    df['件数'] = 1 # 集計表では「何本分か」になる。集計は len() ではなくこの列の合計で行う
+    # 名前・結果はカテゴリ、エリア・コースは int8 のコード（空白は0）にしておく
+    return apply_schema(df, FREESHOOT_CATEGORIES, FREESHOOT_CODES, FREESHOOT_COUNTS)
+
+
+# スプレッドシート（Googleフォーム）・記録ツールの列名 → 正規の列名
+ONE_ON_ONE_COLUMNS = {
+    'ショットを打った手': '利き手', 'ショットコース': 'コース', 'ショット結果': '結果',
+    'timestamp': 'タイムスタンプ', 'at': 'AT', 'df': 'DF', 'goalie': 'ゴーリー', 'origin': '起点',
+    'dodge': '抜き方', 'endType': '終わり方', 'hand': '利き手', 'result': '結果',
+    'shotPos': 'ショット位置', 'course': 'コース',
+}
+
+
+def normalize_1on1(df: pd.DataFrame) -> pd.DataFrame:
+    """1on1のスプレッドシート・記録ツールのCSV → 正規の1on1表"""
+    df = df.rename(columns={k: v for k, v in ONE_ON_ONE_COLUMNS.items() if k in df.columns})
+    # 空白データ(NaN)と文字列の混在によるTypeErrorを防ぐため、読み込み時にdatetime型へ変換しておく
+    if 'タイムスタンプ' in df.columns:
+        df['タイムスタンプ'] = pd.to_datetime(df['タイムスタンプ'], errors='coerce')
+    if '起点' in df.columns:
+        df['起点'] = df['起点'].astype('string').str.strip()
+    df['件数'] = 1
+    # 名前・結果はカテゴリ、コース・ショット位置は int8 のコード（空白は0）にしておく
+    return apply_schema(df, ONE_ON_ONE_CATEGORIES, ONE_ON_ONE_CODES, ONE_ON_ONE_COUNTS)
+
+
+def normalize_6on6(kind: str):
+    """6on6 のCSVの種類ごとに整形関数を返す（timestamp の解析もここで1回だけ行う）"""
+    schema = practice_schema(kind)
+
+    def normalize(df: pd.DataFrame) -> pd.DataFrame:
+        if "timestamp" in df.columns:
+            df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+        return sort_by_time(schema(df), "timestamp")
+    return normalize
+
+
+NORMALIZERS_6on6 = {
+    S3_KEY_6on6_SHOT: normalize_6on6("6on6_shot"),
+    S3_KEY_6on6_TO:   normalize_6on6("6on6_to"),
+    S3_KEY_6on6_GB:   normalize_6on6("6on6_gb"),
+    S3_KEY_6on6_MISS: normalize_6on6("6on6_miss"),
+}
+
+# ingest_server.py が受け取るイベントの種類 → 整形関数（イベントは記録ツールのCSVと同じ列名のJSON）
+EVENT_KINDS_6on6 = {key: key.rsplit("/", 1)[-1][:-len(".csv")] for key in KEYS_6on6}   # practice/6on6_shot.csv → 6on6_shot
+EVENT_KINDS = {
+    "freeshoot": normalize_freeshoot_recorder,
+    "1on1":      normalize_1on1,
+    **{EVENT_KINDS_6on6[key]: normalize for key, normalize in NORMALIZERS_6on6.items()},
+}
+
+
+# ==========================================
+# バイナリログ（LAX_BINLOG。binlog.py）
+# ==========================================
+# フリシュー・1on1 の記録ツールのイベントを固定長のレコードで持つ（フリシュー16バイト・1on1 21バイト）。
+# 選手の列は辞書の番号 int16、位置・結果などの選択肢は int8、エリア・コースはコードのまま。
+# 日付・フラグ・件数はほかの列から作れるので持たず、読むときに足す。
+# 6on6 は種類ごとに列がまちまち（記録ツールの列名のまま）なので、イベントログ・S3 のままにしている。
+def _freeshoot_from_binlog(df: pd.DataFrame) -> pd.DataFrame:
+    df['日時'] = date_column(df['日時_raw'].to_numpy())
+    return _freeshoot_flags(df)
+
+
+def _1on1_from_binlog(df: pd.DataFrame) -> pd.DataFrame:
+    df['件数'] = np.ones(len(df), dtype="int8")
+    return df
+
+
+BINLOG_SPECS = {
+    "freeshoot": ([
+        ('日時_raw', "time", None), ('ゴーリー', "name", np.int16), ('背番号', "name", np.int16),
+        ('打つ位置', "name", np.int8), ('結果', "name", np.int8),
+        ('シュートエリア', "code", np.int8), ('コース', "code", np.int8),
+    ], _freeshoot_from_binlog),
+    "1on1": ([
+        ('タイムスタンプ', "time", None), ('AT', "name", np.int16), ('DF', "name", np.int16), ('ゴーリー', "name", np.int16),
+        ('起点', "name", np.int8), ('抜き方', "name", np.int8), ('終わり方', "name", np.int8),
+        ('利き手', "name", np.int8), ('結果', "name", np.int8),
+        ('コース', "code", np.int8), ('ショット位置', "code", np.int8),
+    ], _1on1_from_binlog),
+}
+
+
+# ==========================================
+# 取得（プロセス内で共有）
+# ==========================================
+_sheets = {}
+_logs = {}
+_binlogs = {}
+_sheets_lock = threading.Lock()
+
+
+def _sheet(name: str, url: str, normalize, fold=None) -> AppendOnlyCsv:
+    with _sheets_lock:
+        if name not in _sheets:
+            _sheets[name] = AppendOnlyCsv(url, normalize, snapshot=name, fold=fold)
+        return _sheets[name]
+
+
+def _events(kind: str) -> pd.DataFrame:
+    """イベントログ（LAX_EVENT_LOG）から kind の表を読む（前回から届いたイベントだけを追加する）"""
+    with _sheets_lock:
+        if kind not in _logs:
+            _logs[kind] = EventLogTable(event_log_path(kind), EVENT_KINDS[kind])
+        table = _logs[kind]
+    return table.refresh()
+
+
+def binlog(kind: str, directory: str = None) -> BinLog:
+    """kind のバイナリログ（directory を省略したら LAX_BINLOG）"""
+    path = os.path.join(directory or BINLOG_DIR, f"{kind}.bin")
+    with _sheets_lock:
+        if path not in _binlogs:
+            _binlogs[path] = BinLog(path, *BINLOG_SPECS[kind])
+        return _binlogs[path]
+
+
+def _by_time(name: str, frame: pd.DataFrame, ts_col: str) -> pd.DataFrame:
+    # スプレッドシートは追記分を末尾に足していくので、並べ替えは取得後に版ごとに1回だけ行う
+    return per_version(f"{name}:rows", frame, lambda f: sort_by_time(f, ts_col))
+
+
+def load_freeshoot_sheet() -> pd.DataFrame:
+    """フリシュー（スプレッドシート）。返す表は共有オブジェクトなので書き換えないこと"""
+    frame = _sheet("freeshoot_sheet", FREESHOOT_SHEET_URL, normalize_freeshoot_sheet).refresh(SHARED_MAX_AGE)
+    return _by_time("freeshoot_sheet", frame, '日時_raw')
+
+
+def load_freeshoot_recorder(bucket: str = S3_BUCKET) -> pd.DataFrame:
+    """フリシュー（記録ツール → S3。LAX_BINLOG があればバイナリログ、LAX_EVENT_LOG があればイベントログ）"""
+    if BINLOG_DIR:
+        frame = binlog("freeshoot").frame()
+    elif EVENT_LOG_DIR:
+        frame = _events("freeshoot")
+    else:
+        frame = fetch_s3_csv(bucket, S3_KEY_FS, normalize_freeshoot_recorder, max_age=SHARED_MAX_AGE)
+    return _by_time(f"freeshoot_recorder:{bucket}", frame, '日時_raw')
+
+
+def load_1on1_sheet() -> pd.DataFrame:
+    """1on1（スプレッドシート）"""
+    frame = _sheet("1on1_sheet", ONE_ON_ONE_SHEET_URL, normalize_1on1).refresh(SHARED_MAX_AGE)
+    return _by_time("1on1_sheet", frame, 'タイムスタンプ')
+
+
+def load_1on1_recorder() -> pd.DataFrame:
+    """1on1（記録ツールの公開CSV。LAX_BINLOG があればバイナリログ、LAX_EVENT_LOG があればイベントログ）"""
+    if BINLOG_DIR:
+        frame = binlog("1on1").frame()
+    elif EVENT_LOG_DIR:
+        frame = _events("1on1")
+    else:
+        frame = _sheet("1on1_recorder", ONE_ON_ONE_RECORDER_URL, normalize_1on1).refresh(SHARED_MAX_AGE)
+    return _by_time("1on1_recorder", frame, 'タイムスタンプ')
+
+
+def load_6on6(bucket: str = S3_BUCKET):
+    """6on6の4表を並列に取得する。戻り値は fetch_s3_many と同じ (frames, seconds, errors)"""
+    if EVENT_LOG_DIR:
+        # イベントログはローカルのファイルなので順に読む（届いた分だけなので速い）
+        frames, seconds, errors = {}, {}, {}
+        for key in KEYS_6on6:
+            t0 = time.perf_counter()
+            try:
+                frames[key] = _events(EVENT_KINDS_6on6[key])
+            except Exception as e:
+                frames[key], errors[key] = pd.DataFrame(), str(e)
+            seconds[key] = time.perf_counter() - t0
+        return frames, seconds, errors
+    return fetch_s3_many(bucket, KEYS_6on6, normalizers=NORMALIZERS_6on6, max_age=SHARED_MAX_AGE)
+
+
+# ==========================================
+# 集計キューブ（データの版ごとに1回だけ作る）
+# ==========================================
+# 画面の集計は 件数 で重み付けしてあるので、生の行の代わりにキューブの表をそのまま渡せる
+# キューブの表も時刻順（日単位）に並べてあり、切り出した表をそのまま期間で絞り込める
+FREESHOOT_CUBE_KEYS = ['日時', 'ゴーリー', '背番号', '打つ位置', 'シュートエリア', 'コース', '結果']
+ONE_ON_ONE_CUBE_KEYS = ['タイムスタンプ', 'AT', 'DF', 'ゴーリー', '起点', '抜き方', '終わり方', '利き手', '結果', 'コース', 'ショット位置']
+
+
+def freeshoot_cube(frame: pd.DataFrame) -> CountCube:
+    """日付×ゴーリー×シューター×位置×エリア×コース×結果 の件数キューブ"""
+    cube = CountCube(frame, FREESHOOT_CUBE_KEYS, FREESHOOT_COUNTS)
+    if not cube.table.empty:
+        cube.table['日時_raw'] = pd.to_datetime(cube.table['日時']) # 期間フィルター用（日単位）
+    return cube.index_by_time('日時_raw')
+
+
+def one_on_one_cube(frame: pd.DataFrame) -> CountCube:
+    """日付×AT×DF×ゴーリー×起点×抜き方×終わり方×… の件数キューブ"""
+    if 'タイムスタンプ' in frame.columns:
+        frame = frame.assign(タイムスタンプ=frame['タイムスタンプ'].dt.normalize()) # キューブは日単位
+    return CountCube(frame, ONE_ON_ONE_CUBE_KEYS, ONE_ON_ONE_COUNTS).index_by_time('タイムスタンプ')
+
+
+def load_freeshoot_sheet_cube() -> CountCube:
+    return per_version("freeshoot_sheet:cube", load_freeshoot_sheet(), freeshoot_cube)
+
+
+def load_freeshoot_recorder_cube(bucket: str = S3_BUCKET) -> CountCube:
+    return per_version(f"freeshoot_recorder:{bucket}:cube", load_freeshoot_recorder(bucket), freeshoot_cube)
+
+
+def load_1on1_sheet_cube() -> CountCube:
+    return per_version("1on1_sheet:cube", load_1on1_sheet(), one_on_one_cube)
+
+
+# 【集計モード】生の行を持たず、スプレッドシートの行を件数表に畳み込んでおく（stream_ingest）。
+# 取得のたびに畳み込むのは、ウォーターマーク（AppendOnlyCsv）より後ろに追記された行だけ
+def _sheet_counts(name: str, url: str, normalize, keys, sums) -> pd.DataFrame:
+    fold = lambda folded, chunk: fold_into(folded, chunk, keys, sums)
+    return _sheet(name, url, normalize, fold).refresh(SHARED_MAX_AGE)
+
+
+def normalize_1on1_day(df: pd.DataFrame) -> pd.DataFrame:
+    df = normalize_1on1(df)
+    if 'タイムスタンプ' in df.columns:
+        df['タイムスタンプ'] = df['タイムスタンプ'].dt.normalize() # 件数表は日単位
+    return df
+
+
+def load_freeshoot_sheet_counts_cube() -> CountCube:
+    counts = _sheet_counts("freeshoot_sheet_counts", FREESHOOT_SHEET_URL, normalize_freeshoot_sheet,
+                           FREESHOOT_CUBE_KEYS, FREESHOOT_COUNTS)
+    return per_version("freeshoot_sheet_counts:cube", counts, freeshoot_cube)
+
+
+def load_1on1_sheet_counts_cube() -> CountCube:
+    counts = _sheet_counts("1on1_sheet_counts", ONE_ON_ONE_SHEET_URL, normalize_1on1_day,
+                           ONE_ON_ONE_CUBE_KEYS, ONE_ON_ONE_COUNTS)
+    return per_version("1on1_sheet_counts:cube", counts, one_on_one_cube)
+
+
+# ==========================================
+# 対戦表（苦手ランキング用。データの版ごとに1回だけ作る）
+# ==========================================
+# キューブの表・生の行のどちらからでも作れる（生の行は 件数=1）。列が無い対戦表は作らない
+def _count(t: pd.DataFrame, mask=None):
+    """条件に合う行の件数（集計表の1行は複数回分なので 件数 列を使う）"""
+    w = t['件数'].to_numpy()
+    return w if mask is None else np.where(mask, w, 0)
+
+
+def freeshoot_matchups(table: pd.DataFrame) -> dict:
+    """シューター×ゴーリー（枠内・セーブ・ゴール）"""
+    if not {'背番号', 'ゴーリー'} <= set(table.columns):
+        return {}
+    return {"シューター×ゴーリー": MatchupMatrix(table, '背番号', 'ゴーリー', {
+        "枠内": table['枠内'], "セーブ": table['セーブ'], "ゴール": table['ゴール'],
+    })}
+
+
+def one_on_one_matchups(table: pd.DataFrame) -> dict:
+    """AT×DF（対戦・ショット）と AT×ゴーリー（被ショット・セーブ）"""
+    cols = set(table.columns)
+    out = {}
+    if {'AT', 'DF', '終わり方'} <= cols:
+        end = table['終わり方']
+        out["AT×DF"] = MatchupMatrix(table, 'AT', 'DF', {
+            "行": _count(table),
+            "対戦": _count(table, end.notna()),
+            "ショット": _count(table, end.eq('ショット')),
+        })
+    if {'AT', 'ゴーリー', '結果'} <= cols:
+        result = table['結果']
+        shot = table['終わり方'].eq('ショット') if '終わり方' in cols else pd.Series(True, index=table.index)
+        out["AT×ゴーリー"] = MatchupMatrix(table, 'AT', 'ゴーリー', {
+            # ゴール・セーブで終わった回数（1on1app）
+            "被ショット": _count(table, result.isin(['ゴール', 'セーブ'])),
+            "セーブ": _count(table, result.eq('セーブ')),
+            # 終わり方=ショットの回数と、そのうち結果の入っている回数・セーブ（practice_app）
+            "ショット": _count(table, shot),
+            "ショット結果": _count(table, shot & result.notna()),
+            "ショットのセーブ": _count(table, shot & result.eq('セーブ')),
+        })
+    return out
+
+
+# ==========================================
+# 選手ごとの日別の累積件数（期間の合計・日/週/月の推移用。データの版ごとに1回だけ作る）
+# ==========================================
+def freeshoot_trends(table: pd.DataFrame) -> dict:
+    """シューター・ゴーリーごとの 件数・ゴール・枠内・セーブ"""
+    measures = {"件数": table['件数'], "ゴール": table['ゴール'], "枠内": table['枠内'], "セーブ": table['セーブ']}
+    return {col: DailyTotals(table, col, measures) for col in ('背番号', 'ゴーリー')}
@@ -0,0 +1,76 @@
+import pandas as pd
+
+# ==========================================
+# 練習イベント表の型定義（読み込み時に1回だけ適用する）
+# ==========================================
+# 名前・結果などの文字列は Categorical、エリア・コース・ショット位置は int8 のコード
+# （空白・不正値は 0）。ヒートマップや絞り込みは小さな整数配列の比較だけで済む。
+# 件数・フラグ列は、生データでは1行=1件、集計表（stream_ingest）では合計値になる。
+
+# フリシュー（スプレッドシート・記録ツールとも practice_data で同じ列名にそろえる）
+FREESHOOT_CATEGORIES = ['ゴーリー', '背番号', '打つ位置', '結果']
+FREESHOOT_CODES      = ['シュートエリア', 'コース']
+FREESHOOT_COUNTS     = ['件数', 'ゴール', 'セーブ', '枠内']
+
+# 1on1（同上）
+ONE_ON_ONE_CATEGORIES = ['AT', 'DF', 'ゴーリー', '起点', '抜き方', '終わり方', '利き手', '結果']
+ONE_ON_ONE_CODES      = ['コース', 'ショット位置']
+ONE_ON_ONE_COUNTS     = ['件数']
+
+# 6on6（記録ツール → S3 のCSV。列名は英語のまま）
+PRACTICE_SCHEMAS = {
+    "6on6_shot": (["side", "shooter", "result"], ["area", "course"]),
+    "6on6_to":   (["player1"], []),
+    "6on6_gb":   (["player"], []),
+    "6on6_miss": (["player"], []),
+}
+
+
+def as_code(s: pd.Series) -> pd.Series:
+    """'3' / 3.0 / 空白 → int8（不正値・空白は0）"""
+    return pd.to_numeric(s, errors="coerce").fillna(0).astype("int8")
+
+
+def apply_schema(df: pd.DataFrame, categories=(), codes=(), counts=()) -> pd.DataFrame:
+    """存在する列だけを型変換する（列が無いCSVでもそのまま通す）"""
+    for c in categories:
+        if c in df.columns:
+            df[c] = df[c].astype("category")
+    for c in codes:
+        if c in df.columns:
+            df[c] = as_code(df[c])
+    for c in counts:
+        if c in df.columns:
+            df[c] = df[c].astype("int8")
+    return df
+
+
+def practice_schema(kind: str):
+    """6on6 用：CSVの種類ごとに型変換関数を返す"""
+    categories, codes = PRACTICE_SCHEMAS[kind]
+    return lambda df: apply_schema(df, categories, codes)
+
+
+def concat_events(base: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """差分行を追加する。カテゴリ列はカテゴリを揃えてから連結する（揃えないと object に戻ってしまう）
+
+    カテゴリは全体を読み込んで astype('category') したときと同じく値の昇順にそろえる
+    （新しい値が来たときだけ base のカテゴリを付け直す）。差分で足していっても、全体を読み直しても同じ表になる。
+    """
+    if base.empty:
+        return new
+    base = base.copy(deep=False)
+    new = new.copy(deep=False)
+    for c in base.columns:
+        if c in new.columns and isinstance(base[c].dtype, pd.CategoricalDtype):
+            added = new[c].astype(object).dropna().unique()
+            missing = pd.Index(added).difference(base[c].cat.categories)
+            if len(missing):
+                categories = base[c].cat.categories.append(missing)
+                try:
+                    categories = categories.sort_values()
+                except TypeError:
+                    pass   # 数値と文字列が混ざったカテゴリは並べずに後ろへ足す
+                base[c] = base[c].cat.set_categories(categories)
+            new[c] = pd.Categorical(new[c].astype(object), categories=base[c].cat.categories)
+    return pd.concat([base, new])
@@ -0,0 +1,148 @@
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# ==========================================
+# 取得元の更新をバックグラウンドで行う（古いデータを返しつつ裏で取り直す）
+# ==========================================
+# 画面は取得元（Googleスプレッドシート・S3）を待たず、最後に取得できたスナップショットをすぐ受け取る。
+# 取得元ごとの更新はこのモジュールのスレッドが REFRESH_INTERVAL 秒ごとに行い、取得できたら
+# スナップショットを丸ごと差し替える（1回の代入なので、読む側が作りかけの状態を見ることはない）。
+# 中の表は共有オブジェクトなので、画面側では書き換えないこと。
+# 取得に失敗したら前のスナップショットを返し続け、失敗が続くほど次の取得までの間隔を倍々に延ばす
+# （最大 MAX_BACKOFF 秒）。取得そのものの時間は data_fetch のタイムアウト（HTTP・S3）で打ち切る。
+# 一度も取得できていない起動直後だけは、最初の取得を FIRST_LOAD_WAIT 秒まで待つ。
+REFRESH_INTERVAL = float(os.environ.get("LAX_REFRESH_INTERVAL", "30"))
+MAX_BACKOFF = 300
+FIRST_LOAD_WAIT = 60
+REFRESH_WORKERS = 4
+
+log = logging.getLogger(__name__)
+
+
+class Snapshot:
+    """ある時点の取得結果（value は最後に取得できた値、error は直近の取得の失敗。どちらも None がありうる）"""
+
+    __slots__ = ("value", "updated", "error")
+
+    def __init__(self, value, updated, error=None):
+        self.value = value
+        self.updated = updated   # value を取得した時刻（time.time）。一度も取得できていなければ None
+        self.error = error
+
+    def age(self) -> float:
+        return time.time() - self.updated if self.updated is not None else float("inf")
+
+
+class Source:
+    """1つの取得元（load() で最新の値を返す関数）と、そのスナップショット"""
+
+    def __init__(self, name: str, load, interval: float):
+        self.name = name
+        self.load = load
+        self.interval = interval
+        self.snapshot = None       # Snapshot（最初の取得が終わるまでは None）
+        self.ready = threading.Event()
+        self.failures = 0
+        self.due = 0.0             # 次に取得する時刻（time.monotonic）
+        self.running = False
+
+    def refresh(self):
+        try:
+            value = self.load()
+        except Exception as e:
+            self.failures += 1
+            delay = min(self.interval * 2 ** self.failures, MAX_BACKOFF)
+            log.warning("%s の更新に失敗しました（%d回連続。%.0f秒後に再試行）: %s", self.name, self.failures, delay, e)
+            old = self.snapshot
+            self.snapshot = Snapshot(old.value if old else None, old.updated if old else None, str(e))
+        else:
+            self.failures = 0
+            delay = self.interval
+            self.snapshot = Snapshot(value, time.time())
+        with _lock:
+            # 同じ間隔の取得元が同時に取りに行かないよう、少し後ろにずらす
+            # （前倒しにすると、practice_data の SHARED_MAX_AGE 以内で取得が省かれてしまう）
+            self.due = time.monotonic() + delay * random.uniform(1.0, 1.2)
+            self.running = False
+        self.ready.set()
+        _wake.set()
+
+
+_sources = {}   # 名前 → Source
+_lock = threading.Lock()
+_wake = threading.Event()
+_pool = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix="refresh")
+_thread = None
+
+
+def _loop():
+    while True:
+        _wake.clear()
+        now = time.monotonic()
+        with _lock:
+            due = [s for s in _sources.values() if not s.running and s.due <= now]
+            for s in due:
+                s.running = True
+            nxt = min((s.due for s in _sources.values() if not s.running), default=None)
+        for s in due:
+            _pool.submit(s.refresh)
+        # 次の取得の時刻まで眠る（登録・取得の終了で起こされる）
+        _wake.wait(REFRESH_INTERVAL if nxt is None else max(0.05, nxt - now))
+
+
+def watch(name: str, load, interval: float = REFRESH_INTERVAL) -> Source:
+    """name の取得元を登録し、バックグラウンドで更新し続ける（登録済みならそのまま返す）"""
+    global _thread
+    with _lock:
+        src = _sources.get(name)
+        if src is None:
+            src = _sources[name] = Source(name, load, interval)
+            if _thread is None:
+                _thread = threading.Thread(target=_loop, name="refresher", daemon=True)
+                _thread.start()
+            _wake.set()
+        return src
+
+
+def poke(*names: str):
+    """names の取得元を今すぐ取り直す（新しいデータが届いたと知らされたとき。未登録の名前は無視する）"""
+    with _lock:
+        for name in names:
+            src = _sources.get(name)
+            if src is not None:
+                src.due = 0.0
+    _wake.set()
+
+
+def latest(name: str, load, interval: float = REFRESH_INTERVAL, wait: float = FIRST_LOAD_WAIT):
+    """name の最新のスナップショット。取得元を待つのは、まだ一度も取得していないときだけ（最大 wait 秒。間に合わなければ None）"""
+    src = watch(name, load, interval)
+    if src.snapshot is None:
+        src.ready.wait(wait)
+    return src.snapshot
+
+
+def describe(snap) -> str:
+    """画面に出す注意書き（更新に失敗して古いデータを表示しているとき。問題がなければ空文字）"""
+    if snap is None or snap.error is None:
+        return ""
+    if snap.updated is None:
+        return f"データを取得できませんでした: {snap.error}"
+    return f"更新に失敗しています（{snap.age() / 60:.0f}分前のデータを表示中）: {snap.error}"
+
+
+def current(name: str, load, default=None, interval: float = REFRESH_INTERVAL):
+    """画面用: name の最新の値（まだ無ければ default）。更新に失敗しているときはサイドバーに注意書きを出す"""
+    import streamlit as st
+    snap = latest(name, load, interval)
+    if snap is None:
+        st.sidebar.info("⏳ データを読み込み中です。しばらくしてから再読み込みしてください。")
+        return default
+    note = describe(snap)
+    if note:
+        st.sidebar.warning(f"⚠️ {note}")
+    return default if snap.value is None else snap.value
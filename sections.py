@@ -0,0 +1,22 @@
+import streamlit as st
+
+# ==========================================
+# 開いているセクションだけを計算する（タブの遅延実行）
+# ==========================================
+# st.tabs(on_change="rerun") は、選ばれているタブを .open で教えてくれる。
+# 閉じているタブの集計・グラフ作成は丸ごと飛ばし、タブを切り替えたときの再実行で開いた分だけを計算する。
+# 作った集計表・グラフは figure_cache（cached_table・cached_figure）で使い回すので、一度開いたタブはすぐに出る。
+# on_change に対応していない古い Streamlit では、従来どおり全てのタブを計算する。
+
+
+def lazy_tabs(labels, key: str):
+    """タブを作って返す（開いているかは is_open で調べる）。key は画面ごとに別の名前にする"""
+    try:
+        return st.tabs(labels, key=key, on_change="rerun")
+    except TypeError:
+        return st.tabs(labels)
+
+
+def is_open(tab) -> bool:
+    """タブが開いている（または開閉を追跡できない）なら True"""
+    return getattr(tab, "open", None) is not False
@@ -0,0 +1,100 @@
+import json
+import logging
+import os
+import re
+import hashlib
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# ==========================================
+# 整形済みデータのローカルスナップショット（Parquet）
+# ==========================================
+# プロセス再起動・コンテナ再ビルドの直後でも、ここから読み込めば全件の再ダウンロード・再パースが要らない。
+# 取得元の版（ETag・行ウォーターマーク）を一緒に保存しておき、起動後は差分だけを取り込む。
+# Parquet で区別されない型は読むときに戻す（戻さないと、差分を足した表が全体をパースし直した表と違ってしまう）:
+#   カテゴリ列のカテゴリの型（str / string）… 一緒に保存しておいた型に戻す
+#   日付（datetime.date）の列の空欄 … None で戻るので、整形したときと同じ NaT にする
+SNAPSHOT_DIR = os.environ.get(
+    "LAX_SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "snapshots")
+)
+# 整形処理や列の型を変えたら上げる（古いスナップショットは読み捨てて取り直す）
+SCHEMA_VERSION = 5
+
+_META_KEY = b"lax_snapshot"
+log = logging.getLogger(__name__)
+
+
+def snapshot_name(*parts: str) -> str:
+    """取得元（バケット・キー・URLなど）からファイル名に使える名前を作る"""
+    raw = "/".join(parts)
+    slug = re.sub(r"[^0-9A-Za-z]+", "_", raw.rsplit("/", 1)[-1]).strip("_")[:40]
+    return f"{slug}-{hashlib.sha1(raw.encode()).hexdigest()[:10]}"
+
+
+def _path(name: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"{name}.parquet")
+
+
+def snapshot_mtime(name: str):
+    """スナップショットの保存時刻（無ければNone）"""
+    try:
+        return os.path.getmtime(_path(name))
+    except OSError:
+        return None
+
+
+def save_snapshot(name: str, frame, watermark: dict) -> bool:
+    """DataFrameと取得元の版を1つのParquetファイルに書き出す（一時ファイル → rename で差し替え）"""
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        table = pa.Table.from_pandas(frame, preserve_index=True)
+        meta = dict(table.schema.metadata or {})
+        meta[_META_KEY] = json.dumps({
+            "schema_version": SCHEMA_VERSION,
+            "watermark": watermark,
+            "rows": len(frame),
+            "saved_at": time.time(),
+            "categories": {str(c): str(frame[c].cat.categories.dtype) for c in frame.columns
+                           if isinstance(frame[c].dtype, pd.CategoricalDtype)},
+        }).encode()
+        table = table.replace_schema_metadata(meta)
+        tmp = f"{_path(name)}.{os.getpid()}.tmp"
+        pq.write_table(table, tmp)
+        os.replace(tmp, _path(name))
+        return True
+    except Exception as e:
+        log.warning("snapshot %s を保存できませんでした: %s", name, e)
+        return False
+
+
+def load_snapshot(name: str):
+    """(frame, watermark) を返す。無い・壊れている・スキーマの版が違う場合は (None, None)"""
+    path = _path(name)
+    if not os.path.exists(path):
+        return None, None
+    try:
+        table = pq.read_table(path)
+        meta = json.loads((table.schema.metadata or {}).get(_META_KEY, b"{}"))
+        if meta.get("schema_version") != SCHEMA_VERSION:
+            return None, None
+        return _restore_types(table, meta.get("categories", {})), meta.get("watermark")
+    except Exception as e:
+        log.warning("snapshot %s を読み込めませんでした: %s", name, e)
+        return None, None
+
+
+def _restore_types(table: pa.Table, dtypes: dict) -> pd.DataFrame:
+    """Parquet の表 → DataFrame。カテゴリの型と日付の空欄を保存したときと同じにする"""
+    frame = table.to_pandas()
+    for field in table.schema:
+        if pa.types.is_date(field.type) and field.name in frame.columns and frame[field.name].dtype == object:
+            s = frame[field.name]
+            frame[field.name] = s.where(s.notna(), pd.NaT)
+    for c, dtype in dtypes.items():
+        if c in frame.columns and isinstance(frame[c].dtype, pd.CategoricalDtype) and str(frame[c].cat.categories.dtype) != dtype:
+            cats = frame[c].cat.categories
+            frame[c] = pd.Categorical.from_codes(frame[c].cat.codes, categories=pd.Index(cats, dtype=dtype))
+    return frame
@@ -0,0 +1,60 @@
+import urllib.request
+
+import pandas as pd
+
+from practice_schema import concat_events
+
+# ==========================================
+# チャンク読み込み＋事前集計（複数シーズン分のCSV向け）
+# ==========================================
+# CSVを一度に全部読まず、CHUNK_ROWS 行ずつパース・整形して、
+# 「日付 × 選手 × エリア/コース × 結果」ごとの件数へ畳み込んでいく。
+# 手元に残るのは集計表だけなので、履歴が増えてもピークメモリはほぼ一定。
+# 生の行は 📊 全データ を開いた時だけ、通常の読み込みで取得する。
+CHUNK_ROWS = 50_000
+HTTP_TIMEOUT = 30
+
+# 集計表の各行が何件分の行をまとめたものか（生データでは常に1）
+COUNT_COL = '件数'
+
+
+def iter_chunks(source: str, normalize, chunksize: int = CHUNK_ROWS):
+    """URL・ファイルパスからCSVをチャンクごとに読み、整形済みのDataFrameを順に返す"""
+    if source.startswith(("http://", "https://")):
+        with urllib.request.urlopen(source, timeout=HTTP_TIMEOUT) as res:
+            yield from _normalized(pd.read_csv(res, chunksize=chunksize, encoding="utf-8"), normalize)
+    else:
+        yield from _normalized(pd.read_csv(source, chunksize=chunksize, encoding="utf-8"), normalize)
+
+
+def _normalized(reader, normalize):
+    with reader:
+        for chunk in reader:
+            if not chunk.empty:
+                yield normalize(chunk)
+
+
+def fold_counts(chunks, keys, sums) -> pd.DataFrame:
+    """チャンクを keys ごとの件数表に畳み込む
+
+    keys: 集計キー（日付・選手・エリアなど。空白もそのまま1つの値として残す）
+    sums: 合計する列（ゴール・セーブなどのフラグ列。COUNT_COL は自動で足す）
+    """
+    folded = pd.DataFrame()
+    for chunk in chunks:
+        folded = fold_into(folded, chunk, keys, sums)
+    return folded.reset_index(drop=True)
+
+
+def fold_into(folded: pd.DataFrame, chunk: pd.DataFrame, keys, sums) -> pd.DataFrame:
+    """件数表 folded（空なら最初のチャンク）にチャンクを畳み込んだ件数表を返す（folded は書き換えない）"""
+    sums = [COUNT_COL] + [c for c in sums if c != COUNT_COL]
+    part = _aggregate(chunk, keys, sums)
+    return part if folded.empty else _aggregate(concat_events(folded, part), keys, sums)
+
+
+def _aggregate(df, keys, sums):
+    keys = [k for k in keys if k in df.columns]
+    cols = [c for c in sums if c in df.columns]
+    df = df.astype({c: "int64" for c in cols})   # int8 のまま合計すると桁あふれする
+    return df.groupby(keys, observed=True, dropna=False, sort=False)[cols].sum().reset_index()
@@ -0,0 +1,50 @@
+import os
+import sys
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+# テストはリポジトリ直下のモジュールをそのまま読み込む（bench/ と同じ）
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench import synth  # noqa: E402
+from practice_data import normalize_1on1, normalize_freeshoot_sheet  # noqa: E402
+from time_index import sort_by_time  # noqa: E402
+
+# ==========================================
+# 合成データ（bench/synth.py。空欄の選手・日時を少し混ぜ、記録順も一部入れ替える）
+# ==========================================
+ROWS = 3000
+
+
+def _csv(raw: pd.DataFrame, ts_col: str, player_col: str) -> bytes:
+    raw.loc[::97, player_col] = None
+    raw.loc[::251, ts_col] = None
+    raw = pd.concat([raw.iloc[:ROWS // 2], raw.iloc[ROWS // 2:].sample(frac=1, random_state=0)])
+    return raw.to_csv(index=False).encode("utf-8")
+
+
+@pytest.fixture(scope="session")
+def freeshoot_csv() -> bytes:
+    """フリシューのスプレッドシートのCSV"""
+    return _csv(synth.freeshoot_sheet(ROWS, seed=1), "日時", "ゴーリー")
+
+
+@pytest.fixture(scope="session")
+def freeshoot(freeshoot_csv) -> pd.DataFrame:
+    """整形して時刻順に並べたフリシューの表"""
+    return sort_by_time(normalize_freeshoot_sheet(pd.read_csv(BytesIO(freeshoot_csv))), "日時_raw")
+
+
+@pytest.fixture(scope="session")
+def one_on_one_csv() -> bytes:
+    """1on1 のスプレッドシートのCSV"""
+    return _csv(synth.one_on_one_sheet(ROWS, seed=2), "タイムスタンプ", "DF")
+
+
+@pytest.fixture(scope="session")
+def one_on_one(one_on_one_csv) -> pd.DataFrame:
+    """整形して時刻順に並べた 1on1 の表"""
+    return sort_by_time(normalize_1on1(pd.read_csv(BytesIO(one_on_one_csv))), "タイムスタンプ")
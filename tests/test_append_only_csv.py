@@ -0,0 +1,76 @@
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+import data_fetch
+from data_fetch import AppendOnlyCsv
+from practice_data import (FREESHOOT_COUNTS, FREESHOOT_CUBE_KEYS, freeshoot_cube, normalize_1on1,
+                           normalize_freeshoot_sheet)
+from stream_ingest import fold_counts, fold_into
+
+STEPS = [2, 3, 50, 51, 1000, 2500]   # 取得のたびに届いている行数（ヘッダーを含む）
+
+
+class Sheet:
+    """取得のたびに body を返すだけの取得元"""
+
+    def __init__(self, body: bytes):
+        self.lines = body.splitlines(True)
+        self.body = b""
+
+    def grow(self, n: int) -> bytes:
+        self.body = b"".join(self.lines[:n])
+        return self.body
+
+    def __call__(self, url: str) -> bytes:
+        return self.body
+
+
+@pytest.mark.parametrize("name,normalize", [("freeshoot", normalize_freeshoot_sheet), ("one_on_one", normalize_1on1)])
+def test_delta_parse_matches_full_parse(request, name, normalize):
+    body = request.getfixturevalue(f"{name}_csv")
+    sheet = Sheet(body)
+    loader = AppendOnlyCsv("sheet", normalize, fetch=sheet)
+    for n in STEPS + [len(sheet.lines)]:
+        sheet.grow(n)
+        got = loader.refresh()
+        assert loader.refresh() is got   # 前回と同じ内容なら何も足さない
+        pd.testing.assert_frame_equal(got, normalize(pd.read_csv(BytesIO(sheet.body))))
+    assert loader.rows == len(sheet.lines) - 1
+
+
+def test_fold_matches_fold_counts(freeshoot_csv):
+    sheet = Sheet(freeshoot_csv)
+    fold = lambda folded, chunk: fold_into(folded, chunk, FREESHOOT_CUBE_KEYS, FREESHOOT_COUNTS)
+    loader = AppendOnlyCsv("sheet", normalize_freeshoot_sheet, fetch=sheet, fold=fold)
+    for n in STEPS + [len(sheet.lines)]:
+        sheet.grow(n)
+        got = loader.refresh()
+    want = fold_counts([normalize_freeshoot_sheet(pd.read_csv(BytesIO(freeshoot_csv)))],
+                       FREESHOOT_CUBE_KEYS, FREESHOOT_COUNTS)
+    pd.testing.assert_frame_equal(freeshoot_cube(got).table.reset_index(drop=True),
+                                  freeshoot_cube(want).table.reset_index(drop=True))
+
+
+def _edit_middle(body: bytes) -> bytes:
+    """途中の行のコース（1桁）を書き換える。バイト数・ヘッダー・末尾行は変えない"""
+    lines = body.splitlines(True)
+    mid = len(lines) // 2
+    cells = lines[mid].decode("utf-8").split(",")
+    cells[-2] = "1" if cells[-2] != "1" else "2"
+    lines[mid] = ",".join(cells).encode("utf-8")
+    edited = b"".join(lines)
+    assert edited != body and len(edited) == len(body)
+    return edited
+
+
+def test_edited_middle_cell_is_reparsed(freeshoot_csv, monkeypatch):
+    monkeypatch.setattr(data_fetch, "PREFIX_CHECK_INTERVAL", 0)
+    sheet = Sheet(freeshoot_csv)
+    loader = AppendOnlyCsv("sheet", normalize_freeshoot_sheet, fetch=sheet)
+    sheet.grow(len(sheet.lines) - 10)
+    loader.refresh()
+    sheet.body = _edit_middle(sheet.body) + b"".join(sheet.lines[-10:])
+    got = loader.refresh()
+    pd.testing.assert_frame_equal(got, normalize_freeshoot_sheet(pd.read_csv(BytesIO(sheet.body))))
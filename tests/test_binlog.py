@@ -0,0 +1,63 @@
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from bench import synth
+from binlog import BinLog
+from practice_data import BINLOG_SPECS, EVENT_KINDS
+from time_index import sort_by_time
+
+KINDS = {
+    "freeshoot": (synth.freeshoot_recorder, "日時_raw"),
+    "1on1": (synth.one_on_one_recorder, "タイムスタンプ"),
+}
+
+
+def _recorded(kind: str, n: int = 2000) -> pd.DataFrame:
+    """記録ツールのCSVを読んで整形した表（ダッシュボードが CSV から読むときと同じ）"""
+    make, _ = KINDS[kind]
+    csv = make(n, seed=3).to_csv(index=False).encode("utf-8")
+    return EVENT_KINDS[kind](pd.read_csv(BytesIO(csv)))
+
+
+def _same(got: pd.DataFrame, want: pd.DataFrame, ts_col: str):
+    pd.testing.assert_frame_equal(sort_by_time(got, ts_col).reset_index(drop=True),
+                                  sort_by_time(want, ts_col).reset_index(drop=True))
+
+
+@pytest.mark.parametrize("kind", list(KINDS))
+def test_round_trip_matches_csv(tmp_path, kind):
+    want = _recorded(kind)
+    ts_col = KINDS[kind][1]
+    BinLog(str(tmp_path / f"{kind}.bin"), *BINLOG_SPECS[kind]).append(want)
+    got = BinLog(str(tmp_path / f"{kind}.bin"), *BINLOG_SPECS[kind]).frame()
+    _same(got, want, ts_col)
+
+
+@pytest.mark.parametrize("kind", list(KINDS))
+def test_incremental_reads_match_full_read(tmp_path, kind):
+    want = _recorded(kind)
+    ts_col = KINDS[kind][1]
+    path = str(tmp_path / f"{kind}.bin")
+    writer, reader = BinLog(path, *BINLOG_SPECS[kind]), BinLog(path, *BINLOG_SPECS[kind])
+    for lo, hi in [(0, 7), (7, 300), (300, 301), (301, 1500), (1500, len(want))]:
+        writer.append(want.iloc[lo:hi])
+        got = reader.frame()
+        assert len(got) == hi
+    assert reader.frame() is got   # 増えていなければ同じ表
+    pd.testing.assert_frame_equal(got, BinLog(path, *BINLOG_SPECS[kind]).frame())
+    _same(got, want, ts_col)
+
+
+def test_partial_record_is_ignored(tmp_path):
+    want = _recorded("freeshoot", 100)
+    path = str(tmp_path / "freeshoot.bin")
+    log = BinLog(path, *BINLOG_SPECS["freeshoot"])
+    log.append(want.iloc[:60])
+    with open(path, "ab") as f:
+        f.write(b"\x01" * (log.dtype.itemsize // 2))   # 書きかけのレコード
+    reader = BinLog(path, *BINLOG_SPECS["freeshoot"])
+    assert len(reader.frame()) == 60
+    log.append(want.iloc[60:])   # 書きかけの分は切り捨てて続きを書く
+    _same(reader.frame(), want, "日時_raw")
@@ -0,0 +1,43 @@
+import pandas as pd
+
+from practice_data import FREESHOOT_CUBE_KEYS, freeshoot_cube, one_on_one_cube
+from practice_schema import FREESHOOT_COUNTS, ONE_ON_ONE_COUNTS
+
+
+def _totals(df: pd.DataFrame, by: str, sums) -> pd.DataFrame:
+    return df.groupby(by, observed=True)[sums].sum().astype("int64").sort_index()
+
+
+def test_freeshoot_cube_keeps_totals(freeshoot):
+    cube = freeshoot_cube(freeshoot)
+    assert len(cube.table) < len(freeshoot)
+    assert cube.table['件数'].sum() == len(freeshoot)
+    for col in ('日時', 'ゴーリー', '背番号', '結果', 'シュートエリア'):
+        pd.testing.assert_frame_equal(_totals(cube.table, col, FREESHOOT_COUNTS), _totals(freeshoot, col, FREESHOOT_COUNTS))
+
+
+def test_freeshoot_cube_slice_matches_rows(freeshoot):
+    cube = freeshoot_cube(freeshoot)
+    for player in freeshoot['背番号'].cat.categories[:5]:
+        part = cube.slice('背番号', player)
+        assert (part['背番号'] == player).all()
+        rows = freeshoot[freeshoot['背番号'] == player]
+        pd.testing.assert_frame_equal(_totals(part, 'ゴーリー', FREESHOOT_COUNTS), _totals(rows, 'ゴーリー', FREESHOOT_COUNTS))
+    assert cube.slice('背番号', '#不在').empty
+
+
+def test_freeshoot_cube_is_time_sorted(freeshoot):
+    ns = freeshoot_cube(freeshoot).table['時刻_ns'].to_numpy()
+    assert (ns[1:] >= ns[:-1]).all()
+
+
+def test_one_on_one_cube_keeps_totals(one_on_one):
+    cube = one_on_one_cube(one_on_one)
+    assert cube.table['件数'].sum() == len(one_on_one)
+    for col in ('AT', 'DF', '終わり方', 'ショット位置'):
+        pd.testing.assert_frame_equal(_totals(cube.table, col, ONE_ON_ONE_COUNTS), _totals(one_on_one, col, ONE_ON_ONE_COUNTS))
+
+
+def test_cube_keys_drop_only_raw_columns(freeshoot):
+    cube = freeshoot_cube(freeshoot)
+    assert cube.keys == [k for k in FREESHOOT_CUBE_KEYS if k in freeshoot.columns]
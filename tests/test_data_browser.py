@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_browser import DataBrowser
+
+COLUMNS = ['ゴーリー', '背番号', '日時_raw', 'シュートエリア', '結果']
+
+
+def _sorted(table: pd.DataFrame, col: str, descending: bool) -> np.ndarray:
+    """sort_values での行位置の並び（欠損は末尾。降順では同じ値の行を新しい順にする）"""
+    t = table.reset_index(drop=True)
+    if descending:
+        t = t.iloc[::-1]
+    return t.sort_values(col, ascending=not descending, kind="stable", na_position="last").index.to_numpy()
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("col", COLUMNS)
+def test_order_matches_sort_values(freeshoot, col, descending):
+    np.testing.assert_array_equal(DataBrowser(freeshoot).order(col, descending), _sorted(freeshoot, col, descending))
+
+
+def test_original_order(freeshoot):
+    browser = DataBrowser(freeshoot)
+    np.testing.assert_array_equal(browser.order(None, False), np.arange(len(freeshoot)))
+    np.testing.assert_array_equal(browser.order(None, True), np.arange(len(freeshoot))[::-1])
+
+
+def test_rows_filters_span_and_values(freeshoot):
+    browser = DataBrowser(freeshoot)
+    goalies = tuple(freeshoot['ゴーリー'].cat.categories[:2])
+    span = (len(freeshoot) // 4, len(freeshoot) * 3 // 4)
+    filters = (('ゴーリー', goalies),)
+    got = browser.rows('背番号', True, span, filters)
+    order = _sorted(freeshoot, '背番号', True)
+    keep = (order >= span[0]) & (order < span[1]) & freeshoot['ゴーリー'].isin(goalies).to_numpy()[order]
+    np.testing.assert_array_equal(got, order[keep])
+    assert browser.rows('背番号', True, span, filters) is got   # 同じ条件は控えから返す
+
+
+def test_page_slices_rows(freeshoot):
+    browser = DataBrowser(freeshoot)
+    rows = browser.rows('結果', False)
+    size = 100
+    pages = [browser.page(rows, p, size, ['結果', '背番号']) for p in range(-(-len(rows) // size))]
+    assert [len(p) for p in pages[:-1]] == [size] * (len(pages) - 1)
+    pd.testing.assert_frame_equal(pd.concat(pages), freeshoot.iloc[rows][['結果', '背番号']])
+    assert browser.page(rows, len(pages), size).empty
@@ -0,0 +1,74 @@
+import gc
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from figure_cache import FigureCache, TableCache, data_version, figure_builder
+
+
+def test_lru_evicts_least_recently_used():
+    cache = TableCache(max_entries=2)
+    built = []
+    build = lambda name: lambda: built.append(name) or name
+    cache.get_or_build("a", build("a"))
+    cache.get_or_build("b", build("b"))
+    cache.get_or_build("a", build("a"))   # a を使ったので、次に捨てるのは b
+    cache.get_or_build("c", build("c"))
+    assert built == ["a", "b", "c"]
+    cache.get_or_build("a", build("a"))
+    cache.get_or_build("b", build("b"))
+    assert built == ["a", "b", "c", "b"]
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_unhashable_keys_are_built_every_time():
+    cache = TableCache()
+    calls = []
+    for _ in range(2):
+        cache.get_or_build(("k", [1]), lambda: calls.append(1))
+    assert len(calls) == 2 and not cache._entries
+
+
+def test_data_version_changes_when_frame_is_replaced():
+    frame = pd.DataFrame({"x": [1, 2]})
+    token = data_version(frame)
+    assert data_version(frame) == token
+    assert data_version(frame.copy()) != token   # 同じ中身でも別のオブジェクトなら別の版
+    replaced = pd.DataFrame({"x": [1, 2]})
+    del frame
+    gc.collect()
+    # 捨てられた表と同じ id になっても、番号は使い回さない
+    assert data_version(replaced) != token
+
+
+def test_restored_figure_equals_original():
+    df = pd.DataFrame({"結果": ["ゴール", "セーブ", "枠外", "ゴール"], "件数": [3, 2, 1, 4]})
+    z = np.array([[0.5, np.nan], [1.0, 0.0]])
+    cache = FigureCache()
+    for key, build in [("pie", lambda: px.pie(df, names="結果", values="件数", hole=0.4)),
+                       ("imshow", lambda: px.imshow(z, text_auto=True)),
+                       ("line", lambda: px.line(df, y="件数", markers=True))]:
+        original = build()
+        cache.get_or_build(key, lambda: original)
+        restored = cache.get_or_build(key, build)
+        assert restored is not original
+        assert json.loads(restored.to_json()) == json.loads(original.to_json())   # 画面に送る JSON が同じ
+
+
+def test_figure_builder_keys_on_arguments():
+    calls = []
+
+    @figure_builder
+    def chart(data, title=""):
+        calls.append(title)
+        return px.bar(data, y="v", title=title)
+
+    data = pd.DataFrame({"v": [1, 2]})
+    key = ("test", data_version(data))
+    chart(data, "a", key=key)
+    chart(data, "a", key=key)
+    chart(data, "b", key=key)
+    chart(data, "a")   # key なしは毎回作る
+    assert calls == ["a", "b", "a"]
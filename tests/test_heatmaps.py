@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from heatmaps import AREA_2x5, COURSE_3x3, ORIGIN_2x2, ORIGIN_3x3, grid_sums, ratio_grid
+
+N = 2000
+# レイアウト → セルの値のほかに混ぜる、どのセルにも入らない値
+OUTSIDE = {
+    "AREA_2x5": [0, 11, 99],
+    "COURSE_3x3": [0, 10, 12],
+    "ORIGIN_3x3": ["中央", "", None],
+    "ORIGIN_2x2": ["センター", "左横", None],
+}
+LAYOUTS = {"AREA_2x5": AREA_2x5, "COURSE_3x3": COURSE_3x3, "ORIGIN_3x3": ORIGIN_3x3, "ORIGIN_2x2": ORIGIN_2x2}
+
+
+def _keys(name: str, seed: int = 0, categorical: bool = False) -> pd.Series:
+    layout = LAYOUTS[name]
+    rng = np.random.default_rng(seed)
+    values = list(layout.cells)[1:] + OUTSIDE[name]   # 先頭のセルは1行も無い（母数0）
+    keys = pd.Series(np.asarray(values, dtype=object)[rng.integers(0, len(values), N)])
+    if isinstance(values[0], int):
+        return keys.astype(np.int64)
+    return keys.astype("category") if categorical else keys
+
+
+def _reference(keys: pd.Series, layout, weights=None) -> np.ndarray:
+    """セルごとに行を絞り込んで数える"""
+    w = pd.Series(1 if weights is None else np.asarray(weights), index=keys.index)
+    out = np.zeros(layout.shape, dtype=np.int64)
+    for key, (r, c) in layout.cells.items():
+        out[r, c] = w[(keys == key).to_numpy()].sum()
+    return out
+
+
+@pytest.mark.parametrize("categorical", [False, True])
+@pytest.mark.parametrize("name", list(LAYOUTS))
+def test_grid_sums_match_per_cell_counts(name, categorical):
+    layout = LAYOUTS[name]
+    keys = _keys(name, categorical=categorical)
+    weights = np.random.default_rng(1).integers(0, 4, N)
+    np.testing.assert_array_equal(grid_sums(keys, layout), _reference(keys, layout))
+    np.testing.assert_array_equal(grid_sums(keys, layout, weights), _reference(keys, layout, weights))
+    first = next(iter(layout.cells.values()))
+    assert grid_sums(keys, layout)[first] == 0
+
+
+def test_negative_codes_are_outside():
+    keys = pd.Series([-1, 1, 1, 10, -5])
+    np.testing.assert_array_equal(grid_sums(keys, AREA_2x5).ravel(), [2, 0, 0, 0, 0, 0, 0, 0, 0, 1])
+
+
+@pytest.mark.parametrize("name", list(LAYOUTS))
+def test_ratio_grid_matches_per_cell_counts(name):
+    layout = LAYOUTS[name]
+    keys = _keys(name, seed=2)
+    rng = np.random.default_rng(3)
+    total = rng.integers(0, 3, N)
+    success = np.minimum(total, rng.integers(0, 2, N))
+    z, text = ratio_grid(keys, layout, success, total, cell_labels=True)
+    num, den = _reference(keys, layout, success), _reference(keys, layout, total)
+    for r in range(layout.shape[0]):
+        for c in range(layout.shape[1]):
+            key = next((k for k, rc in layout.cells.items() if rc == (r, c)), None)
+            if key is None:
+                assert np.isnan(z[r, c]) and text[r, c] == ""   # どのセルの値にも当たらないマス
+                continue
+            n, d = num[r, c], den[r, c]
+            rate = n / d * 100 if d > 0 else 0
+            assert z[r, c] == pytest.approx(rate)
+            assert text[r, c] == f"[{key}]<br>{n if d else 0}/{d}<br>({rate:.1f}%)"
+    first = next(iter(layout.cells.values()))
+    assert z[first] == 0 and text[first].endswith("0/0<br>(0.0%)")   # 母数0のセル
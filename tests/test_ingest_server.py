@@ -0,0 +1,120 @@
+import http.client
+import json
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from bench import synth
+from binlog import BinLog
+from data_fetch import EventLogTable, event_log_path
+from ingest_server import serve
+from practice_data import BINLOG_SPECS, EVENT_KINDS
+
+
+@pytest.fixture
+def server(tmp_path):
+    """tmp_path にログを書くサーバー（空いているポートで起動する）"""
+    srv = serve(str(tmp_path / "events"), port=0, binlog_dir=str(tmp_path / "binlog"))
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _events(n: int, seed: int = 0) -> list:
+    """記録ツールが送るフリシューのイベント（JSON にできる値だけ）"""
+    return json.loads(synth.freeshoot_recorder(n, seed).to_json(orient="records", force_ascii=False))
+
+
+def _request(srv, method: str, path: str, body: bytes = None, headers=None):
+    conn = http.client.HTTPConnection(*srv.server_address, timeout=10)
+    try:
+        conn.putrequest(method, path)
+        for k, v in (headers or {}).items():
+            conn.putheader(k, v)
+        conn.endheaders()
+        if body:
+            conn.send(body)
+        res = conn.getresponse()
+        return res.status, json.loads(res.read())
+    finally:
+        conn.close()
+
+
+def _post(srv, kind: str, events) -> tuple:
+    body = json.dumps(events, ensure_ascii=False).encode("utf-8")
+    return _request(srv, "POST", f"/events/{kind}", body, {"Content-Length": str(len(body))})
+
+
+def test_post_appends_to_log_and_binlog(server, tmp_path):
+    events = _events(5)
+    assert _post(server, "freeshoot", events[:2]) == (200, {"seq": 1, "count": 2})
+    assert _post(server, "freeshoot", events[2]) == (200, {"seq": 2, "count": 1})
+    assert _post(server, "freeshoot", events[3:]) == (200, {"seq": 3, "count": 2})
+    with open(event_log_path("freeshoot", str(tmp_path / "events")), encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == events
+    mirror = BinLog(str(tmp_path / "binlog" / "freeshoot.bin"), *BINLOG_SPECS["freeshoot"]).frame()
+    want = EVENT_KINDS["freeshoot"](pd.DataFrame(events))
+    assert len(mirror) == 5
+    assert list(mirror['背番号'].astype(str)) == list(want['背番号'].astype(str))
+
+
+def test_unknown_kind_is_404(server):
+    assert _post(server, "basketball", _events(1))[0] == 404
+
+
+def test_wait_returns_after_post(server):
+    seq = _request(server, "GET", "/wait?timeout=0")[1]["seq"]
+    got = {}
+
+    def wait():
+        t0 = time.monotonic()
+        got["reply"] = _request(server, "GET", f"/wait?after={seq}&timeout=5")
+        got["waited"] = time.monotonic() - t0
+
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    time.sleep(0.3)
+    assert "reply" not in got   # 届くまでは待っている
+    _post(server, "freeshoot", _events(1))
+    waiter.join(5)
+    assert got["reply"] == (200, {"seq": seq + 1})
+    assert got["waited"] < 4
+
+
+def test_wait_times_out_without_events(server):
+    assert _request(server, "GET", "/wait?after=0&timeout=0.2") == (200, {"seq": 0})
+
+
+@pytest.mark.parametrize("headers", [{"Content-Length": "abc"}, {"Content-Length": "-1"}, {}])
+def test_bad_content_length_is_400(server, headers):
+    body = json.dumps(_events(1)).encode("utf-8") if headers else None
+    assert _request(server, "POST", "/events/freeshoot", body, headers)[0] == 400
+    assert _request(server, "GET", "/health")[1]["seq"] == 0
+
+
+def test_bad_timeout_is_400(server):
+    assert _request(server, "GET", "/wait?after=0&timeout=soon")[0] == 400
+
+
+def test_bad_json_is_400(server):
+    assert _request(server, "POST", "/events/freeshoot", b"{", {"Content-Length": "1"})[0] == 400
+
+
+def test_event_log_table_reads_only_new_lines(server, tmp_path):
+    events = _events(30, seed=1)
+    table = EventLogTable(event_log_path("freeshoot", str(tmp_path / "events")), EVENT_KINDS["freeshoot"])
+    assert table.refresh().empty
+    _post(server, "freeshoot", events[:20])
+    first = table.refresh()
+    assert len(first) == 20 and table.refresh() is first   # 増えていなければ同じ表
+    offset = table.offset
+    _post(server, "freeshoot", events[20:])
+    got = table.refresh()
+    assert table.offset > offset and table.rows == 30
+    # 前回の分はそのまま（新しい結果の名前が出るとカテゴリだけは増える）
+    pd.testing.assert_frame_equal(got.iloc[:20], first, check_dtype=False, check_categorical=False)
+    pd.testing.assert_frame_equal(got, EVENT_KINDS["freeshoot"](pd.DataFrame(events)))
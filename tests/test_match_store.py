@@ -0,0 +1,104 @@
+import json
+
+import pandas as pd
+import pytest
+
+import match_store
+from bench import synth
+
+
+def _raw(doc: dict) -> bytes:
+    return json.dumps(doc, ensure_ascii=False).encode("utf-8")
+
+
+@pytest.fixture
+def db(tmp_path) -> str:
+    return str(tmp_path / "match_store.sqlite")
+
+
+@pytest.fixture(scope="module")
+def exports() -> list:
+    """3試合分のエクスポート（(ファイル名, JSON) の並び。1試合5ファイル）"""
+    return list(synth.match_exports(3 * synth.EVENTS_PER_MATCH, seed=4))
+
+
+def _game(exports, i: int = 0) -> dict:
+    return [doc for name, doc in exports if name.endswith("_game.json")][i]
+
+
+def test_save_dedups_by_match_and_digest(db, exports, monkeypatch):
+    game = _raw(_game(exports))
+    assert match_store.save_export(game, db=db) == "added"
+    assert match_store.save_export(game, db=db) == "skipped"
+    # 別のプロセス（このプロセスで保存したハッシュを知らない）でも、DBのハッシュで読み飛ばす
+    monkeypatch.setattr(match_store, "_known_digests", set())
+    assert match_store.save_export(game, db=db) == "skipped"
+    draw = next(doc for name, doc in exports if name.startswith("match00000_draw"))
+    assert match_store.save_export(_raw(draw), db=db) == "added"
+    matches = match_store.list_matches(db=db)
+    assert len(matches) == 1 and sorted(matches.loc[0, "tools"].split(",")) == ["draw", "game"]
+
+
+def test_resaving_a_tool_replaces_its_events(db, exports):
+    game = _game(exports)
+    assert match_store.save_export(_raw(game), db=db) == "added"
+    edited = {**game, "shots": game["shots"][:10]}
+    assert match_store.save_export(_raw(edited), db=db) == "updated"
+    assert match_store.event_counts("shots", by=(), db=db)["n"].tolist() == [10]
+    # ほかのツールの行・試合は増えない
+    assert match_store.event_counts("turnovers", by=(), db=db)["n"].tolist() == [len(game["turnovers"])]
+    assert len(match_store.list_matches(db=db)) == 1
+    assert match_store.match_exports(int(match_store.list_matches(db=db).loc[0, "id"]), db=db) == [_raw(edited)]
+
+
+def test_files_without_match_are_skipped(db):
+    assert match_store.save_export(_raw({"meta": {"tool": "GameDataTool v2"}, "shots": []}), db=db) == "skipped"
+    assert match_store.save_export(_raw({"meta": {"date": "2025-04-01", "enemy": "関学"}}), db=db) == "skipped"
+    assert match_store.list_matches(db=db).empty
+
+
+def test_import_folder_then_reimport(db, exports, tmp_path):
+    folder = tmp_path / "matches"
+    folder.mkdir()
+    for name, doc in exports:
+        (folder / name).write_bytes(_raw(doc))
+    (folder / "broken.json").write_text("{", encoding="utf-8")
+    first = match_store.import_folder(str(folder), db=db, workers=2)
+    assert (first["added"], first["updated"], first["skipped"]) == (len(exports), 0, 0)
+    assert [p for p, _ in first["errors"]] == [str(folder / "broken.json")]
+    again = match_store.import_folder(str(folder), db=db, workers=2)
+    assert (again["added"], again["updated"], again["skipped"]) == (0, 0, len(exports))
+    game = _game(exports, 1)
+    (folder / "match00001_game.json").write_bytes(_raw({**game, "shots": game["shots"][1:]}))
+    edited = match_store.import_folder(str(folder), db=db, workers=2)
+    assert (edited["added"], edited["updated"], edited["skipped"]) == (0, 1, len(exports) - 1)
+    assert len(match_store.list_matches(db=db)) == 3
+
+
+def _shots(exports) -> pd.DataFrame:
+    rows = []
+    for name, doc in exports:
+        if name.endswith("_game.json"):
+            rows += [{**s, "enemy": doc["meta"]["enemy"]} for s in doc["shots"]]
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize("team", ["kyoto", "enemy"])
+def test_shot_rate_by_q_matches_groupby(db, exports, team):
+    for _, doc in exports:
+        match_store.save_export(_raw(doc), db=db)
+    shots = _shots(exports)
+    enemy = synth.ENEMIES[1]
+    player = shots['player'].iloc[0]
+    for filt, kwargs in [
+        (shots['team'] == team, {}),
+        ((shots['team'] == team) & (shots['enemy'] == enemy), {"enemies": [enemy]}),
+        ((shots['team'] == team) & (shots['player'] == player), {"player": player}),
+    ]:
+        got = match_store.shot_rate_by_q(team, db=db, **kwargs)
+        g = shots[filt].groupby('q')
+        want = pd.DataFrame({"q": g.size().index, "shots": g.size().to_numpy(),
+                             "goals": g['result'].apply(lambda r: (r == 'goal').sum()).to_numpy()})
+        want["rate"] = (want["goals"] / want["shots"]).round(3)
+        pd.testing.assert_frame_equal(got, want, check_dtype=False)
+        assert got["shots"].sum() == filt.sum()
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from practice_data import freeshoot_matchups, one_on_one_matchups
+
+FREESHOOT = ["枠内", "セーブ", "ゴール"]
+
+
+def _between(df: pd.DataFrame, ts_col: str, start, end) -> pd.DataFrame:
+    if start is None:
+        return df
+    day = pd.to_datetime(df[ts_col]).dt.normalize()
+    return df[(day >= start) & (day <= end)]
+
+
+def _reference(df, row, col, player, measures, present, unknown=False):
+    """対戦表を使わずに、行を絞り込んで groupby した相手ごとの指標"""
+    if player is not None:
+        df = df[df[row] == player]
+    elif not unknown:
+        df = df[df[row].notna()]
+    out = df[df[col].notna()].groupby(col, observed=True)[list(measures)].sum().astype("int64")
+    out.index = pd.Index(out.index.astype(object), name=col)
+    return out[out[present] > 0]
+
+
+def _periods(df: pd.DataFrame, ts_col: str, n: int = 8):
+    days = np.sort(pd.to_datetime(df[ts_col]).dt.normalize().dropna().unique())
+    rng = np.random.default_rng(0)
+    yield None, None
+    yield days[0], days[-1]
+    for _ in range(n):
+        a, b = sorted(rng.choice(days, 2))
+        yield pd.Timestamp(a), pd.Timestamp(b)
+
+
+def _check(got: pd.DataFrame, ref: pd.DataFrame):
+    got = got.copy()
+    got.index = pd.Index(got.index.astype(object), name=got.index.name)
+    pd.testing.assert_frame_equal(got[ref.columns], ref)
+
+
+@pytest.mark.parametrize("unknown", [False, True])
+def test_freeshoot_matchups_match_groupby(freeshoot, unknown):
+    m = freeshoot_matchups(freeshoot)["シューター×ゴーリー"]
+    shooters = [None] + list(freeshoot['背番号'].cat.categories[:4])
+    goalies = [None] + list(freeshoot['ゴーリー'].cat.categories)
+    for start, end in _periods(freeshoot, '日時_raw'):
+        rows = _between(freeshoot, '日時_raw', start, end)
+        for s in shooters:
+            _check(m.for_row(s, start, end, unknown=unknown, present='枠内'),
+                   _reference(rows, '背番号', 'ゴーリー', s, FREESHOOT, '枠内', unknown))
+        for g in goalies:
+            _check(m.for_col(g, start, end, unknown=unknown, present='枠内'),
+                   _reference(rows, 'ゴーリー', '背番号', g, FREESHOOT, '枠内', unknown))
+
+
+def test_one_on_one_matchups_match_groupby(one_on_one):
+    df = one_on_one.assign(
+        行=1, 対戦=one_on_one['終わり方'].notna().astype(int), ショット=one_on_one['終わり方'].eq('ショット').astype(int))
+    m = one_on_one_matchups(one_on_one)["AT×DF"]
+    for start, end in _periods(df, 'タイムスタンプ'):
+        rows = _between(df, 'タイムスタンプ', start, end)
+        for at in [None] + list(df['AT'].cat.categories[:4]):
+            _check(m.for_row(at, start, end, present='行'), _reference(rows, 'AT', 'DF', at, ["行", "対戦", "ショット"], '行'))
+        for dfp in [None] + list(df['DF'].cat.categories[:4]):
+            _check(m.for_col(dfp, start, end, present='行'), _reference(rows, 'DF', 'AT', dfp, ["行", "対戦", "ショット"], '行'))
+
+
+def test_unknown_player_is_empty(freeshoot):
+    m = freeshoot_matchups(freeshoot)["シューター×ゴーリー"]
+    assert m.for_row("#不在").empty and m.for_col("#不在").empty
+
+
+def test_between_is_difference_of_windows(freeshoot):
+    m = freeshoot_matchups(freeshoot)["シューター×ゴーリー"]
+    total = m.between()
+    first = m.between(None, None)
+    for name in total:
+        assert (total[name] == first[name]).all()
+        assert total[name].sum() == freeshoot[name].sum()
@@ -0,0 +1,101 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+import refresher
+from refresher import MAX_BACKOFF, Source, describe, latest, poke, watch
+
+_names = itertools.count()
+
+
+def _name() -> str:
+    """テストごとに別の取得元の名前（登録は取り消せないので）"""
+    return f"test-{next(_names)}"
+
+
+def _until(cond, timeout: float = 5):
+    end = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < end, "時間内に更新されませんでした"
+        time.sleep(0.01)
+
+
+class FlakyLoader:
+    """fail が True の間は失敗し、それ以外は呼ばれた回数を返す取得元"""
+
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise OSError(f"取得元に繋がりません（{self.calls}回目）")
+        return self.calls
+
+
+def test_serves_last_good_value_while_failing():
+    load, name = FlakyLoader(), _name()
+    snap = latest(name, load, interval=3600)
+    assert snap.value == 1 and snap.error is None and describe(snap) == ""
+    load.fail = True
+    poke(name)
+    _until(lambda: latest(name, load).error is not None)
+    snap = latest(name, load)
+    assert snap.value == 1   # 失敗しても前の値を返し続ける
+    assert "取得元に繋がりません" in describe(snap) and "分前のデータを表示中" in describe(snap)
+    load.fail = False
+    poke(name)
+    _until(lambda: latest(name, load).error is None)
+    assert latest(name, load).value == load.calls and describe(latest(name, load)) == ""
+
+
+def test_first_failure_has_no_value():
+    load, name = FlakyLoader(), _name()
+    load.fail = True
+    snap = latest(name, load, interval=3600)
+    assert snap.value is None and snap.updated is None
+    assert describe(snap).startswith("データを取得できませんでした")
+
+
+def test_backoff_doubles_up_to_max_with_jitter():
+    load = FlakyLoader()
+    load.fail = True
+    src = Source(_name(), load, interval=30)
+    for failures in range(1, 10):
+        before = time.monotonic()
+        src.refresh()
+        delay = min(30 * 2 ** failures, MAX_BACKOFF)
+        assert src.failures == failures
+        assert before + delay <= src.due <= time.monotonic() + delay * 1.2
+    load.fail = False
+    before = time.monotonic()
+    src.refresh()
+    assert src.failures == 0 and before + 30 <= src.due <= time.monotonic() + 36
+
+
+def test_first_load_wait_gives_up_and_later_returns_value():
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "ok"
+
+    name = _name()
+    t0 = time.monotonic()
+    assert latest(name, slow, interval=3600, wait=0.2) is None   # 間に合わなければ None
+    assert 0.2 <= time.monotonic() - t0 < 2
+    assert started.is_set()
+    release.set()
+    assert latest(name, slow).value == "ok"
+
+
+def test_poke_refreshes_now_and_ignores_unknown_names():
+    load, name = FlakyLoader(), _name()
+    assert latest(name, load, interval=3600).value == 1
+    poke(name, "未登録の取得元")
+    _until(lambda: latest(name, load).value == 2)
+    assert watch(name, load) is refresher._sources[name]
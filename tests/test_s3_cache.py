@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pandas as pd
+
+from bench.rerun import LocalS3
+from data_fetch import S3CsvCache
+
+BUCKET, KEY = "bucket", "practice/freeshot.csv"
+
+
+class CountingS3(LocalS3):
+    """get_object の呼び出しと送られた条件を記録する LocalS3（delay 秒かけて返す）"""
+
+    def __init__(self, objects: dict, delay: float = 0):
+        super().__init__(objects)
+        self.calls = []
+        self.delay = delay
+
+    def get_object(self, **params):
+        self.calls.append(params)
+        time.sleep(self.delay)
+        return super().get_object(**params)
+
+    def put(self, key: str, body: bytes):
+        self._objects[key] = LocalS3({key: body})._objects[key]
+
+
+def test_not_modified_reuses_frame():
+    s3 = CountingS3({KEY: b"a,b\n1,2\n"})
+    cache = S3CsvCache(client=s3)
+    normalized = []
+    first = cache.get(BUCKET, KEY, normalize=lambda df: normalized.append(1) or df)
+    again = cache.get(BUCKET, KEY, normalize=lambda df: normalized.append(1) or df)
+    assert again is first
+    assert normalized == [1]   # 304 ならパースも整形もしない
+    assert "IfNoneMatch" not in s3.calls[0]
+    assert s3.calls[1]["IfNoneMatch"] == cache.version(BUCKET, KEY)
+
+
+def test_changed_object_is_downloaded_again():
+    s3 = CountingS3({KEY: b"a,b\n1,2\n"})
+    cache = S3CsvCache(client=s3)
+    first = cache.get(BUCKET, KEY)
+    s3.put(KEY, b"a,b\n1,2\n3,4\n")
+    second = cache.get(BUCKET, KEY)
+    assert second is not first
+    pd.testing.assert_frame_equal(second, pd.DataFrame({"a": [1, 3], "b": [2, 4]}))
+
+
+def test_max_age_skips_the_request():
+    s3 = CountingS3({KEY: b"a\n1\n"})
+    cache = S3CsvCache(client=s3)
+    first = cache.get(BUCKET, KEY, max_age=30)
+    assert cache.get(BUCKET, KEY, max_age=30) is first
+    assert len(s3.calls) == 1
+    cache.get(BUCKET, KEY)   # max_age=0 なら必ず確認する
+    assert len(s3.calls) == 2
+
+
+def test_missing_key_returns_empty_frame():
+    s3 = CountingS3({})
+    cache = S3CsvCache(client=s3)
+    assert cache.get(BUCKET, KEY).empty
+    assert cache.version(BUCKET, KEY) is None
+
+
+def test_simultaneous_gets_share_one_request():
+    s3 = CountingS3({KEY: b"a\n1\n"}, delay=0.2)
+    cache = S3CsvCache(client=s3)
+    frames = []
+    threads = [threading.Thread(target=lambda: frames.append(cache.get(BUCKET, KEY))) for _ in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(s3.calls) == 1
+    assert all(f is frames[0] for f in frames)
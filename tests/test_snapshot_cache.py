@@ -0,0 +1,48 @@
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+import snapshot_cache
+from data_fetch import AppendOnlyCsv
+from practice_data import normalize_1on1, normalize_freeshoot_sheet
+from snapshot_cache import load_snapshot, save_snapshot
+
+NORMALIZE = {"freeshoot": normalize_freeshoot_sheet, "one_on_one": normalize_1on1}
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_cache, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+
+
+@pytest.mark.parametrize("name", list(NORMALIZE))
+def test_round_trip_keeps_frame_and_dtypes(request, name):
+    frame = request.getfixturevalue(name)
+    assert save_snapshot(name, frame, {"rows": len(frame)})
+    restored, watermark = load_snapshot(name)
+    assert watermark == {"rows": len(frame)}
+    pd.testing.assert_frame_equal(restored, frame)
+
+
+def test_other_schema_version_is_ignored(freeshoot, monkeypatch):
+    save_snapshot("old", freeshoot, {})
+    monkeypatch.setattr(snapshot_cache, "SCHEMA_VERSION", snapshot_cache.SCHEMA_VERSION + 1)
+    assert load_snapshot("old") == (None, None)
+    assert load_snapshot("missing") == (None, None)
+
+
+@pytest.mark.parametrize("name", list(NORMALIZE))
+def test_restore_then_delta_matches_full_parse(request, name):
+    body = request.getfixturevalue(f"{name}_csv")
+    normalize = NORMALIZE[name]
+    lines = body.splitlines(True)
+    head = b"".join(lines[:len(lines) * 2 // 3])
+    AppendOnlyCsv("sheet", normalize, fetch=lambda url: head, snapshot=name).refresh()
+    # 再起動したプロセス：スナップショットから再開して、残りの行だけを取り込む
+    loader = AppendOnlyCsv("sheet", normalize, fetch=lambda url: body, snapshot=name)
+    parsed = []
+    loader._parse = lambda data: parsed.append(data) or AppendOnlyCsv._parse(loader, data)
+    got = loader.refresh()
+    assert len(parsed) == 1 and len(parsed[0]) < len(body) - len(head) + len(lines[0]) + 1
+    pd.testing.assert_frame_equal(got, normalize(pd.read_csv(BytesIO(body))))
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from time_index import EPOCH_COL, day_buckets, day_span, sort_by_time, time_bounds, time_range
+
+
+def _mask(df: pd.DataFrame, ts_col: str, start, end) -> pd.DataFrame:
+    ts = pd.to_datetime(df[ts_col])
+    return df[(ts >= start) & (ts <= end)]
+
+
+def test_sort_by_time_orders_and_keeps_rows(freeshoot):
+    shuffled = freeshoot.drop(columns=EPOCH_COL).sample(frac=1, random_state=1)
+    out = sort_by_time(shuffled, '日時_raw')
+    ns = out[EPOCH_COL].to_numpy()
+    assert (ns[1:] >= ns[:-1]).all()
+    assert out['日時_raw'].isna().to_numpy()[:out['日時_raw'].isna().sum()].all()   # 日時が空の行は先頭
+    pd.testing.assert_frame_equal(out.drop(columns=EPOCH_COL).sort_index(), shuffled.sort_index())
+
+
+def test_sort_by_time_keeps_sorted_input_order(freeshoot):
+    out = sort_by_time(freeshoot.drop(columns=EPOCH_COL), '日時_raw')
+    assert out.index.equals(freeshoot.index)
+
+
+def test_time_range_matches_mask(freeshoot):
+    first, last = time_bounds(freeshoot)
+    assert first == freeshoot['日時_raw'].min() and last == freeshoot['日時_raw'].max()
+    days = pd.to_datetime(freeshoot['日時_raw'].dropna().dt.date.unique())
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        a, b = sorted(rng.choice(days, 2))
+        start, end = a, b + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+        pd.testing.assert_frame_equal(time_range(freeshoot, start, end), _mask(freeshoot, '日時_raw', start, end))
+
+
+def test_time_range_outside_data_is_empty(freeshoot):
+    assert time_range(freeshoot, pd.Timestamp("1990-01-01"), pd.Timestamp("1990-12-31")).empty
+
+
+def test_day_span_matches_date_mask(freeshoot):
+    days, bucket = day_buckets(freeshoot)
+    dates = freeshoot['日時_raw'].dt.normalize()
+    assert ((bucket == 0) == dates.isna().to_numpy()).all()
+    assert day_span(days, None, None) == (0, len(days) + 1)
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        a, b = sorted(rng.choice(dates.dropna().unique(), 2))
+        lo, hi = day_span(days, pd.Timestamp(a) + pd.Timedelta(hours=20), pd.Timestamp(b))   # 時刻は見ない
+        np.testing.assert_array_equal((bucket >= lo) & (bucket < hi), ((dates >= a) & (dates <= b)).to_numpy())
+    assert day_span(days, pd.Timestamp("1990-01-01"), pd.Timestamp("1990-12-31")) == (1, 1)
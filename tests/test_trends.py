@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from practice_data import freeshoot_trends
+
+MEASURES = ["件数", "ゴール", "枠内", "セーブ"]
+
+
+def _rows(df: pd.DataFrame, player_col: str, player, start, end) -> pd.DataFrame:
+    if player is not None:
+        df = df[df[player_col] == player]
+    if start is not None:
+        day = df['日時_raw'].dt.normalize()
+        df = df[(day >= start) & (day <= end)]
+    return df
+
+
+def _periods(df: pd.DataFrame, n: int = 6):
+    days = np.sort(df['日時_raw'].dt.normalize().dropna().unique())
+    rng = np.random.default_rng(0)
+    yield None, None
+    for _ in range(n):
+        a, b = sorted(rng.choice(days, 2))
+        yield pd.Timestamp(a), pd.Timestamp(b)
+
+
+def _label(ts: pd.Series, period: str) -> pd.Series:
+    """区切りの先頭の日（週は月曜、月は1日）"""
+    day = ts.dt.normalize()
+    if period == "週":
+        day = day - pd.to_timedelta(day.dt.dayofweek, unit="D")
+    elif period == "月":
+        day = day.dt.to_period("M").dt.start_time
+    return day.dt.date
+
+
+@pytest.mark.parametrize("player_col", ["背番号", "ゴーリー"])
+def test_totals_match_row_sums(freeshoot, player_col):
+    totals = freeshoot_trends(freeshoot)[player_col]
+    players = [None, "#不在"] + list(freeshoot[player_col].cat.categories[:5])
+    for start, end in _periods(freeshoot):
+        for p in players:
+            rows = _rows(freeshoot, player_col, p, start, end)
+            assert totals.totals(p, start, end) == {m: int(rows[m].sum()) for m in MEASURES}
+
+
+@pytest.mark.parametrize("period", ["日", "週", "月"])
+def test_trend_matches_groupby(freeshoot, period):
+    totals = freeshoot_trends(freeshoot)['背番号']
+    for start, end in _periods(freeshoot):
+        for p in [None] + list(freeshoot['背番号'].cat.categories[:3]):
+            rows = _rows(freeshoot, '背番号', p, start, end)
+            rows = rows[rows['日時_raw'].notna()]
+            ref = rows.groupby(_label(rows['日時_raw'], period).rename("日時"))[MEASURES].sum().astype("int64")
+            ref = ref[ref['枠内'] > 0].reset_index()
+            got = totals.trend(p, start, end, period, present='枠内')
+            pd.testing.assert_frame_equal(got, ref, check_dtype=False)
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+import perf
+
+# ==========================================
+# 時刻順の索引（期間フィルター用）
+# ==========================================
+# データの版ごとに1回だけ時刻順に並べ替え、整数（ナノ秒）の時刻列を付けておく。
+# 期間の絞り込みは np.searchsorted の二分探索で開始・終了の行位置を求め、
+# iloc の範囲で切り出すだけ（真偽値マスクも表のコピーも作らない）。
+EPOCH_COL = '時刻_ns'
+NAT_NS = np.iinfo(np.int64).min   # NaT を整数にした値（並べ替えると先頭に来る）
+DAY_NS = 24 * 60 * 60 * 10**9
+
+
+def sort_by_time(df: pd.DataFrame, ts_col: str) -> pd.DataFrame:
+    """ts_col の昇順（日時が空の行は先頭）に並べ、EPOCH_COL を付けた新しい表を返す"""
+    if ts_col not in df.columns or df.empty:
+        return df
+    ts = pd.to_datetime(df[ts_col], errors="coerce")
+    ns = ts.to_numpy(dtype="datetime64[ns]").view(np.int64)
+    if (ns[1:] >= ns[:-1]).all():
+        # 既に時刻順（時刻順に追記したログなど）なら並べ替えのコピーを作らない
+        out = df.copy(deep=False)
+        out[EPOCH_COL] = ns
+        return out
+    order = np.argsort(ns, kind="stable")
+    out = df.take(order)
+    out[EPOCH_COL] = ns[order]
+    return out
+
+
+def to_ns(t) -> int:
+    """日時 → ナノ秒の整数（EPOCH_COL と比べられる値）"""
+    return pd.Timestamp(t).as_unit("ns").value
+
+
+def time_positions(df: pd.DataFrame, start, end):
+    """start〜end（両端を含む）の行位置の範囲 (lo, hi)。df は sort_by_time 済みであること"""
+    ns = df[EPOCH_COL].to_numpy()
+    return int(np.searchsorted(ns, to_ns(start), side="left")), int(np.searchsorted(ns, to_ns(end), side="right"))
+
+
+@perf.timed("filter")
+def time_range(df: pd.DataFrame, start, end) -> pd.DataFrame:
+    """start〜end（両端を含む）の行を切り出す。df は sort_by_time 済みであること"""
+    if EPOCH_COL not in df.columns:
+        return df
+    lo, hi = time_positions(df, start, end)
+    return df.iloc[lo:hi]
+
+
+def time_bounds(df: pd.DataFrame):
+    """最初と最後の日時（日時のある行が無ければNone）"""
+    if EPOCH_COL not in df.columns or df.empty:
+        return None
+    ns = df[EPOCH_COL].to_numpy()
+    first = np.searchsorted(ns, NAT_NS, side="right")
+    if first >= len(ns):
+        return None
+    return pd.Timestamp(ns[first]), pd.Timestamp(ns[-1])
+
+
+# ==========================================
+# 日の区分（対戦表・選手ごとの日別の累積件数で共通）
+# ==========================================
+# 行を日付ごとの区分に分けて数え、期間は区分の範囲で表す。期間は日単位（開始・終了の日付を含む）。
+# 区分 0 は日時の無い行で、期間を絞らないときだけ範囲に入る。
+def day_buckets(df: pd.DataFrame):
+    """(出てきた日の並び（1970-01-01 からの日数・昇順）, 行ごとの区分)。区分は 0 = 日時なし、1.. = 日付順"""
+    ns = df[EPOCH_COL].to_numpy() if EPOCH_COL in df.columns else np.full(len(df), NAT_NS)
+    dated = ns != NAT_NS
+    days, inv = np.unique(ns[dated] // DAY_NS, return_inverse=True)
+    bucket = np.zeros(len(df), dtype=np.int64)
+    bucket[dated] = inv + 1
+    return days, bucket
+
+
+def day_span(days: np.ndarray, start, end):
+    """start〜end の日付の区分の範囲 [lo, hi)。start が None なら日時なしも含めた全体"""
+    if start is None:
+        return 0, len(days) + 1
+    lo = 1 + int(np.searchsorted(days, to_ns(start) // DAY_NS, side="left"))
+    hi = 1 + int(np.searchsorted(days, to_ns(end) // DAY_NS, side="right"))
+    return lo, max(lo, hi)
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+import perf
+from matchup import player_codes
+from time_index import day_buckets, day_span
+
+# ==========================================
+# 選手ごとの日別の累積件数（期間の合計・推移用）
+# ==========================================
+# 選手ごとに指標（件数・ゴール・枠内・セーブなど）を日ごとに数え、日の方向に累積和を取った配列で持つ。
+# データの版ごとに1回、bincount の1回で作る。
+# 期間の合計は累積和の引き算1回、日・週・月の推移は区切りごとに引き算1回で求まり、行を読み直さない。
+# 期間は日単位（開始・終了の日付を含む）。日時の無い行は、期間を絞らないときの合計だけに数える。
+
+# 推移の区切り（画面の表示名 → 区切りの先頭の日を求める関数。日は 1970-01-01 からの日数）
+PERIODS = {
+    "日": lambda days: days,
+    "週": lambda days: days - (days + 3) % 7,   # 月曜始まり（1970-01-01 は木曜）
+    "月": lambda days: days.astype("datetime64[D]").astype("datetime64[M]").astype("datetime64[D]").astype(np.int64),
+}
+
+
+class DailyTotals:
+    """選手ごと・日ごとの指標の件数の累積和
+
+    table は sort_by_time 済み（EPOCH_COL 付き）の表。measures は 指標名 → 行ごとの件数（1次元）。
+    選手の列が無い表では、全員（選手 None）の合計・推移だけを返す。
+    totals(選手, 開始, 終了) で期間の合計、trend(選手, 開始, 終了, 区切り) で推移を返す。選手 None は全員。
+    """
+
+    def __init__(self, table: pd.DataFrame, player: str, measures: dict):
+        self.player = player
+        names = table[player] if player in table.columns else pd.Series(np.nan, index=table.index)
+        self.names, codes = player_codes(names)
+        # 日の区分: 0 = 日時なし、1.. = 日付順
+        self.days, bucket = day_buckets(table)
+        # 選手のコードは +1 して 0 を「不明（欠損）」にする
+        shape = (len(self.days) + 1, len(self.names) + 1)
+        flat = bucket * shape[1] + (codes + 1)
+        self._cum = {}   # 指標名 → 日の方向の累積和（先頭に0を1行足して、[hi] - [lo] で区間の合計）
+        self._all = {}   # 指標名 → 全員（不明を含む）の累積和
+        for name, values in measures.items():
+            counts = np.bincount(flat, weights=np.asarray(values, dtype=np.float64), minlength=np.prod(shape))
+            cum = np.cumsum(counts.reshape(shape), axis=0).round().astype(np.int64)
+            self._cum[name] = np.concatenate([np.zeros((1, shape[1]), dtype=np.int64), cum])
+            self._all[name] = self._cum[name].sum(axis=1)
+        self._periods = {}   # 区切り → 日ごとの区切りの先頭の日
+
+    def _column(self, name: str, player):
+        """指標 name の選手 player の累積和（見つからない選手は None）"""
+        if player is None:
+            return self._all[name]
+        pos = self.names.get_indexer([player])[0]
+        return None if pos < 0 else self._cum[name][:, pos + 1]
+
+    def totals(self, player=None, start=None, end=None) -> dict:
+        """期間（start〜end の日付。None なら全期間）の 指標名 → 件数"""
+        lo, hi = day_span(self.days, start, end)
+        out = {}
+        for name in self._cum:
+            col = self._column(name, player)
+            out[name] = 0 if col is None else int(col[hi] - col[lo])
+        return out
+
+    @perf.timed("aggregate")
+    def trend(self, player=None, start=None, end=None, period: str = "日", *, present=None) -> pd.DataFrame:
+        """期間の区切り（日・週・月）ごとの指標の件数。列は 日時（区切りの先頭の日）と指標。present の指標が0の区切りは除く"""
+        lo, hi = day_span(self.days, start, end)
+        lo = max(lo, 1)   # 日時の無い行は推移に入れない
+        if period not in self._periods:
+            self._periods[period] = PERIODS[period](self.days)
+        labels = self._periods[period][lo - 1:hi - 1]
+        # 区切りの境目（累積和の行位置）。区切りごとの件数は境目どうしの引き算1回
+        edges = lo + np.concatenate([[0], np.flatnonzero(np.diff(labels)) + 1, [len(labels)]]) if len(labels) else np.array([lo])
+        out = {"日時": pd.to_datetime(labels[edges[:-1] - lo], unit="D").date}
+        for name in self._cum:
+            col = self._column(name, player)
+            out[name] = np.zeros(len(edges) - 1, dtype=np.int64) if col is None else np.diff(col[edges])
+        frame = pd.DataFrame(out)
+        return frame[frame[present or next(iter(self._cum))] > 0].reset_index(drop=True)